@@ -0,0 +1,148 @@
+"""
+Almacén local de precios diarios.
+
+Guarda el histórico completo de cada ticker una sola vez en disco (arrays NumPy
+por ticker) y solo descarga de Yahoo Finance las barras que faltan desde la
+última guardada. Cualquier fecha de inicio se sirve como un corte del array
+mapeado en memoria, sin copiarlo ni repetir el `asfreq`.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import perfil
+from compartido import VueloUnico
+
+DIRECTORIO_DATOS = Path(os.environ.get("DCA_DATOS_DIR", Path(__file__).resolve().parent / "datos"))
+MODO_OFFLINE = os.environ.get("DCA_OFFLINE", "0") == "1"
+REFRESCO_SEGUNDOS = 3600
+
+def _normalizar(data):
+    """Serie de cierres con índice diario sin zona horaria."""
+    if isinstance(data, pd.DataFrame):
+        data = data.squeeze(axis=1)
+    data = data.dropna()
+    indice = pd.DatetimeIndex(data.index)
+    if indice.tz is not None:
+        indice = indice.tz_convert(None)
+    data.index = indice.normalize()
+    return data[~data.index.duplicated(keep='last')].astype(float)
+
+class AlmacenPrecios:
+    """
+    Histórico por ticker en `directorio/<TICKER>/`:
+    `precios.npy` (cierres con relleno diario), `reales.npy` (True en días con
+    barra real) y `meta.json` (primer día y hora de la última actualización).
+    """
+
+    def __init__(self, directorio=DIRECTORIO_DATOS, offline=MODO_OFFLINE, refresco=REFRESCO_SEGUNDOS):
+        self.directorio = Path(directorio)
+        self.offline = offline
+        self.refresco = refresco
+        # Las sesiones que piden a la vez el mismo ticker comparten una descarga
+        self.descargas = VueloUnico()
+
+    def _ruta(self, ticker):
+        return self.directorio / ticker.upper().replace("/", "_")
+
+    def _leer(self, ticker):
+        ruta = self._ruta(ticker)
+        if not (ruta / "meta.json").exists():
+            return None
+        meta = json.loads((ruta / "meta.json").read_text())
+        precios = np.load(ruta / "precios.npy", mmap_mode='r')
+        reales = np.load(ruta / "reales.npy", mmap_mode='r')
+        return meta, precios, reales
+
+    def _escribir(self, ticker, serie, reales):
+        """Guarda una serie ya rellenada a diario (escritura atómica por fichero)."""
+        ruta = self._ruta(ticker)
+        ruta.mkdir(parents=True, exist_ok=True)
+        for nombre, array in (("precios", serie.to_numpy(dtype=float)), ("reales", np.asarray(reales, dtype=bool))):
+            temporal = ruta / f"{nombre}.tmp.npy"
+            np.save(temporal, array)
+            os.replace(temporal, ruta / f"{nombre}.npy")
+        # meta.json va el último: quien lo lee ya encuentra los arrays nuevos
+        meta = {"inicio": serie.index[0].strftime('%Y-%m-%d'), "actualizado": time.time()}
+        temporal = ruta / "meta.tmp.json"
+        temporal.write_text(json.dumps(meta))
+        os.replace(temporal, ruta / "meta.json")
+
+    def actualizar(self, ticker):
+        """Descarga solo la cola que falta (o el histórico completo si no hay nada guardado)."""
+        guardado = self._leer(ticker)
+        if guardado is None:
+            with perfil.fase("datos.yf_download"):
+                nuevos = _normalizar(yf.download(ticker, period="max", progress=False)['Close'])
+            if nuevos.empty:
+                raise ValueError(f"No hay datos para {ticker}.")
+            anteriores = nuevos.iloc[:0]
+        else:
+            meta, precios, reales = guardado
+            fechas = pd.date_range(meta["inicio"], periods=len(precios), freq='D')
+            # La última barra real puede ser la del día en curso: se vuelve a pedir
+            ultima_real = fechas[np.flatnonzero(reales)[-1]]
+            with perfil.fase("datos.yf_download"):
+                nuevos = _normalizar(yf.download(ticker, start=ultima_real, progress=False)['Close'])
+            if nuevos.empty:
+                # yfinance devuelve un DataFrame vacío cuando falla: el histórico guardado no se toca
+                raise ValueError(f"La descarga de {ticker} no ha devuelto barras.")
+            mascara = np.asarray(reales, dtype=bool)
+            if ultima_real in nuevos.index:
+                # Solo se sustituye la última barra guardada si la descarga la trae
+                mascara = mascara & (fechas < ultima_real)
+            anteriores = pd.Series(np.asarray(precios)[mascara], index=fechas[mascara])
+        reales_serie = pd.concat([anteriores, nuevos])
+        reales_serie = reales_serie[~reales_serie.index.duplicated(keep='last')].sort_index()
+        with perfil.fase("datos.asfreq"):
+            serie = reales_serie.asfreq('D', method='ffill')
+        perfil.contar("barras_descargadas", len(nuevos))
+        with perfil.fase("datos.escritura"):
+            self._escribir(ticker, serie, serie.index.isin(reales_serie.index))
+
+    def reales(self, ticker):
+        """Máscara diaria (True en días con barra real) del histórico guardado, sin actualizarlo."""
+        guardado = self._leer(ticker)
+        if guardado is None:
+            raise FileNotFoundError(f"No hay datos locales de {ticker}.")
+        meta, _, reales = guardado
+        fechas = pd.date_range(meta["inicio"], periods=len(reales), freq='D')
+        return pd.Series(reales, index=fechas, name=ticker, copy=False)
+
+    def _refrescar(self, ticker):
+        """Actualiza el ticker si sigue caducado (otra sesión pudo actualizarlo mientras tanto)."""
+        guardado = self._leer(ticker)
+        if guardado is None or time.time() - guardado[0]["actualizado"] > self.refresco:
+            self.actualizar(ticker)
+
+    def serie(self, ticker, inicio):
+        """
+        Cierres diarios rellenados desde la primera barra real >= `inicio`.
+        La serie devuelta es una vista sobre el fichero mapeado en memoria.
+        """
+        guardado = self._leer(ticker)
+        caducado = guardado is None or time.time() - guardado[0]["actualizado"] > self.refresco
+        if caducado and not self.offline:
+            try:
+                self.descargas.hacer(self._ruta(ticker).name, self._refrescar, ticker)
+            except Exception:
+                # Sin red se sirve lo que haya en disco
+                if guardado is None:
+                    raise
+            guardado = self._leer(ticker)
+        if guardado is None:
+            raise FileNotFoundError(f"No hay datos locales de {ticker} y el modo offline está activo.")
+
+        meta, precios, reales = guardado
+        primer_dia = pd.Timestamp(meta["inicio"])
+        desde = max((pd.Timestamp(inicio) - primer_dia).days, 0)
+        if desde >= len(reales) or not reales[desde:].any():
+            raise ValueError(f"No hay datos de {ticker} desde {inicio}.")
+        desde += int(np.argmax(reales[desde:]))
+        fechas = pd.date_range(primer_dia + pd.Timedelta(days=int(desde)), periods=len(precios) - desde, freq='D')
+        return pd.Series(precios[desde:], index=fechas, name=ticker, copy=False)
@@ -1,483 +1,602 @@
-import streamlit as st
-import yfinance as yf
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import datetime
-import requests
-from calendar import monthrange
-
-# --- CONFIGURACIÓN DE LA PÁGINA ---
-st.set_page_config(
-    page_title="Simulador DCA Sniper Pro",
-    page_icon="🧠",
-    layout="wide"
-)
-
-# --- TÍTULO ---
-st.title("🧠 Simulador DCA Institucional: Target LTV & Gestión de Riesgo")
-st.markdown("""
-Esta estrategia gestiona el **LTV Global del Portafolio**. No se apalanca por compra, sino que ajusta la deuda total para mantener un % de riesgo objetivo según la caída del mercado.
-""")
-
-# ==========================================
-# 🎛️ PANEL DE CONTROL (SIDEBAR)
-# ==========================================
-
-st.sidebar.header("1. Configuración General")
-TICKER = st.sidebar.text_input("Ticker", value="BTC-USD")
-FECHA_INICIO = st.sidebar.date_input("Fecha Inicio", value=datetime.date(2021, 10, 1))
-INVERSION_INICIAL = st.sidebar.number_input("Inversión Inicial ($)", value=1000)
-COSTE_DEUDA_APR = st.sidebar.number_input("Coste Deuda (APR %)", value=5.0) / 100
-
-st.sidebar.header("2. Aportaciones Periódicas")
-FRECUENCIA = st.sidebar.selectbox("Frecuencia", ["Semanal", "Mensual"])
-
-if FRECUENCIA == "Semanal":
-    DIA_SEMANA = st.sidebar.selectbox("Día de la semana", 
-                                      ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"], index=0)
-    mapa_dias = {"Lunes":0, "Martes":1, "Miércoles":2, "Jueves":3, "Viernes":4, "Sábado":5, "Domingo":6}
-    DIA_SEMANA_IDX = mapa_dias[DIA_SEMANA]
-else:
-    DIA_MES = st.sidebar.slider("Día del mes", 1, 31, 1)
-
-APORTACION_BASE = st.sidebar.number_input("Aportación Base ($)", value=50)
-UMBRAL_INICIO_DCA = st.sidebar.slider("Iniciar DCA tras Drawdown > (%)", 0.05, 0.50, 0.15)
-
-st.sidebar.header("3. Estrategia de Apalancamiento")
-st.sidebar.info("Estos valores definen el % de Deuda sobre el Total del Portafolio.")
-TARGET_LTV_BASE = st.sidebar.slider("Target LTV Base (%)", 0.0, 0.50, 0.25)
-TARGET_LTV_AGRESIVO = st.sidebar.slider("Target LTV Agresivo (%)", 0.0, 0.60, 0.40) # Has pedido 1.75 antes, aquí es LTV Global, 40% es muy agresivo ya.
-UMBRAL_DD_AGRESIVO = st.sidebar.slider("Activar Agresivo si DD > (%)", 0.10, 0.50, 0.30)
-
-st.sidebar.header("4. Filtros de Seguridad (Safe Mode)")
-UMBRAL_DD_SAFE = st.sidebar.slider("Drawdown es menor a (%)", 0.0, 0.10, 0.05)
-UMBRAL_LTV_SAFE = st.sidebar.slider("LTV Actual supera el (%)", 0.10, 0.60, 0.40)
-
-st.sidebar.header("5. Defensa y Liquidación")
-LIQ_THRESHOLD = st.sidebar.number_input("Liquidation Threshold (%)", value=75.0) / 100
-PCT_UMBRAL_DEFENSA = st.sidebar.slider("Activar Defensa al % del Liq. Threshold", 0.50, 0.95, 0.80)
-TRIGGER_DEFENSA_LTV = LIQ_THRESHOLD * PCT_UMBRAL_DEFENSA
-MULTIPLO_DEFENSA = st.sidebar.number_input("Multiplicador Aportación en Defensa", value=2.0)
-
-st.sidebar.header("6. Aportaciones Extraordinarias")
-UMBRAL_DD_EXTRA = st.sidebar.slider("Aportar Extra si DD > (%)", 0.30, 0.90, 0.60)
-MONTO_EXTRA = st.sidebar.number_input("Monto Extra ($)", value=100)
-
-# ==========================================
-# ⚙️ FUNCIONES AUXILIARES
-# ==========================================
-
-@st.cache_data
-def descargar_datos(ticker, inicio):
-    data = yf.download(ticker, start=inicio, progress=False)['Close']
-    if isinstance(data, pd.DataFrame): 
-        data = data.squeeze()
-    data = data.asfreq('D', method='ffill')
-    return data
-
-def es_dia_de_compra(fecha, frecuencia, dia_semana_idx, dia_mes_target):
-    if frecuencia == "Semanal":
-        return fecha.dayofweek == dia_semana_idx
-    else:
-        _, ultimo_dia_mes = monthrange(fecha.year, fecha.month)
-        target = min(dia_mes_target, ultimo_dia_mes)
-        return fecha.day == target
-
-def calcular_deuda_para_target_ltv(colateral_actual, deuda_actual, aportacion_cash, target_ltv):
-    numerador = target_ltv * (colateral_actual + aportacion_cash) - deuda_actual
-    denominador = 1 - target_ltv
-    if denominador == 0: return 0
-    deuda_necesaria = numerador / denominador
-    return max(0, deuda_necesaria)
-
-def calcular_cagr(valor_final, valor_inicial, dias):
-    if valor_inicial == 0 or valor_final <= 0 or dias <= 0: return 0.0
-    anyos = dias / 365.25
-    return (valor_final / valor_inicial) ** (1 / anyos) - 1
-
-def enviar_a_moosend(nombre, email):
-    """Envía el contacto a Moosend con diagnóstico de errores"""
-    try:
-        # 1. Verificar si la clave existe
-        if "MOOSEND_API_KEY" not in st.secrets:
-            return False, "❌ Error Crítico: No has configurado el 'Secret'. Ve a Settings > Secrets en Streamlit."
-            
-        api_key = st.secrets["MOOSEND_API_KEY"]
-        list_id = "75c61863-63dc-4fd3-9ed8-856aee90d04a" 
-        
-        # 2. Construir la URL
-        url = f"https://api.moosend.com/v3/subscribers/{list_id}/subscribe.json?apikey={api_key}"
-        
-        # 3. Datos
-        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
-        data = {
-            'Name': nombre, 
-            'Email': email,
-            'HasExternalDoubleOptIn': False
-        }
-        
-        # 4. Hacer la petición
-        response = requests.post(url, json=data, headers=headers)
-        
-        # 5. DIAGNÓSTICO
-        if response.status_code == 200:
-            resp_json = response.json()
-            
-            if resp_json.get("Code") == 0:
-                # --- CAMBIO AQUÍ: MENSAJE PARA EL USUARIO ---
-                return True, "✅ ¡Genial! Te has suscrito correctamente. Revisa tu bandeja de entrada pronto."
-            else:
-                error_msg = resp_json.get("Error", "Error desconocido")
-                # Aquí sí dejamos 'Moosend' porque es un mensaje de error técnico para ti
-                return False, f"⚠️ Hubo un problema con el registro: {error_msg}"
-                
-        else:
-            return False, f"❌ Error de conexión (HTTP {response.status_code})"
-            
-    except Exception as e:
-        return False, f"❌ Error interno: {str(e)}"
-# ==========================================
-# 🚀 MOTOR DE SIMULACIÓN
-# ==========================================
-
-# ==========================================
-# 🚀 MOTOR DE SIMULACIÓN CON MEMORIA
-# ==========================================
-
-# 1. Inicializar el estado si no existe
-if 'simulacion_realizada' not in st.session_state:
-    st.session_state.simulacion_realizada = False
-
-# 2. Si pulsan el botón, activamos el estado
-if st.sidebar.button("EJECUTAR SIMULACIÓN", type="primary"):
-    st.session_state.simulacion_realizada = True
-
-# 3. Comprobamos el estado en lugar del botón directo
-if st.session_state.simulacion_realizada:
-    
-    with st.spinner('Simulando Estrategia vs Benchmark...'):
-        # 1. Datos
-        try:
-            data = descargar_datos(TICKER, FECHA_INICIO)
-        except Exception as e:
-            st.error(f"Error descargando datos: {e}")
-            st.stop()
-            
-        fechas = data.index
-        precios = data.values
-        
-        # --- ESTADOS ---
-        btc_acumulado = 0.0
-        deuda_acumulada = 0.0
-        dinero_invertido = 0.0
-        intereses_pagados = 0.0
-        estrategia_activa_dca = False 
-        compra_inicial_hecha = False
-        
-        bench_btc = 0.0
-        bench_invertido = 0.0
-        
-        pico_precio = 0.0
-        historia = {
-            'Fecha': [], 
-            'Equity_Strat': [], 'LTV': [], 'Drawdown': [], 'Evento': [],
-            'Equity_Bench': []
-        }
-        registros = []
-        liquidado = False
-        fecha_liq = None
-
-        # --- BUCLE DIARIO ---
-        for i, fecha in enumerate(fechas):
-            precio = precios[i]
-            
-            # Intereses
-            if deuda_acumulada > 0:
-                interes = deuda_acumulada * (COSTE_DEUDA_APR / 365.0)
-                deuda_acumulada += interes
-                intereses_pagados += interes
-            
-            # Drawdown
-            if precio > pico_precio: pico_precio = precio
-            dd = 0.0
-            if pico_precio > 0: dd = (pico_precio - precio) / pico_precio
-            
-            # Trigger DCA
-            if not estrategia_activa_dca and dd >= UMBRAL_INICIO_DCA:
-                estrategia_activa_dca = True
-            
-            # LTV y Liquidación
-            colateral_total = btc_acumulado * precio
-            ltv = 0.0
-            if colateral_total > 0: ltv = deuda_acumulada / colateral_total
-            
-            if ltv >= LIQ_THRESHOLD:
-                liquidado = True
-                fecha_liq = fecha
-                historia['Fecha'].append(fecha)
-                historia['Equity_Strat'].append(0)
-                historia['Equity_Bench'].append(bench_btc * precio)
-                historia['LTV'].append(ltv)
-                historia['Drawdown'].append(dd)
-                historia['Evento'].append("💀 LIQ")
-                registros.append({'Fecha': fecha, 'Tipo': 'LIQUIDACIÓN', 'LTV': ltv})
-                break
-            
-            # --- COMPRAS ---
-            # A) INICIO
-            if i == 0: 
-                # Estrategia
-                btc_acumulado += INVERSION_INICIAL / precio
-                dinero_invertido += INVERSION_INICIAL
-                compra_inicial_hecha = True
-                # Benchmark
-                bench_btc += INVERSION_INICIAL / precio
-                bench_invertido += INVERSION_INICIAL
-                
-                tipo_evento = "INICIO"
-                etiqueta_tabla = "Inversión Inicial"
-                
-                registros.append({
-                    'Fecha': fecha.strftime('%Y-%m-%d'), 'Precio': precio, 'Tipo': "INICIO",
-                    'Cash ($)': INVERSION_INICIAL, 'Deuda Nueva ($)': 0,
-                    'LTV Post (%)': 0, 'DD (%)': dd * 100
-                })
-            
-            # B) RECURRENTE
-            elif es_dia_de_compra(fecha, FRECUENCIA, locals().get('DIA_SEMANA_IDX'), locals().get('DIA_MES')):
-                
-                # Benchmark (Siempre compra)
-                bench_btc += APORTACION_BASE / precio
-                bench_invertido += APORTACION_BASE
-                
-                # Estrategia
-                if estrategia_activa_dca:
-                    cash_base = APORTACION_BASE
-                    cash_a_invertir = 0.0
-                    deuda_a_tomar = 0.0
-                    
-                    es_extra = False
-                    if dd > UMBRAL_DD_EXTRA:
-                        cash_base += MONTO_EXTRA
-                        es_extra = True
-                    
-                    if ltv > TRIGGER_DEFENSA_LTV:
-                        cash_a_invertir = cash_base * MULTIPLO_DEFENSA
-                        target_ltv_hoy = 0.0 
-                        tipo_evento = "DEFENSA"
-                        etiqueta_tabla = f"🛡️ Defensa"
-                    else:
-                        cash_a_invertir = cash_base
-                        if dd < UMBRAL_DD_SAFE or ltv > UMBRAL_LTV_SAFE:
-                            target_ltv_hoy = 0.0 
-                            tipo_evento = "SAFE"
-                            etiqueta_tabla = "✅ Safe"
-                        elif dd > UMBRAL_DD_AGRESIVO:
-                            target_ltv_hoy = TARGET_LTV_AGRESIVO
-                            tipo_evento = "AGRESIVO"
-                            etiqueta_tabla = f"🔥 Agresivo"
-                        else:
-                            target_ltv_hoy = TARGET_LTV_BASE
-                            tipo_evento = "BASE"
-                            etiqueta_tabla = f"⚖️ Base"
-                        
-                        if es_extra:
-                            tipo_evento += "+EXTRA"
-                            etiqueta_tabla += " + Extra"
-
-                    if target_ltv_hoy > 0:
-                        deuda_a_tomar = calcular_deuda_para_target_ltv(colateral_total, deuda_acumulada, cash_a_invertir, target_ltv_hoy)
-                    else:
-                        deuda_a_tomar = 0
-                    
-                    total_compra = cash_a_invertir + deuda_a_tomar
-                    btc_acumulado += total_compra / precio
-                    deuda_acumulada += deuda_a_tomar
-                    dinero_invertido += cash_a_invertir
-                    
-                    val_post = btc_acumulado * precio
-                    ltv_post = deuda_acumulada / val_post
-                    
-                    registros.append({
-                        'Fecha': fecha.strftime('%Y-%m-%d'), 'Precio': precio, 'Tipo': etiqueta_tabla,
-                        'Cash ($)': cash_a_invertir, 'Deuda Nueva ($)': deuda_a_tomar,
-                        'LTV Post (%)': ltv_post * 100, 'DD (%)': dd * 100
-                    })
-                else:
-                    tipo_evento = None
-
-            historia['Fecha'].append(fecha)
-            historia['Equity_Strat'].append((btc_acumulado * precio) - deuda_acumulada)
-            historia['Equity_Bench'].append(bench_btc * precio)
-            historia['LTV'].append(ltv)
-            historia['Drawdown'].append(dd)
-            historia['Evento'].append(tipo_evento)
-
-        df = pd.DataFrame(historia).set_index('Fecha')
-        df_reg = pd.DataFrame(registros)
-        
-        # --- CÁLCULOS FINALES ---
-        dias_totales = (df.index[-1] - df.index[0]).days
-        
-        strat_val_final = 0 if liquidado else df['Equity_Strat'].iloc[-1]
-        strat_roi = -100 if liquidado else ((strat_val_final - dinero_invertido) / dinero_invertido) * 100
-        strat_cagr = calcular_cagr(strat_val_final, dinero_invertido, dias_totales)
-        
-        bench_val_final = df['Equity_Bench'].iloc[-1]
-        bench_roi = ((bench_val_final - bench_invertido) / bench_invertido) * 100
-        bench_cagr = calcular_cagr(bench_val_final, bench_invertido, dias_totales)
-        
-        # ==========================================
-        # 📊 PRESENTACIÓN DE RESULTADOS
-        # ==========================================
-        
-        st.divider()
-        st.subheader("🏆 Comparativa de Rendimiento")
-        
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Valor Neto Estrategia", f"${strat_val_final:,.2f}", f"{strat_roi:.2f}% ROI")
-        col2.metric("Valor Neto Benchmark", f"${bench_val_final:,.2f}", f"{bench_roi:.2f}% ROI")
-        delta_cagr = (strat_cagr - bench_cagr) * 100
-        col3.metric("CAGR Estrategia vs Bench", f"{strat_cagr*100:.2f}%", f"{delta_cagr:+.2f}% Dif")
-        
-        # --- TABLA RESUMEN ---
-        resumen_data = {
-            "Métrica": ["Inversión Bolsillo (Total)", "Valor Final (Equity)", "ROI Total", "CAGR (Anualizado)", "Deuda Final / Coste"],
-            "🤖 Tu Estrategia (Target LTV)": [
-                f"${dinero_invertido:,.0f}", f"${strat_val_final:,.2f}", f"{strat_roi:.2f}%", f"{strat_cagr*100:.2f}%",
-                f"${deuda_acumulada:,.0f} (Int: ${intereses_pagados:,.0f})"
-            ],
-            "🐢 Benchmark (DCA Puro)": [
-                f"${bench_invertido:,.0f}", f"${bench_val_final:,.2f}", f"{bench_roi:.2f}%", f"{bench_cagr*100:.2f}%",
-                "$0"
-            ]
-        }
-        st.table(pd.DataFrame(resumen_data))
-        
-        if liquidado:
-            st.error(f"☠️ ATENCIÓN: La estrategia fue LIQUIDADA el {fecha_liq.strftime('%Y-%m-%d')}.")
-
-        # --- GRÁFICOS ---
-        tab1, tab2 = st.tabs(["Gráficos", "Operaciones"])
-        with tab1:
-            fig, axes = plt.subplots(3, 1, figsize=(12, 16), sharex=True)
-            
-            # Equity
-            axes[0].set_title("1. Estrategia vs Benchmark (Patrimonio Neto)", fontweight='bold')
-            axes[0].plot(df.index, df['Equity_Strat'], color='#1f77b4', linewidth=2, label='Tu Estrategia')
-            axes[0].plot(df.index, df['Equity_Bench'], color='gray', linestyle='--', linewidth=1.5, label='Benchmark DCA')
-            axes[0].fill_between(df.index, df['Equity_Strat'], df['Equity_Bench'], where=(df['Equity_Strat'] > df['Equity_Bench']), color='green', alpha=0.1)
-            axes[0].legend()
-            axes[0].grid(True, alpha=0.3)
-            
-            # Decisiones
-            axes[1].set_title("2. Mapa de Decisiones", fontweight='bold')
-            axes[1].plot(df.index, df['Drawdown']*-100, color='black', alpha=0.3, label='Mercado')
-            evt_def = df[df['Evento'] == "DEFENSA"]
-            axes[1].scatter(evt_def.index, [-25]*len(evt_def), marker='s', s=80, color='red', label='Defensa')
-            evt_agg = df[df['Evento'] == "AGRESIVO"]
-            axes[1].scatter(evt_agg.index, [-15]*len(evt_agg), marker='^', s=60, color='purple', label='Agresivo')
-            evt_base = df[df['Evento'] == "BASE"]
-            axes[1].scatter(evt_base.index, [-10]*len(evt_base), marker='o', s=30, color='cyan', label='Base')
-            axes[1].set_ylabel("DD (%)")
-            axes[1].legend(loc='lower left')
-            axes[1].grid(True, alpha=0.3)
-            
-            # LTV
-            axes[2].set_title("3. Riesgo LTV", fontweight='bold')
-            axes[2].plot(df.index, df['LTV']*100, color='orange', label='LTV Real')
-            axes[2].axhline(LIQ_THRESHOLD*100, color='red', linestyle='--', label='Liquidación')
-            axes[2].axhline(TRIGGER_DEFENSA_LTV*100, color='brown', linestyle=':', label='Trigger Defensa')
-            axes[2].set_ylabel("LTV (%)")
-            axes[2].set_ylim(0, 100)
-            axes[2].legend(loc='upper left')
-            axes[2].grid(True, alpha=0.3)
-            st.pyplot(fig)
-            
-        with tab2:
-            st.dataframe(df_reg)
-
-       # ==========================================
-        # 📝 INFORME DINÁMICO (CORREGIDO)
-        # ==========================================
-        st.markdown("---")
-        st.subheader("📄 Informe de Estrategia Generada")
-        
-        valor_defensa_aprox = APORTACION_BASE * MULTIPLO_DEFENSA
-        
-        # NOTA: He añadido una barra invertida (\) antes de cada signo $ 
-        # para evitar que Streamlit lo interprete como fórmula matemática.
-        
-        informe_texto = f"""
-        ### 1. Perfil de Inversión
-        Has configurado una estrategia para **{TICKER}** con una inversión inicial de **\${INVERSION_INICIAL}**.
-        
-        El sistema realizará aportaciones periódicas de **\${APORTACION_BASE}** con una frecuencia **{FRECUENCIA}**.
-        
-        > *Objetivo:* Acumular activo aprovechando la volatilidad, utilizando deuda inteligente para potenciar el retorno sin comprometer la seguridad.
-
-        ### 2. Mecánica de Entrada (Sniper)
-        A diferencia de un DCA ciego, este algoritmo **permanecerá en espera** al inicio. No ejecutará la primera compra recurrente hasta que el mercado no sufra una corrección (Drawdown) superior al **{UMBRAL_INICIO_DCA*100:.0f}%**. Esto evita comprar sistemáticamente en techos de mercado.
-
-        ### 3. Gestión de Deuda (Target LTV)
-        La estrategia no utiliza un apalancamiento fijo, sino que ajusta dinámicamente tu deuda para mantener un nivel de riesgo constante sobre el total de tu cartera:
-        * **Escenario Base:** Buscará mantener un LTV (Deuda/Colateral) del **{TARGET_LTV_BASE*100:.0f}%**.
-        * **Escenario Agresivo:** Si el mercado cae más de un **{UMBRAL_DD_AGRESIVO*100:.0f}%**, el sistema aumentará el riesgo buscando un LTV del **{TARGET_LTV_AGRESIVO*100:.0f}%** para comprar más barato.
-        * **Modo Seguro (Safe Mode):** Si el mercado está cerca de máximos (caída < **{UMBRAL_DD_SAFE*100:.0f}%**) o tu deuda ya es elevada (> **{UMBRAL_LTV_SAFE*100:.0f}%** LTV), el sistema **dejará de pedir prestado** y comprará solo con tu efectivo.
-
-        ### 4. Protocolos de Seguridad y Defensa
-        * **Defensa Activa:** Si en algún momento tu LTV cruza la línea roja del **{TRIGGER_DEFENSA_LTV*100:.0f}%** (calculado sobre tu umbral de liquidación), el sistema activará el "Modo Pánico": inyectará **{MULTIPLO_DEFENSA}x** veces tu aportación habitual (aprox **\${valor_defensa_aprox}**) sin deuda para diluir el riesgo inmediatamente.
-        * **Coste Financiero:** El modelo asume un coste de la deuda del **{COSTE_DEUDA_APR*100:.1f}%** anual, que se acumula diariamente en contra de tu patrimonio neto.
-        """
-        st.markdown(informe_texto)
-        
-       # ==========================================
-        # 📧 FORMULARIO MOOSEND (MEJORADO)
-        # ==========================================
-        st.markdown("---")
-        st.subheader("📬 ¿Quieres descubrir más estrategias institucionales?")
-        st.write("Suscríbete para recibir alertas sobre nuevos algoritmos DeFi y análisis de mercado.")
-        
-        # Usamos 'clear_on_submit=False' para que no se borren los datos si hay error
-        with st.form("moosend_form", clear_on_submit=False):
-            col_form_1, col_form_2 = st.columns(2)
-            
-            with col_form_1:
-                # El placeholder ayuda al usuario a saber qué poner
-                nombre_usuario = st.text_input("Nombre", placeholder="Ej: Satoshi")
-            
-            with col_form_2:
-                email_usuario = st.text_input("Correo Electrónico", placeholder="Ej: satoshi@bitcoin.org")
-            
-            # El botón de envío
-            submit_btn = st.form_submit_button("Enviar y Suscribirme", type="primary")
-            
-            if submit_btn:
-                # 1. Validación: ¿El nombre está vacío?
-                if not nombre_usuario.strip():
-                    st.warning("⚠️ Por favor, dinos tu nombre antes de enviar.")
-                
-                # 2. Validación: ¿El email está vacío?
-                elif not email_usuario.strip():
-                    st.error("⚠️ El campo de correo electrónico es obligatorio.")
-                
-                # 3. Validación: ¿El email parece válido? (Tiene @)
-                elif "@" not in email_usuario:
-                     st.error("⚠️ Por favor, introduce un correo electrónico válido.")
-                
-                # 4. Si todo está bien, intentamos enviar
-                else:
-                    with st.spinner("Suscribiendo..."):
-                        exito, mensaje = enviar_a_moosend(nombre_usuario, email_usuario)
-                        
-                    if exito:
-                        st.success(mensaje)
-                        st.balloons() # ¡Un pequeño efecto visual de éxito!
-                    else:
-                        st.error(mensaje)
-
-
-
-
-
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import pandas as pd
+import numpy as np
+import datetime
+import functools
+import os
+
+import perfil
+from almacen import DIRECTORIO_DATOS, AlmacenPrecios
+from barrido import PARAMETROS_BARRIDO, barrido_2d, figura_barrido, tabla_barrido
+from cartera import descargar_cesta, parsear_cesta, simular_cartera
+from compartido import CacheCompartida
+from exportar import (FILAS_POR_PAGINA, FORMATOS as FORMATOS_EXPORTACION, columnas_historia,
+                      columnas_operaciones, exportar, pagina, paginas, tabla_operaciones)
+from graficos import huella_resultado, png_resultado
+from intradia import INTERVALOS as INTERVALOS_INTRADIA, ResultadoIntradia, descargar_intradia, simular_intradia
+from montecarlo import METODOS as METODOS_MC, figura_montecarlo, simular_montecarlo
+from motor import ParametrosEstrategia, calcular_resumen, simular
+from optimizador import OBJETIVOS as OBJETIVOS_OPT, figura_optimizacion, optimizar
+from suscripciones import ClienteMoosend, ColaSuscripciones
+from ventanas import analisis_inicios, figura_inicios
+
+# --- CONFIGURACIÓN DE LA PÁGINA ---
+st.set_page_config(
+    page_title="Simulador DCA Sniper Pro",
+    page_icon="🧠",
+    layout="wide"
+)
+
+# --- TÍTULO ---
+st.title("🧠 Simulador DCA Institucional: Target LTV & Gestión de Riesgo")
+st.markdown("""
+Esta estrategia gestiona el **LTV Global del Portafolio**. No se apalanca por compra, sino que ajusta la deuda total para mantener un % de riesgo objetivo según la caída del mercado.
+""")
+
+# ==========================================
+# 🎛️ PANEL DE CONTROL (SIDEBAR)
+# ==========================================
+
+st.sidebar.header("1. Configuración General")
+TICKER = st.sidebar.text_input("Ticker o Cesta", value="BTC-USD", help="Varios activos con pesos: BTC-USD:50, ETH-USD:30, SOL-USD:20")
+FECHA_INICIO = st.sidebar.date_input("Fecha Inicio", value=datetime.date(2021, 10, 1))
+RESOLUCION = st.sidebar.selectbox("Resolución", ["Diaria", *INTERVALOS_INTRADIA],
+                                  help="Intradía: la liquidación se comprueba con el mínimo de cada barra. Yahoo Finance limita el histórico (1h: ~2 años, 30m-5m: 60 días, 1m: 7 días).")
+INTRADIA = RESOLUCION != "Diaria"
+INVERSION_INICIAL = st.sidebar.number_input("Inversión Inicial ($)", value=1000)
+COSTE_DEUDA_APR = st.sidebar.number_input("Coste Deuda (APR %)", value=5.0) / 100
+
+st.sidebar.header("2. Aportaciones Periódicas")
+FRECUENCIA = st.sidebar.selectbox("Frecuencia", ["Semanal", "Mensual"])
+
+if FRECUENCIA == "Semanal":
+    DIA_SEMANA = st.sidebar.selectbox("Día de la semana", 
+                                      ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"], index=0)
+    mapa_dias = {"Lunes":0, "Martes":1, "Miércoles":2, "Jueves":3, "Viernes":4, "Sábado":5, "Domingo":6}
+    DIA_SEMANA_IDX = mapa_dias[DIA_SEMANA]
+else:
+    DIA_MES = st.sidebar.slider("Día del mes", 1, 31, 1)
+
+APORTACION_BASE = st.sidebar.number_input("Aportación Base ($)", value=50)
+UMBRAL_INICIO_DCA = st.sidebar.slider("Iniciar DCA tras Drawdown > (%)", 0.05, 0.50, 0.15)
+
+st.sidebar.header("3. Estrategia de Apalancamiento")
+st.sidebar.info("Estos valores definen el % de Deuda sobre el Total del Portafolio.")
+TARGET_LTV_BASE = st.sidebar.slider("Target LTV Base (%)", 0.0, 0.50, 0.25)
+TARGET_LTV_AGRESIVO = st.sidebar.slider("Target LTV Agresivo (%)", 0.0, 0.60, 0.40) # Has pedido 1.75 antes, aquí es LTV Global, 40% es muy agresivo ya.
+UMBRAL_DD_AGRESIVO = st.sidebar.slider("Activar Agresivo si DD > (%)", 0.10, 0.50, 0.30)
+
+st.sidebar.header("4. Filtros de Seguridad (Safe Mode)")
+UMBRAL_DD_SAFE = st.sidebar.slider("Drawdown es menor a (%)", 0.0, 0.10, 0.05)
+UMBRAL_LTV_SAFE = st.sidebar.slider("LTV Actual supera el (%)", 0.10, 0.60, 0.40)
+
+st.sidebar.header("5. Defensa y Liquidación")
+LIQ_THRESHOLD = st.sidebar.number_input("Liquidation Threshold (%)", min_value=1.0, value=75.0) / 100
+PCT_UMBRAL_DEFENSA = st.sidebar.slider("Activar Defensa al % del Liq. Threshold", 0.50, 0.95, 0.80)
+TRIGGER_DEFENSA_LTV = LIQ_THRESHOLD * PCT_UMBRAL_DEFENSA
+MULTIPLO_DEFENSA = st.sidebar.number_input("Multiplicador Aportación en Defensa", value=2.0)
+
+st.sidebar.header("6. Aportaciones Extraordinarias")
+UMBRAL_DD_EXTRA = st.sidebar.slider("Aportar Extra si DD > (%)", 0.30, 0.90, 0.60)
+MONTO_EXTRA = st.sidebar.number_input("Monto Extra ($)", value=100)
+
+st.sidebar.header("7. Barrido de Parámetros (Opcional)")
+BARRIDO_ACTIVO = st.sidebar.checkbox("Activar barrido 2D", value=False)
+if BARRIDO_ACTIVO:
+    nombres_barrido = {clave: etiqueta for clave, (etiqueta, _, _) in PARAMETROS_BARRIDO.items()}
+    claves_barrido = list(nombres_barrido)
+    BARRIDO_X = st.sidebar.selectbox("Parámetro eje X", claves_barrido, index=claves_barrido.index("target_ltv_agresivo"), format_func=nombres_barrido.get)
+    _, min_x, max_x = PARAMETROS_BARRIDO[BARRIDO_X]
+    RANGO_X = st.sidebar.slider("Rango eje X", min_x, max_x, (min_x, max_x))
+    BARRIDO_Y = st.sidebar.selectbox("Parámetro eje Y", claves_barrido, index=claves_barrido.index("umbral_dd_agresivo"), format_func=nombres_barrido.get)
+    _, min_y, max_y = PARAMETROS_BARRIDO[BARRIDO_Y]
+    RANGO_Y = st.sidebar.slider("Rango eje Y", min_y, max_y, (min_y, max_y))
+    PASOS_BARRIDO = st.sidebar.slider("Puntos por eje", 5, 50, 20)
+
+st.sidebar.header("8. Monte Carlo (Opcional)")
+MONTECARLO_ACTIVO = st.sidebar.checkbox("Activar Monte Carlo", value=False)
+if MONTECARLO_ACTIVO:
+    MC_CAMINOS = st.sidebar.select_slider("Caminos simulados", [500, 1000, 2000, 5000, 10000, 20000], value=2000)
+    MC_ANYOS = st.sidebar.slider("Horizonte (años)", 1, 10, 5)
+    MC_METODO = st.sidebar.selectbox("Generador de caminos", METODOS_MC)
+    MC_BLOQUE = st.sidebar.slider("Tamaño de bloque (días)", 5, 120, 30) if MC_METODO == METODOS_MC[0] else 1
+
+st.sidebar.header("9. Fechas de Inicio (Opcional)")
+INICIOS_ACTIVO = st.sidebar.checkbox("Analizar todas las fechas de inicio", value=False)
+if INICIOS_ACTIVO:
+    INICIOS_PASO = st.sidebar.slider("Evaluar cada N días", 1, 30, 1)
+    INICIOS_HORIZONTE = st.sidebar.slider("Horizonte mínimo (días)", 90, 1460, 365)
+
+st.sidebar.header("10. Optimizador (Opcional)")
+OPTIMIZAR_ACTIVO = st.sidebar.checkbox("Buscar los mejores parámetros", value=False)
+if OPTIMIZAR_ACTIVO:
+    OPT_OBJETIVO = st.sidebar.selectbox("Maximizar", list(OBJETIVOS_OPT), format_func=OBJETIVOS_OPT.get)
+    OPT_LTV_TOPE = st.sidebar.slider("LTV máximo permitido (%)", 10, 95, 60) / 100
+    OPT_CANDIDATOS = st.sidebar.select_slider("Combinaciones a probar", [81, 243, 729, 2187], value=243)
+
+st.sidebar.header("11. Diagnóstico")
+# En producción se puede dejar activado para todos con DCA_PERFIL=1
+DIAGNOSTICO = st.sidebar.checkbox("Medir tiempos de la ejecución", value=os.environ.get("DCA_PERFIL", "0") == "1")
+RUTA_PERFIL = DIRECTORIO_DATOS / "perfil.jsonl"
+
+# ==========================================
+# ⚙️ FUNCIONES AUXILIARES
+# ==========================================
+
+@st.cache_resource
+def almacen_precios():
+    return AlmacenPrecios()
+
+# Tamaño máximo de la caché de simulaciones compartida por todas las sesiones del proceso
+MAX_MB_SIMULACIONES = int(os.environ.get("DCA_CACHE_MB", "256"))
+
+@st.cache_resource
+def cache_simulaciones():
+    return CacheCompartida(MAX_MB_SIMULACIONES * 2**20)
+
+@st.cache_data(max_entries=20, show_spinner=False)
+def grafico_resultado(_resultado, huella, liq_threshold, trigger_defensa):
+    # Se cachea por la huella: un resultado que no cambia no se vuelve a dibujar
+    perfil.fallo_cache("grafico")
+    return png_resultado(_resultado, liq_threshold, trigger_defensa)
+
+def calcular_simulacion(data, clave_datos, parametros, resolucion, anterior=None):
+    perfil.fallo_cache("simulacion")
+    tickers, pesos = clave_datos[0], clave_datos[1]
+    if resolucion != "Diaria":
+        return simular_intradia(data, parametros)
+    if len(tickers) > 1:
+        return simular_cartera(data, data.index, np.array(pesos), parametros)
+    return simular(data.values, data.index, parametros, anterior=anterior)
+
+# Memorización de las simulaciones en la caché compartida: los aciertos no copian el resultado
+# y una simulación pedida a la vez por varias sesiones se calcula una vez. Los precios no
+# forman parte de la clave: `clave_datos` los identifica por tickers, pesos, fecha de inicio
+# y última barra. `anterior` tampoco; solo acelera el cálculo, el resultado es el mismo.
+def simulacion_memo(data, clave_datos, parametros, resolucion, anterior=None):
+    return cache_simulaciones().obtener((clave_datos, parametros, resolucion), calcular_simulacion,
+                                        data, clave_datos, parametros, resolucion, anterior)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def barrido_memo(_data, clave_datos, parametros, param_x, rango_x, param_y, rango_y, pasos):
+    perfil.fallo_cache("barrido")
+    return barrido_2d(_data.values, _data.index, parametros,
+                      param_x, np.linspace(*rango_x, pasos), param_y, np.linspace(*rango_y, pasos))
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def montecarlo_memo(_data, clave_datos, parametros, caminos, anyos, metodo, bloque):
+    perfil.fallo_cache("montecarlo")
+    return simular_montecarlo(_data, parametros, caminos, anyos, metodo, bloque)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def inicios_memo(_data, clave_datos, parametros, paso, horizonte):
+    perfil.fallo_cache("inicios")
+    return analisis_inicios(_data, parametros, paso, horizonte)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def optimizacion_memo(_data, clave_datos, parametros, objetivo, ltv_tope, candidatos):
+    perfil.fallo_cache("optimizador")
+    return optimizar(_data.values, _data.index, parametros, objetivo, ltv_tope, n_candidatos=candidatos)
+
+def memorizado(nombre, funcion, *args):
+    # Cuenta la consulta a caché y su tiempo; la función apunta el fallo si llega a ejecutarse
+    perfil.consulta_cache(nombre)
+    with perfil.fase(nombre):
+        return funcion(*args)
+
+def cifra(valor, formato):
+    """Número formateado para la tabla resumen ("—" si no está definido, p. ej. Sharpe sin volatilidad)."""
+    return "—" if np.isnan(valor) else format(valor, formato)
+
+def descargar_datos(ticker, inicio):
+    # Histórico completo en disco; solo se descarga la cola que falta
+    return almacen_precios().serie(ticker, inicio)
+
+@st.cache_data(ttl=900, max_entries=4, show_spinner=False)
+def descargar_barras(ticker, inicio, intervalo):
+    perfil.fallo_cache("barras_intradia")
+    return descargar_intradia(ticker, inicio, intervalo)
+
+@st.cache_resource
+def cliente_moosend():
+    # Un único cliente por servidor: sesión keep-alive, pool de envíos y cola en disco
+    try:
+        api_key = st.secrets["MOOSEND_API_KEY"]
+    except Exception:
+        # Sin fichero de secrets o sin la clave
+        return None
+    return ClienteMoosend(api_key, ColaSuscripciones(DIRECTORIO_DATOS / "suscripciones.sqlite"))
+
+@st.fragment(run_every=2)
+def esperar_suscripcion():
+    # Solo se dibuja mientras el alta está pendiente: al terminar relanza la
+    # página una vez y el sondeo desaparece
+    futuro = st.session_state.get("suscripcion")
+    if futuro is None or futuro.done():
+        st.rerun()
+    st.info("⏳ Enviando tu suscripción...")
+
+def estado_suscripcion():
+    """Muestra el resultado del alta en segundo plano sin bloquear la página."""
+    futuro = st.session_state.get("suscripcion")
+    if futuro is None:
+        return
+    if not futuro.done():
+        esperar_suscripcion()
+        return
+    exito, mensaje = futuro.result()
+    if exito:
+        st.success(mensaje)
+        if not st.session_state.get("suscripcion_celebrada"):
+            st.session_state.suscripcion_celebrada = True
+            st.balloons() # ¡Un pequeño efecto visual de éxito!
+    elif exito is None:
+        st.info(mensaje)
+    else:
+        st.error(mensaje)
+
+# ==========================================
+# 🧩 PANELES (FRAGMENTOS)
+# ==========================================
+# Se vuelven a ejecutar por separado: interactuar con ellos no relanza el motor
+
+def medido(nombre):
+    """
+    Cuando Streamlit relanza solo el fragmento, mide esa ejecución en un Perfil
+    propio y la añade al log; dentro de la ejecución completa suma al de la página.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltorio(*args, **kwargs):
+            contexto = get_script_run_ctx()
+            if not DIAGNOSTICO or contexto is None or not contexto.fragment_ids_this_run:
+                return funcion(*args, **kwargs)
+            with perfil.Perfil(f"{TICKER} [{nombre}]") as perfil_fragmento:
+                resultado = funcion(*args, **kwargs)
+            perfil_fragmento.escribir(RUTA_PERFIL)
+            return resultado
+        return envoltorio
+    return decorador
+
+@st.fragment
+@medido("panel_resultados")
+def panel_resultados(resultado, data, clave_datos, parametros, es_cesta, intradia):
+    dinero_invertido = resultado.dinero_invertido
+    deuda_acumulada = resultado.deuda_acumulada
+    intereses_pagados = resultado.intereses_pagados
+    bench_invertido = resultado.bench_invertido
+    liquidado = resultado.liquidado
+    fecha_liq = resultado.fecha_liq
+
+    with perfil.fase("tabla.registros"):
+        df_reg = tabla_operaciones(resultado.registros)
+    
+    # --- CÁLCULOS FINALES ---
+    resumen = calcular_resumen(resultado)
+    strat_val_final, strat_roi, strat_cagr = resumen['strat_val_final'], resumen['strat_roi'], resumen['strat_cagr']
+    bench_val_final, bench_roi, bench_cagr = resumen['bench_val_final'], resumen['bench_roi'], resumen['bench_cagr']
+    
+    # ==========================================
+    # 📊 PRESENTACIÓN DE RESULTADOS
+    # ==========================================
+    
+    st.divider()
+    st.subheader("🏆 Comparativa de Rendimiento")
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Valor Neto Estrategia", f"${strat_val_final:,.2f}", f"{strat_roi:.2f}% ROI")
+    col2.metric("Valor Neto Benchmark", f"${bench_val_final:,.2f}", f"{bench_roi:.2f}% ROI")
+    delta_cagr = (strat_cagr - bench_cagr) * 100
+    col3.metric("CAGR Estrategia vs Bench", f"{strat_cagr*100:.2f}%", f"{delta_cagr:+.2f}% Dif")
+    
+    # --- TABLA RESUMEN ---
+    # Métricas de riesgo acumuladas por el motor durante la simulación
+    riesgo, riesgo_bench = resultado.riesgo, resultado.riesgo_bench
+    resumen_data = {
+        "Métrica": ["Inversión Bolsillo (Total)", "Valor Final (Equity)", "ROI Total", "CAGR (Anualizado)", "Deuda Final / Coste",
+                    "Máx. Drawdown (Equity)", "Días Bajo el Agua (Racha Máx.)", "Sharpe / Sortino",
+                    "LTV Máximo / Días sobre Defensa", "Intereses / Ganancia Bruta"],
+        "🤖 Tu Estrategia (Target LTV)": [
+            f"${dinero_invertido:,.0f}", f"${strat_val_final:,.2f}", f"{strat_roi:.2f}%", f"{strat_cagr*100:.2f}%",
+            f"${deuda_acumulada:,.0f} (Int: ${intereses_pagados:,.0f})",
+            f"{riesgo.max_drawdown*100:.1f}%", f"{riesgo.dias_bajo_agua:,} ({riesgo.racha_bajo_agua:,})",
+            f"{cifra(riesgo.sharpe, '.2f')} / {cifra(riesgo.sortino, '.2f')}",
+            f"{riesgo.ltv_max*100:.1f}% / {riesgo.dias_defensa:,}", cifra(riesgo.peso_intereses, '.1%')
+        ],
+        "🐢 Benchmark (DCA Puro)": [
+            f"${bench_invertido:,.0f}", f"${bench_val_final:,.2f}", f"{bench_roi:.2f}%", f"{bench_cagr*100:.2f}%",
+            "$0",
+            f"{riesgo_bench.max_drawdown*100:.1f}%", f"{riesgo_bench.dias_bajo_agua:,} ({riesgo_bench.racha_bajo_agua:,})",
+            f"{cifra(riesgo_bench.sharpe, '.2f')} / {cifra(riesgo_bench.sortino, '.2f')}",
+            "—", "—"
+        ]
+    }
+    st.table(pd.DataFrame(resumen_data))
+    
+    if isinstance(resultado, ResultadoIntradia):
+        st.caption(f"Modo intradía: {resultado.barras:,} barras de {RESOLUCION}. "
+                   f"Peor LTV intradía (sobre mínimos): {resultado.ltv_peor.max()*100:.1f}%.")
+    if liquidado:
+        st.error(f"☠️ ATENCIÓN: La estrategia fue LIQUIDADA el {fecha_liq.strftime('%Y-%m-%d %H:%M' if intradia else '%Y-%m-%d')}.")
+
+    # --- GRÁFICOS ---
+    nombres_tabs = ["Gráficos", "Operaciones"]
+    nombres_tabs += ["Barrido 2D"] if BARRIDO_ACTIVO else []
+    nombres_tabs += ["Monte Carlo"] if MONTECARLO_ACTIVO else []
+    nombres_tabs += ["Fechas de Inicio"] if INICIOS_ACTIVO else []
+    nombres_tabs += ["Optimizador"] if OPTIMIZAR_ACTIVO else []
+    tabs = dict(zip(nombres_tabs, st.tabs(nombres_tabs)))
+    tab1, tab2 = tabs["Gráficos"], tabs["Operaciones"]
+    with tab1:
+        png = memorizado("grafico", grafico_resultado, resultado, huella_resultado(resultado), LIQ_THRESHOLD, TRIGGER_DEFENSA_LTV)
+        st.image(png, use_container_width=True)
+        
+    with tab2:
+        # Solo se envía al navegador la página visible
+        total_paginas = paginas(len(df_reg))
+        num_pagina = st.number_input("Página", 1, total_paginas, 1) if total_paginas > 1 else 1
+        with perfil.fase("tabla.st_dataframe"):
+            st.dataframe(pagina(df_reg, num_pagina))
+        st.caption(f"Página {num_pagina} de {total_paginas} · {len(df_reg):,} operaciones ({FILAS_POR_PAGINA} por página).")
+
+        # Exportación: el fichero se genera al pulsar el botón, por trozos en un temporal en disco que se cierra al leerlo
+        formato = st.radio("Formato de exportación", list(FORMATOS_EXPORTACION), horizontal=True)
+        extension, mime = FORMATOS_EXPORTACION[formato]
+        exp1, exp2 = st.columns(2)
+        exp1.download_button("⬇️ Historia diaria", lambda: exportar(columnas_historia(resultado), formato),
+                             file_name=f"historia.{extension}", mime=mime)
+        exp2.download_button("⬇️ Operaciones", lambda: exportar(columnas_operaciones(df_reg), formato),
+                             file_name=f"operaciones.{extension}", mime=mime)
+
+    if BARRIDO_ACTIVO:
+        with tabs["Barrido 2D"]:
+            if es_cesta:
+                st.info("ℹ️ El barrido 2D solo está disponible para un único activo.")
+            elif intradia:
+                st.info("ℹ️ El barrido 2D solo está disponible con resolución diaria.")
+            elif BARRIDO_X == BARRIDO_Y:
+                st.warning("⚠️ Elige dos parámetros distintos para el barrido.")
+            else:
+                with st.spinner(f"Simulando {PASOS_BARRIDO * PASOS_BARRIDO} combinaciones..."):
+                    res_barrido = memorizado("barrido", barrido_memo, data, clave_datos, parametros, BARRIDO_X, RANGO_X, BARRIDO_Y, RANGO_Y, PASOS_BARRIDO)
+                st.pyplot(figura_barrido(res_barrido))
+                st.caption(f"Combinaciones liquidadas: {res_barrido.liquidado.sum()} de {res_barrido.liquidado.size}.")
+                with st.expander("📋 Resultado y riesgo de cada combinación"):
+                    st.dataframe(tabla_barrido(res_barrido), hide_index=True)
+
+    if MONTECARLO_ACTIVO:
+        with tabs["Monte Carlo"]:
+            if es_cesta:
+                st.info("ℹ️ El modo Monte Carlo solo está disponible para un único activo.")
+            elif intradia:
+                st.info("ℹ️ El modo Monte Carlo solo está disponible con resolución diaria.")
+            else:
+                with st.spinner(f"Simulando {MC_CAMINOS} caminos de {MC_ANYOS} años..."):
+                    res_mc = memorizado("montecarlo", montecarlo_memo, data, clave_datos, parametros, MC_CAMINOS, MC_ANYOS, MC_METODO, MC_BLOQUE)
+                mc1, mc2, mc3 = st.columns(3)
+                mc1.metric("💀 Probabilidad de Liquidación", f"{res_mc.prob_liquidacion*100:.1f}%")
+                mc2.metric("Supera al Benchmark", f"{res_mc.prob_supera_bench*100:.1f}%")
+                mc3.metric("Equity Mediana Estrategia", f"${np.median(res_mc.equity_final):,.0f}",
+                           f"Bench: ${np.median(res_mc.bench_final):,.0f}", delta_color="off")
+                st.pyplot(figura_montecarlo(res_mc, LIQ_THRESHOLD, TRIGGER_DEFENSA_LTV))
+                st.write("**Métricas de riesgo entre caminos (percentiles)**")
+                st.dataframe(res_mc.tabla_riesgo())
+
+    if INICIOS_ACTIVO:
+        with tabs["Fechas de Inicio"]:
+            if es_cesta:
+                st.info("ℹ️ El análisis de fechas de inicio solo está disponible para un único activo.")
+            elif intradia:
+                st.info("ℹ️ El análisis de fechas de inicio solo está disponible con resolución diaria.")
+            else:
+                try:
+                    with st.spinner("Simulando todas las fechas de inicio..."):
+                        tabla_inicios = memorizado("inicios", inicios_memo, data, clave_datos, parametros, INICIOS_PASO, INICIOS_HORIZONTE)
+                except ValueError as e:
+                    st.warning(f"⚠️ {e}")
+                else:
+                    in1, in2, in3 = st.columns(3)
+                    in1.metric("Fechas de inicio evaluadas", f"{len(tabla_inicios)}")
+                    in2.metric("💀 Terminan Liquidadas", f"{tabla_inicios['liquidado'].mean()*100:.1f}%")
+                    in3.metric("Superan al Benchmark", f"{(tabla_inicios['exceso'] > 0).mean()*100:.1f}%",
+                               f"Exceso mediano: {tabla_inicios['exceso'].median()*100:+.2f}%")
+                    st.pyplot(figura_inicios(tabla_inicios))
+                    with st.expander("📋 Resultado y riesgo de cada fecha de inicio"):
+                        st.dataframe(tabla_inicios)
+
+    if OPTIMIZAR_ACTIVO:
+        with tabs["Optimizador"]:
+            if es_cesta:
+                st.info("ℹ️ El optimizador solo está disponible para un único activo.")
+            elif intradia:
+                st.info("ℹ️ El optimizador solo está disponible con resolución diaria.")
+            else:
+                with st.spinner(f"Probando {OPT_CANDIDATOS} combinaciones..."):
+                    res_opt = memorizado("optimizador", optimizacion_memo, data, clave_datos, parametros, OPT_OBJETIVO, OPT_LTV_TOPE, OPT_CANDIDATOS)
+                if res_opt.mejor is None:
+                    st.warning(f"⚠️ Ninguna combinación evita la liquidación con un LTV máximo del {OPT_LTV_TOPE*100:.0f}%.")
+                else:
+                    mejor = res_opt.mejor
+                    op1, op2, op3 = st.columns(3)
+                    op1.metric("CAGR Óptimo", f"{mejor['cagr']*100:.2f}%", f"{(mejor['cagr'] - strat_cagr)*100:+.2f}% vs actual")
+                    op2.metric("Equity Final", f"${mejor['equity']:,.0f}")
+                    op3.metric("LTV Máximo", f"{mejor['ltv_max']*100:.1f}%")
+                    st.table(pd.DataFrame({
+                        "Parámetro": [PARAMETROS_BARRIDO[c][0] for c in res_opt.parametros],
+                        "Actual": [getattr(parametros, c) for c in res_opt.parametros],
+                        "Óptimo": [mejor[c] for c in res_opt.parametros],
+                    }))
+                    st.pyplot(figura_optimizacion(res_opt))
+                    st.dataframe(res_opt.frontera)
+                st.caption(f"{OPT_CANDIDATOS} combinaciones en {len(res_opt.rondas)} rondas; "
+                           f"simuladas sobre el histórico completo: {len(res_opt.completos)}.")
+
+@st.fragment
+@medido("formulario_suscripcion")
+def formulario_suscripcion():
+    st.markdown("---")
+    st.subheader("📬 ¿Quieres descubrir más estrategias institucionales?")
+    st.write("Suscríbete para recibir alertas sobre nuevos algoritmos DeFi y análisis de mercado.")
+    
+    cliente = cliente_moosend()
+    if cliente is not None:
+        cliente.reintentar_pendientes()
+
+    # Usamos 'clear_on_submit=False' para que no se borren los datos si hay error
+    with st.form("moosend_form", clear_on_submit=False):
+        col_form_1, col_form_2 = st.columns(2)
+        
+        with col_form_1:
+            # El placeholder ayuda al usuario a saber qué poner
+            nombre_usuario = st.text_input("Nombre", placeholder="Ej: Satoshi")
+        
+        with col_form_2:
+            email_usuario = st.text_input("Correo Electrónico", placeholder="Ej: satoshi@bitcoin.org")
+        
+        # El botón de envío
+        submit_btn = st.form_submit_button("Enviar y Suscribirme", type="primary")
+        
+        if submit_btn:
+            # 1. Validación: ¿El nombre está vacío?
+            if not nombre_usuario.strip():
+                st.warning("⚠️ Por favor, dinos tu nombre antes de enviar.")
+            
+            # 2. Validación: ¿El email está vacío?
+            elif not email_usuario.strip():
+                st.error("⚠️ El campo de correo electrónico es obligatorio.")
+            
+            # 3. Validación: ¿El email parece válido? (Tiene @)
+            elif "@" not in email_usuario:
+                 st.error("⚠️ Por favor, introduce un correo electrónico válido.")
+            
+            # 4. Si todo está bien, se encola y se envía en segundo plano
+            elif cliente is None:
+                st.error("❌ Error Crítico: No has configurado el 'Secret'. Ve a Settings > Secrets en Streamlit.")
+            else:
+                st.session_state.suscripcion = cliente.suscribir(nombre_usuario, email_usuario)
+                st.session_state.suscripcion_celebrada = False
+
+    estado_suscripcion()
+
+# ==========================================
+# 🚀 MOTOR DE SIMULACIÓN
+# ==========================================
+
+# ==========================================
+# 🚀 MOTOR DE SIMULACIÓN CON MEMORIA
+# ==========================================
+
+# 1. Inicializar el estado si no existe
+if 'simulacion_realizada' not in st.session_state:
+    st.session_state.simulacion_realizada = False
+
+# 2. Si pulsan el botón, activamos el estado
+if st.sidebar.button("EJECUTAR SIMULACIÓN", type="primary"):
+    st.session_state.simulacion_realizada = True
+
+# 3. Comprobamos el estado en lugar del botón directo
+if st.session_state.simulacion_realizada:
+    
+    perfil_ejecucion = perfil.iniciar(TICKER, activo=DIAGNOSTICO)
+
+    with st.spinner('Simulando Estrategia vs Benchmark...'):
+        # 1. Datos
+        try:
+            TICKERS_CESTA, PESOS_CESTA = parsear_cesta(TICKER)
+            ES_CESTA = len(TICKERS_CESTA) > 1
+            if ES_CESTA and INTRADIA:
+                raise ValueError("El modo intradía solo está disponible para un único activo.")
+            with perfil.fase("datos"):
+                if ES_CESTA:
+                    data = descargar_cesta(almacen_precios(), TICKERS_CESTA, FECHA_INICIO)
+                elif INTRADIA:
+                    data = memorizado("barras_intradia", descargar_barras, TICKERS_CESTA[0], FECHA_INICIO, RESOLUCION)
+                else:
+                    data = descargar_datos(TICKERS_CESTA[0], FECHA_INICIO)
+        except Exception as e:
+            st.error(f"Error descargando datos: {e}")
+            st.stop()
+            
+        parametros = ParametrosEstrategia(
+            inversion_inicial=INVERSION_INICIAL, coste_deuda_apr=COSTE_DEUDA_APR,
+            frecuencia=FRECUENCIA, dia_semana_idx=globals().get('DIA_SEMANA_IDX'), dia_mes=globals().get('DIA_MES'),
+            aportacion_base=APORTACION_BASE, umbral_inicio_dca=UMBRAL_INICIO_DCA,
+            target_ltv_base=TARGET_LTV_BASE, target_ltv_agresivo=TARGET_LTV_AGRESIVO, umbral_dd_agresivo=UMBRAL_DD_AGRESIVO,
+            umbral_dd_safe=UMBRAL_DD_SAFE, umbral_ltv_safe=UMBRAL_LTV_SAFE,
+            liq_threshold=LIQ_THRESHOLD, pct_umbral_defensa=PCT_UMBRAL_DEFENSA, multiplo_defensa=MULTIPLO_DEFENSA,
+            umbral_dd_extra=UMBRAL_DD_EXTRA, monto_extra=MONTO_EXTRA,
+        )
+        
+        # 2. Motor (salta de un día de compra al siguiente), memorizado por datos y parámetros
+        clave_datos = (tuple(TICKERS_CESTA), tuple(PESOS_CESTA), FECHA_INICIO, data.index[-1], len(data), tuple(np.ravel(data.iloc[-1])))
+        # Al mover un control se reanuda la simulación anterior desde el primer día que cambia
+        anterior = st.session_state.get("ultima_simulacion")
+        anterior = anterior[1] if anterior is not None and anterior[0] == (clave_datos, RESOLUCION) else None
+        resultado = memorizado("simulacion", simulacion_memo, data, clave_datos, parametros, RESOLUCION, anterior)
+        st.session_state.ultima_simulacion = ((clave_datos, RESOLUCION), resultado)
+        
+        with perfil.fase("panel"):
+            panel_resultados(resultado, data, clave_datos, parametros, ES_CESTA, INTRADIA)
+
+       # ==========================================
+        # 📝 INFORME DINÁMICO (CORREGIDO)
+        # ==========================================
+        st.markdown("---")
+        st.subheader("📄 Informe de Estrategia Generada")
+        
+        valor_defensa_aprox = APORTACION_BASE * MULTIPLO_DEFENSA
+        
+        # NOTA: He añadido una barra invertida (\) antes de cada signo $ 
+        # para evitar que Streamlit lo interprete como fórmula matemática.
+        
+        informe_texto = f"""
+        ### 1. Perfil de Inversión
+        Has configurado una estrategia para **{TICKER}** con una inversión inicial de **\${INVERSION_INICIAL}**.
+        
+        El sistema realizará aportaciones periódicas de **\${APORTACION_BASE}** con una frecuencia **{FRECUENCIA}**.
+        
+        > *Objetivo:* Acumular activo aprovechando la volatilidad, utilizando deuda inteligente para potenciar el retorno sin comprometer la seguridad.
+
+        ### 2. Mecánica de Entrada (Sniper)
+        A diferencia de un DCA ciego, este algoritmo **permanecerá en espera** al inicio. No ejecutará la primera compra recurrente hasta que el mercado no sufra una corrección (Drawdown) superior al **{UMBRAL_INICIO_DCA*100:.0f}%**. Esto evita comprar sistemáticamente en techos de mercado.
+
+        ### 3. Gestión de Deuda (Target LTV)
+        La estrategia no utiliza un apalancamiento fijo, sino que ajusta dinámicamente tu deuda para mantener un nivel de riesgo constante sobre el total de tu cartera:
+        * **Escenario Base:** Buscará mantener un LTV (Deuda/Colateral) del **{TARGET_LTV_BASE*100:.0f}%**.
+        * **Escenario Agresivo:** Si el mercado cae más de un **{UMBRAL_DD_AGRESIVO*100:.0f}%**, el sistema aumentará el riesgo buscando un LTV del **{TARGET_LTV_AGRESIVO*100:.0f}%** para comprar más barato.
+        * **Modo Seguro (Safe Mode):** Si el mercado está cerca de máximos (caída < **{UMBRAL_DD_SAFE*100:.0f}%**) o tu deuda ya es elevada (> **{UMBRAL_LTV_SAFE*100:.0f}%** LTV), el sistema **dejará de pedir prestado** y comprará solo con tu efectivo.
+
+        ### 4. Protocolos de Seguridad y Defensa
+        * **Defensa Activa:** Si en algún momento tu LTV cruza la línea roja del **{TRIGGER_DEFENSA_LTV*100:.0f}%** (calculado sobre tu umbral de liquidación), el sistema activará el "Modo Pánico": inyectará **{MULTIPLO_DEFENSA}x** veces tu aportación habitual (aprox **\${valor_defensa_aprox}**) sin deuda para diluir el riesgo inmediatamente.
+        * **Coste Financiero:** El modelo asume un coste de la deuda del **{COSTE_DEUDA_APR*100:.1f}%** anual, que se acumula diariamente en contra de tu patrimonio neto.
+        """
+        st.markdown(informe_texto)
+        
+       # ==========================================
+        # 📧 FORMULARIO MOOSEND (MEJORADO)
+        # ==========================================
+        formulario_suscripcion()
+
+        # ==========================================
+        # 🛠️ DIAGNÓSTICO (OPCIONAL)
+        # ==========================================
+        if perfil_ejecucion is not None:
+            perfil.anotar("cache_simulaciones", cache_simulaciones().metricas())
+            perfil.anotar("descargas_precios", almacen_precios().descargas.metricas())
+            registro = perfil_ejecucion.escribir(RUTA_PERFIL)
+            # Lo que venga después en este hilo (p. ej. un fragmento relanzado) ya no es de esta ejecución
+            perfil.terminar(perfil_ejecucion)
+            with st.expander("🛠️ Diagnóstico de la ejecución"):
+                st.metric("Tiempo total", f"{registro['total_s']*1000:,.0f} ms")
+                fases = pd.Series(registro['fases'], name="Segundos").sort_values(ascending=False)
+                st.dataframe(pd.DataFrame({"Segundos": fases, "% del total": fases / registro['total_s'] * 100}))
+                col_diag_1, col_diag_2 = st.columns(2)
+                col_diag_1.write("**Contadores**")
+                col_diag_1.json(registro['contadores'])
+                col_diag_2.write("**Caché**")
+                col_diag_2.json(registro['cache'])
+                st.write("**Compartido por todas las sesiones del proceso**")
+                st.json(registro['anotaciones'])
+                st.caption(f"Cada ejecución, y cada fragmento relanzado por separado, se añade a `{RUTA_PERFIL}`.")
+
@@ -0,0 +1,107 @@
+"""
+Barrido 2-D de parámetros.
+
+Cada celda de la rejilla es un carril del motor por lotes, así que la rejilla
+completa se simula en una sola pasada sobre los días de compra, con las
+métricas de riesgo de cada celda acumuladas por el propio motor.
+"""
+from dataclasses import dataclass, fields
+
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from motor import simular_lote
+from riesgo import MetricasRiesgo
+
+# Parámetros barribles: etiqueta y rango por defecto (los mismos del panel lateral)
+PARAMETROS_BARRIDO = {
+    "umbral_inicio_dca": ("Iniciar DCA tras Drawdown > (%)", 0.05, 0.50),
+    "target_ltv_base": ("Target LTV Base (%)", 0.0, 0.50),
+    "target_ltv_agresivo": ("Target LTV Agresivo (%)", 0.0, 0.60),
+    "umbral_dd_agresivo": ("Activar Agresivo si DD > (%)", 0.10, 0.50),
+    "umbral_dd_safe": ("Safe: Drawdown menor a (%)", 0.0, 0.10),
+    "umbral_ltv_safe": ("Safe: LTV supera el (%)", 0.10, 0.60),
+    "liq_threshold": ("Liquidation Threshold (%)", 0.50, 0.95),
+    "pct_umbral_defensa": ("Activar Defensa al % del Liq. Threshold", 0.50, 0.95),
+    "multiplo_defensa": ("Multiplicador Aportación en Defensa", 1.0, 5.0),
+    "umbral_dd_extra": ("Aportar Extra si DD > (%)", 0.30, 0.90),
+    "coste_deuda_apr": ("Coste Deuda (APR)", 0.0, 0.20),
+}
+
+@dataclass
+class ResultadoBarrido:
+    """Matrices (valores_y × valores_x) con el resultado de cada combinación."""
+    param_x: str
+    valores_x: np.ndarray
+    param_y: str
+    valores_y: np.ndarray
+    equity: np.ndarray
+    cagr: np.ndarray
+    bench_cagr: np.ndarray
+    liquidado: np.ndarray
+    fecha_liq: np.ndarray
+    riesgo: MetricasRiesgo | None = None
+
+def barrido_2d(precios, fechas, p, param_x, valores_x, param_y, valores_y):
+    """Simula todas las combinaciones de `valores_x` × `valores_y` sobre los parámetros base `p`."""
+    if param_x == param_y:
+        raise ValueError("Elige dos parámetros distintos para el barrido.")
+    valores_x = np.asarray(valores_x, dtype=float)
+    valores_y = np.asarray(valores_y, dtype=float)
+    rejilla_x, rejilla_y = np.meshgrid(valores_x, valores_y)
+    res = simular_lote(precios, fechas, p, {param_x: rejilla_x.ravel(), param_y: rejilla_y.ravel()},
+                       metricas_riesgo=True)
+    forma = rejilla_x.shape
+    return ResultadoBarrido(
+        param_x=param_x, valores_x=valores_x, param_y=param_y, valores_y=valores_y,
+        equity=res.equity_final.reshape(forma),
+        cagr=res.cagr.reshape(forma),
+        bench_cagr=res.bench_cagr.reshape(forma),
+        liquidado=res.liquidado.reshape(forma),
+        fecha_liq=res.fecha_liq.to_numpy().reshape(forma),
+        riesgo=MetricasRiesgo(**{f.name: getattr(res.riesgo, f.name).reshape(forma) for f in fields(MetricasRiesgo)}),
+    )
+
+def tabla_barrido(res):
+    """Una fila por combinación con su resultado y sus métricas de riesgo."""
+    rejilla_x, rejilla_y = np.meshgrid(res.valores_x, res.valores_y)
+    columnas = {
+        res.param_x: rejilla_x.ravel(), res.param_y: rejilla_y.ravel(),
+        'equity_final': res.equity.ravel(), 'cagr': res.cagr.ravel(), 'bench_cagr': res.bench_cagr.ravel(),
+        'liquidado': res.liquidado.ravel(), 'fecha_liq': res.fecha_liq.ravel(),
+    }
+    if res.riesgo is not None:
+        columnas.update({f.name: getattr(res.riesgo, f.name).ravel() for f in fields(MetricasRiesgo)})
+    return pd.DataFrame(columnas)
+
+def figura_barrido(res):
+    """Mapas de calor de equity final, CAGR y fecha de liquidación."""
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5.5))
+    extension = [res.valores_x[0], res.valores_x[-1], res.valores_y[0], res.valores_y[-1]]
+    opciones = dict(origin='lower', aspect='auto', extent=extension, interpolation='nearest')
+
+    im = axes[0].imshow(res.equity, cmap='viridis', **opciones)
+    axes[0].set_title("Equity Final ($)", fontweight='bold')
+    fig.colorbar(im, ax=axes[0])
+
+    limite = max(abs(np.nanmin(res.cagr)), abs(np.nanmax(res.cagr)), 1e-9) * 100
+    im = axes[1].imshow(res.cagr * 100, cmap='RdYlGn', vmin=-limite, vmax=limite, **opciones)
+    axes[1].set_title("CAGR (%)", fontweight='bold')
+    fig.colorbar(im, ax=axes[1])
+
+    fecha_num = np.full(res.fecha_liq.shape, np.nan)
+    if res.liquidado.any():
+        fecha_num[res.liquidado] = mdates.date2num(res.fecha_liq[res.liquidado])
+    im = axes[2].imshow(np.ma.masked_invalid(fecha_num), cmap='Reds_r', **opciones)
+    axes[2].set_title("Fecha de Liquidación (blanco = nunca)", fontweight='bold')
+    if res.liquidado.any():
+        barra = fig.colorbar(im, ax=axes[2])
+        barra.ax.yaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
+
+    for ax in axes:
+        ax.set_xlabel(PARAMETROS_BARRIDO[res.param_x][0])
+        ax.set_ylabel(PARAMETROS_BARRIDO[res.param_y][0])
+    fig.tight_layout()
+    return fig
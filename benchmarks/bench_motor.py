@@ -0,0 +1,75 @@
+"""
+Benchmark del motor sobre series sintéticas deterministas.
+
+    python benchmarks/bench_motor.py                 # 1k, 10k y 1M barras
+    python benchmarks/bench_motor.py --barras 10000 --repeticiones 5
+
+Para cada tamaño y régimen informa barras por segundo (mejor de N
+repeticiones; en el motor por lotes, barras × carriles) y la memoria pico de una ejecución medida con tracemalloc.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import numpy as np
+import pandas as pd
+
+from intradia import simular_intradia
+from motor import ParametrosEstrategia, simular, simular_lote
+from sintetico import REGIMENES, serie_sintetica
+
+CARRILES_LOTE = 64
+
+def _simular(serie, p):
+    simular(serie.values, serie.index, p)
+
+def _simular_lote(serie, p):
+    variaciones = {'target_ltv_agresivo': np.linspace(0.0, 0.6, CARRILES_LOTE)}
+    simular_lote(serie.values, serie.index, p, variaciones)
+
+def _simular_intradia(serie, p):
+    simular_intradia(pd.DataFrame({'Low': serie.values * 0.99, 'Close': serie.values}, index=serie.index), p)
+
+# nombre -> (función, carriles); el rendimiento del lote cuenta barras × carriles
+MOTORES = {"simular": (_simular, 1), "simular_lote": (_simular_lote, CARRILES_LOTE),
+           "intradia": (_simular_intradia, 1)}
+
+def medir(funcion, serie, p, repeticiones):
+    """(mejor tiempo en segundos, memoria pico en bytes)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion(serie, p)
+        tiempos.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    funcion(serie, p)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos), pico
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--barras", type=int, nargs="+", default=[1_000, 10_000, 1_000_000])
+    parser.add_argument("--regimenes", nargs="+", choices=REGIMENES, default=list(REGIMENES))
+    parser.add_argument("--motores", nargs="+", choices=list(MOTORES), default=list(MOTORES))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    p = ParametrosEstrategia()
+    print(f"{'motor':<13} {'barras':>9} {'régimen':<12} {'tiempo (ms)':>12} {'barras/s':>14} {'pico (MB)':>10}")
+    for n in args.barras:
+        # Por encima de ~100k barras diarias las fechas se salen del rango de Timestamp
+        frecuencia = "D" if n <= 100_000 else "h"
+        for regimen in args.regimenes:
+            serie = serie_sintetica(n, regimen, frecuencia=frecuencia)
+            for nombre in args.motores:
+                funcion, carriles = MOTORES[nombre]
+                tiempo, pico = medir(funcion, serie, p, args.repeticiones)
+                print(f"{nombre:<13} {n:>9} {regimen:<12} {tiempo * 1000:>12.1f} {n * carriles / tiempo:>14,.0f} {pico / 2**20:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Backtest de una cesta de activos como colateral común.
+
+El LTV objetivo se aplica sobre el valor combinado del colateral, pero cada
+activo decide su régimen (Safe/Base/Agresivo/Extra) con su propio drawdown.
+El motor trabaja sobre la matriz (días × activos): cada paso del bucle de
+decisiones opera sobre el vector de activos, así que una cesta de diez
+activos cuesta prácticamente lo mismo que uno.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from motor import (CODIGO_EVENTO, ResultadoSimulacion, calcular_drawdown,
+                   dias_de_compra)
+from riesgo import AcumuladorRiesgo
+
+ETIQUETAS = {"SAFE": "✅ Safe", "BASE": "⚖️ Base", "AGRESIVO": "🔥 Agresivo", "DEFENSA": "🛡️ Defensa"}
+
+def parsear_cesta(texto):
+    """
+    'BTC-USD:50, ETH-USD:30, SOL-USD:20' -> (['BTC-USD', 'ETH-USD', 'SOL-USD'], [0.5, 0.3, 0.2]).
+    Sin pesos se reparte a partes iguales.
+    """
+    tickers, pesos = [], []
+    for trozo in texto.split(","):
+        trozo = trozo.strip()
+        if not trozo:
+            continue
+        ticker, _, peso = trozo.partition(":")
+        tickers.append(ticker.strip().upper())
+        pesos.append(float(peso) if peso.strip() else 1.0)
+    if not tickers:
+        raise ValueError("La cesta está vacía.")
+    if len(set(tickers)) != len(tickers):
+        raise ValueError("La cesta tiene tickers repetidos.")
+    pesos = np.asarray(pesos, dtype=float)
+    if (pesos <= 0).any():
+        raise ValueError("Los pesos de la cesta deben ser positivos.")
+    return tickers, pesos / pesos.sum()
+
+def descargar_cesta(almacen, tickers, inicio):
+    """
+    Precios de todos los tickers en paralelo, alineados en un calendario común
+    que empieza el primer día en que todos cotizan y acaba el último día en que
+    todos tienen datos (un activo que deja de cotizar no se rellena para siempre).
+    """
+    with ThreadPoolExecutor(max_workers=len(tickers)) as pool:
+        series = list(pool.map(lambda t: almacen.serie(t, inicio), tickers))
+    desde = max(s.index[0] for s in series)
+    hasta = min(s.index[-1] for s in series)
+    precios = pd.concat(series, axis=1, keys=tickers).sort_index().ffill().loc[desde:hasta].dropna()
+    if precios.empty:
+        raise ValueError("Los activos de la cesta no tienen fechas en común.")
+    return precios
+
+def simular_cartera(precios, fechas, pesos, p):
+    """
+    Estrategia Target-LTV sobre una cesta. `precios` es una matriz (días × activos).
+
+    Con un único activo de peso 1 reproduce `motor.simular`, salvo por la
+    columna 'Activo' de los registros.
+    """
+    activos = list(precios.columns) if hasattr(precios, "columns") else None
+    precios = np.asarray(precios, dtype=float)
+    fechas = pd.DatetimeIndex(fechas)
+    pesos = np.asarray(pesos, dtype=float)
+    n = len(precios)
+    if n == 0:
+        raise ValueError("La serie de precios está vacía.")
+
+    # --- PRECÁLCULOS ---
+    dd = calcular_drawdown(precios.T).T
+    dca_activo = np.fmax.accumulate(dd, axis=0) >= p.umbral_inicio_dca
+    indice_cesta = (precios / precios[0]) @ pesos
+    dd_cesta = calcular_drawdown(indice_cesta)
+    es_compra = dias_de_compra(fechas, p.frecuencia, p.dia_semana_idx, p.dia_mes)
+    es_compra[0] = True
+    idx = np.flatnonzero(es_compra)
+    k = len(idx)
+    etiquetas_fecha = fechas[idx].strftime('%Y-%m-%d')
+    g = 1 + p.coste_deuda_apr / 365.0
+
+    btc_dec = np.empty((k, len(pesos)))
+    deuda_dec = np.empty(k)
+    invertido_dec = np.empty(k)
+    tomado_dec = np.empty(k)
+    bench_btc_dec = np.empty((k, len(pesos)))
+    bench_inv_dec = np.empty(k)
+    evento_dec = np.empty(k, dtype=np.int8)
+    registros = []
+    dia_registro = []
+
+    btc = np.zeros(len(pesos))
+    bench_btc = np.zeros(len(pesos))
+    deuda_acumulada = dinero_invertido = deuda_tomada = bench_invertido = 0.0
+    previo = 0
+
+    # --- BUCLE DE DECISIONES (vectorizado sobre activos) ---
+    for s, i in enumerate(idx.tolist()):
+        precio = precios[i]
+        if deuda_acumulada > 0:
+            deuda_acumulada *= g ** (i - previo)
+        previo = i
+
+        if i == 0:
+            cash = p.inversion_inicial * pesos
+            btc += cash / precio
+            bench_btc += cash / precio
+            dinero_invertido += p.inversion_inicial
+            bench_invertido += p.inversion_inicial
+            codigo = CODIGO_EVENTO["INICIO"]
+            for a in range(len(pesos)):
+                registros.append({
+                    'Fecha': etiquetas_fecha[s], 'Activo': activos[a] if activos else a, 'Precio': precio[a],
+                    'Tipo': "INICIO", 'Cash ($)': cash[a], 'Deuda Nueva ($)': 0,
+                    'LTV Post (%)': 0, 'DD (%)': dd[i, a] * 100
+                })
+                dia_registro.append(i)
+        else:
+            bench_btc += p.aportacion_base * pesos / precio
+            bench_invertido += p.aportacion_base
+            activo = dca_activo[i]
+            codigo = CODIGO_EVENTO[None]
+
+            if activo.any():
+                dd_hoy = dd[i]
+                colateral_total = btc @ precio
+                ltv = deuda_acumulada / colateral_total if colateral_total > 0 else 0.0
+
+                es_extra = dd_hoy > p.umbral_dd_extra
+                cash_base = (p.aportacion_base + np.where(es_extra, p.monto_extra, 0.0)) * pesos
+                if ltv > p.trigger_defensa_ltv:
+                    regimen = np.full(len(pesos), "DEFENSA", dtype=object)
+                    cash = cash_base * p.multiplo_defensa
+                    target = np.zeros(len(pesos))
+                else:
+                    safe = (dd_hoy < p.umbral_dd_safe) | (ltv > p.umbral_ltv_safe)
+                    agresivo = ~safe & (dd_hoy > p.umbral_dd_agresivo)
+                    regimen = np.where(safe, "SAFE", np.where(agresivo, "AGRESIVO", "BASE")).astype(object)
+                    cash = cash_base
+                    target = np.where(safe, 0.0, np.where(agresivo, p.target_ltv_agresivo, p.target_ltv_base))
+
+                # Cada activo lleva la cesta a su target sobre su parte del colateral y la deuda
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    necesaria = (target * (pesos * colateral_total + cash) - pesos * deuda_acumulada) / (1 - target)
+                deuda_nueva = np.where((target > 0) & (target != 1), np.maximum(0.0, necesaria), 0.0)
+                cash = np.where(activo, cash, 0.0)
+                deuda_nueva = np.where(activo, deuda_nueva, 0.0)
+
+                btc += (cash + deuda_nueva) / precio
+                deuda_acumulada += deuda_nueva.sum()
+                deuda_tomada += deuda_nueva.sum()
+                dinero_invertido += cash.sum()
+                ltv_post = deuda_acumulada / (btc @ precio)
+
+                for a in np.flatnonzero(activo):
+                    tipo = regimen[a] + ("+EXTRA" if es_extra[a] and regimen[a] != "DEFENSA" else "")
+                    etiqueta = ETIQUETAS[regimen[a]] + (" + Extra" if es_extra[a] and regimen[a] != "DEFENSA" else "")
+                    # El evento del día es el más severo de la cesta
+                    codigo = max(codigo, CODIGO_EVENTO[tipo])
+                    registros.append({
+                        'Fecha': etiquetas_fecha[s], 'Activo': activos[a] if activos else a, 'Precio': precio[a],
+                        'Tipo': etiqueta, 'Cash ($)': cash[a], 'Deuda Nueva ($)': deuda_nueva[a],
+                        'LTV Post (%)': ltv_post * 100, 'DD (%)': dd_hoy[a] * 100
+                    })
+                    dia_registro.append(i)
+
+        btc_dec[s] = btc
+        deuda_dec[s] = deuda_acumulada
+        invertido_dec[s] = dinero_invertido
+        tomado_dec[s] = deuda_tomada
+        bench_btc_dec[s] = bench_btc
+        bench_inv_dec[s] = bench_invertido
+        evento_dec[s] = codigo
+
+    # --- RELLENO DIARIO ---
+    dias = np.arange(n)
+    post = np.searchsorted(idx, dias, side='right') - 1
+    pre = np.searchsorted(idx, dias, side='left') - 1
+    pre_c = np.maximum(pre, 0)
+
+    deuda_pre = np.where(pre >= 0, deuda_dec[pre_c] * g ** (dias - idx[pre_c]), 0.0)
+    colateral_pre = np.where(pre >= 0, np.einsum('ij,ij->i', btc_dec[pre_c], precios), 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ltv = np.where(colateral_pre > 0, deuda_pre / colateral_pre, 0.0)
+
+    # Sin colateral (antes de la primera compra) no hay nada que liquidar
+    liq = np.flatnonzero((ltv >= p.liq_threshold) & (pre >= 0))
+    liquidado = len(liq) > 0
+    fin = liq[0] + 1 if liquidado else n
+
+    deuda_post = deuda_dec[post] * g ** (dias - idx[post])
+    equity_strat = np.einsum('ij,ij->i', btc_dec[post], precios) - deuda_post
+    equity_bench = np.einsum('ij,ij->i', bench_btc_dec[post], precios)
+    invertido_dia = invertido_dec[post]
+    bench_inv_dia = bench_inv_dec[post]
+    codigo_evento = evento_dec[post]
+
+    fecha_liq = None
+    if liquidado:
+        dia_liq = fin - 1
+        fecha_liq = fechas[dia_liq]
+        s = pre[dia_liq]
+        btc = btc_dec[s]
+        deuda_acumulada = deuda_pre[dia_liq]
+        dinero_invertido = invertido_dec[s]
+        deuda_tomada = tomado_dec[s]
+        bench_btc = bench_btc_dec[s]
+        bench_invertido = bench_inv_dec[s]
+        equity_strat[dia_liq] = 0
+        equity_bench[dia_liq] = bench_btc @ precios[dia_liq]
+        invertido_dia[dia_liq] = dinero_invertido
+        bench_inv_dia[dia_liq] = bench_invertido
+        codigo_evento[dia_liq] = CODIGO_EVENTO["💀 LIQ"]
+        corte = np.searchsorted(dia_registro, dia_liq, side='left')
+        registros = registros[:corte]
+        registros.append({'Fecha': fecha_liq, 'Tipo': 'LIQUIDACIÓN', 'LTV': ltv[dia_liq]})
+    else:
+        deuda_acumulada = deuda_post[-1]
+
+    riesgo = AcumuladorRiesgo(trigger_defensa=p.trigger_defensa_ltv)
+    riesgo.actualizar(equity_strat[:fin], invertido_dia[:fin])
+    riesgo.actualizar_ltv(ltv[:fin])
+    riesgo_bench = AcumuladorRiesgo()
+    riesgo_bench.actualizar(equity_bench[:fin], bench_inv_dia[:fin])
+
+    return ResultadoSimulacion(
+        fechas=fechas[:fin],
+        equity_strat=equity_strat[:fin],
+        equity_bench=equity_bench[:fin],
+        ltv=ltv[:fin],
+        drawdown=dd_cesta[:fin],
+        codigo_evento=codigo_evento[:fin],
+        registros=registros,
+        dinero_invertido=dinero_invertido,
+        deuda_acumulada=deuda_acumulada,
+        intereses_pagados=deuda_acumulada - deuda_tomada,
+        btc_acumulado=btc,
+        bench_btc=bench_btc,
+        bench_invertido=bench_invertido,
+        liquidado=liquidado,
+        fecha_liq=fecha_liq,
+        riesgo=riesgo.metricas(equity_strat[fin - 1], dinero_invertido, deuda_acumulada - deuda_tomada),
+        riesgo_bench=riesgo_bench.metricas(equity_bench[fin - 1], bench_invertido),
+    )
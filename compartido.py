@@ -0,0 +1,165 @@
+"""
+Carga y caché compartidas entre sesiones del mismo proceso.
+
+`VueloUnico` agrupa las llamadas concurrentes con la misma clave en una sola
+ejecución: la primera la hace y las demás esperan su resultado (o su
+excepción). El almacén de precios lo usa para que varias sesiones que piden el
+mismo ticker a la vez hagan una sola descarga. `CacheCompartida` guarda
+resultados por clave hasta un tamaño máximo en bytes (LRU) y calcula los que
+faltan a través de un VueloUnico, así que una simulación idéntica pedida a la
+vez por varias sesiones se calcula una vez. Ambas cuentan aciertos, fallos y
+esperas para dimensionar las instancias.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import fields, is_dataclass
+
+import numpy as np
+import pandas as pd
+
+class VueloUnico:
+    """Una sola ejecución en curso por clave; el resto de llamadas con esa clave la esperan."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self.llamadas = 0
+        self.ejecuciones = 0
+        self.esperas = 0
+        self.segundos_espera = 0.0
+        self.espera_maxima = 0.0
+
+    def hacer(self, clave, funcion, *args, **kwargs):
+        with self._lock:
+            self.llamadas += 1
+            futuro = self._en_vuelo.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = self._en_vuelo[clave] = Future()
+                self.ejecuciones += 1
+            else:
+                self.esperas += 1
+        if not lider:
+            t0 = time.perf_counter()
+            try:
+                return futuro.result()
+            finally:
+                espera = time.perf_counter() - t0
+                with self._lock:
+                    self.segundos_espera += espera
+                    self.espera_maxima = max(self.espera_maxima, espera)
+        try:
+            resultado = funcion(*args, **kwargs)
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+
+    def metricas(self):
+        with self._lock:
+            return {
+                'llamadas': self.llamadas, 'ejecuciones': self.ejecuciones, 'esperas': self.esperas,
+                'segundos_espera': round(self.segundos_espera, 6), 'espera_maxima_s': round(self.espera_maxima, 6),
+                'en_vuelo': len(self._en_vuelo),
+            }
+
+def tamano_aproximado(valor, vistos=None):
+    """
+    Bytes aproximados de un resultado: arrays y objetos de pandas por su tamaño, el resto serializado.
+    Un objeto al que apuntan varios campos (los registros del resultado y de su
+    punto de control) se cuenta una sola vez.
+    """
+    vistos = set() if vistos is None else vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, (pd.Index, pd.Series)):
+        return int(valor.memory_usage(deep=False))
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=False).sum())
+    if is_dataclass(valor) and not isinstance(valor, type):
+        return sum(tamano_aproximado(getattr(valor, f.name), vistos) for f in fields(valor))
+    if isinstance(valor, (tuple, list)) and valor and all(isinstance(v, (np.ndarray, pd.Series, pd.DataFrame)) for v in valor):
+        return sum(tamano_aproximado(v, vistos) for v in valor)
+    try:
+        return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+class CacheCompartida:
+    """
+    Resultados por clave con un máximo de `max_bytes` (se expulsan los usados
+    hace más tiempo). Los valores se devuelven sin copiar: quien los lee no debe
+    modificarlos.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._valores = OrderedDict()
+        self._vuelos = VueloUnico()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def _guardar(self, clave, valor):
+        tamano = tamano_aproximado(valor)
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._valores:
+                return
+            self._valores[clave] = (valor, tamano)
+            self.bytes += tamano
+            while self.bytes > self.max_bytes:
+                _, (_, expulsado) = self._valores.popitem(last=False)
+                self.bytes -= expulsado
+                self.expulsiones += 1
+
+    def _calcular(self, clave, funcion, args, kwargs):
+        # Otro hilo pudo terminar de calcularlo entre la consulta y el vuelo
+        with self._lock:
+            if clave in self._valores:
+                return self._valores[clave][0]
+        valor = funcion(*args, **kwargs)
+        self._guardar(clave, valor)
+        return valor
+
+    def obtener(self, clave, funcion, *args, **kwargs):
+        """Valor guardado para `clave` o, si no está, `funcion(*args, **kwargs)` (una vez aunque lo pidan varios hilos)."""
+        with self._lock:
+            if clave in self._valores:
+                self._valores.move_to_end(clave)
+                self.aciertos += 1
+                return self._valores[clave][0]
+            self.fallos += 1
+        return self._vuelos.hacer(clave, self._calcular, clave, funcion, args, kwargs)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._valores)
+
+    def metricas(self):
+        vuelos = self._vuelos.metricas()
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos, 'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                # Fallos que no calcularon nada porque otra sesión ya lo estaba calculando
+                'esperas': vuelos['esperas'], 'segundos_espera': vuelos['segundos_espera'],
+                'calculos': vuelos['ejecuciones'],
+                'entradas': len(self._valores), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'expulsiones': self.expulsiones,
+            }
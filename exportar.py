@@ -0,0 +1,160 @@
+"""
+Exportación por columnas y paginación de las tablas de resultados.
+
+La historia diaria se exporta directamente desde los arrays del motor: las
+columnas numéricas pasan a Arrow sin copiarse y el evento viaja como columna
+de diccionario sobre los códigos `int8`, así que no se construye el DataFrame
+de `historia()`. Los ficheros se generan por trozos de `FILAS_POR_TROZO`
+filas (grupos de filas en Parquet, lotes en Arrow, bloques de texto en CSV)
+que se van escribiendo en disco; el fichero entero solo se lee al final,
+cuando hay que entregárselo a la descarga de Streamlit.
+
+pyarrow es opcional: sin él solo se ofrece CSV.
+"""
+import io
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from motor import EVENTOS
+
+FILAS_POR_PAGINA = 50
+FILAS_POR_TROZO = 65_536
+# Formato -> (extensión, tipo MIME)
+FORMATOS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow": ("arrow", "application/vnd.apache.arrow.stream"),
+}
+if pa is None:
+    FORMATOS = {"CSV": FORMATOS["CSV"]}
+
+# Columnas guardadas como códigos de `EVENTOS`
+COLUMNAS_EVENTO = ("Evento",)
+
+def columnas_historia(r):
+    """Series diarias de un resultado como columnas (vistas de los arrays del motor)."""
+    columnas = {
+        'Fecha': r.fechas, 'Equity_Strat': r.equity_strat, 'LTV': r.ltv, 'Drawdown': r.drawdown,
+        'Evento': r.codigo_evento, 'Equity_Bench': r.equity_bench,
+    }
+    if hasattr(r, 'ltv_peor'):
+        columnas['LTV_Peor'] = r.ltv_peor
+    return columnas
+
+def tabla_operaciones(registros):
+    """DataFrame de `registros` con la columna Fecha como fecha (la fila de liquidación trae un Timestamp)."""
+    df = pd.DataFrame(registros)
+    if len(df):
+        df['Fecha'] = pd.to_datetime(df['Fecha'].astype(str), format='mixed')
+    return df
+
+def columnas_operaciones(df):
+    return {nombre: df[nombre].to_numpy() for nombre in df.columns}
+
+def paginas(n_filas, tamano=FILAS_POR_PAGINA):
+    return max(1, -(-n_filas // tamano))
+
+def pagina(df, numero, tamano=FILAS_POR_PAGINA):
+    """Filas de la página `numero` (empezando en 1)."""
+    desde = (numero - 1) * tamano
+    return df.iloc[desde:desde + tamano]
+
+def _filas(columnas):
+    return len(next(iter(columnas.values()))) if columnas else 0
+
+def tabla_arrow(columnas):
+    """pyarrow.Table sobre las columnas; los eventos como diccionario sobre sus códigos."""
+    if pa is None:
+        raise ImportError("La exportación a Arrow/Parquet necesita pyarrow.")
+    arrays = {}
+    for nombre, valores in columnas.items():
+        if nombre in COLUMNAS_EVENTO:
+            # El código 0 (sin evento) queda como nulo; el diccionario no admite nulos
+            codigos = np.asarray(valores)
+            arrays[nombre] = pa.DictionaryArray.from_arrays(
+                codigos, pa.array([e or "" for e in EVENTOS]), mask=codigos == 0)
+        else:
+            arrays[nombre] = pa.array(valores, from_pandas=True)
+    return pa.table(arrays)
+
+def trozos_csv(columnas, tamano=FILAS_POR_TROZO):
+    """CSV en bloques de bytes de `tamano` filas como mucho; el primero lleva la cabecera."""
+    nombres_evento = np.array(EVENTOS, dtype=object)
+    n = _filas(columnas)
+    for desde in range(0, max(n, 1), tamano):
+        trozo = pd.DataFrame({
+            nombre: nombres_evento[np.asarray(valores[desde:desde + tamano])] if nombre in COLUMNAS_EVENTO
+            else valores[desde:desde + tamano]
+            for nombre, valores in columnas.items()
+        })
+        yield trozo.to_csv(index=False, header=desde == 0).encode()
+
+class _Sumidero(io.RawIOBase):
+    """Fichero de solo escritura que guarda lo escrito hasta que se recoge (lleva su propia posición)."""
+
+    def __init__(self):
+        self.bloques = []
+        self.posicion = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.bloques.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def recoger(self):
+        datos = b"".join(self.bloques)
+        self.bloques.clear()
+        return datos
+
+def trozos_exportacion(columnas, formato, tamano=FILAS_POR_TROZO):
+    """
+    Fichero en `formato` ('CSV', 'Parquet' o 'Arrow') como bloques de bytes de
+    `tamano` filas: cada bloque se convierte a Arrow por separado, así que en
+    memoria solo hay un trozo a la vez.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no disponible: {formato}")
+    if formato == "CSV":
+        yield from trozos_csv(columnas, tamano)
+        return
+    sumidero = _Sumidero()
+    escritor = None
+    for desde in range(0, max(_filas(columnas), 1), tamano):
+        trozo = tabla_arrow({nombre: valores[desde:desde + tamano] for nombre, valores in columnas.items()})
+        if escritor is None:
+            escritor = (pq.ParquetWriter(sumidero, trozo.schema) if formato == "Parquet"
+                        else pa.ipc.new_stream(sumidero, trozo.schema))
+        escritor.write_table(trozo)
+        yield sumidero.recoger()
+    escritor.close()
+    yield sumidero.recoger()
+
+def exportar(columnas, formato, destino=None, tamano=FILAS_POR_TROZO):
+    """
+    Escribe el fichero trozo a trozo en `destino` (binario) y lo devuelve. Sin
+    destino lo escribe en un fichero temporal en disco, que se cierra (y se
+    borra) tras leerlo, y devuelve sus bytes: Streamlit los necesita enteros
+    para la descarga, pero no hay además los trozos ni la tabla Arrow completa.
+    """
+    if destino is None:
+        with tempfile.TemporaryFile() as temporal:
+            exportar(columnas, formato, temporal, tamano)
+            temporal.seek(0)
+            return temporal.read()
+    for bloque in trozos_exportacion(columnas, formato, tamano):
+        destino.write(bloque)
+    return destino
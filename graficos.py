@@ -0,0 +1,123 @@
+"""
+Gráfico principal del backtest con series diezmadas.
+
+Cada serie se reduce a mínimo, máximo, primero y último de cada cubo de
+`ANCHO_PIXELES` cubos (diezmado min/max): la forma que se ve en pantalla es la
+misma que con todos los puntos, pero una historia intradía de un millón de
+barras se dibuja con unos pocos miles. Los marcadores de eventos y el punto de
+liquidación se conservan siempre. La figura se entrega ya rasterizada (PNG)
+para que la app pueda cachearla por la huella del resultado.
+"""
+import hashlib
+import io
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+import perfil
+from motor import CODIGO_EVENTO
+
+ANCHO_PIXELES = 1200
+DPI = 100
+
+# Tipo de evento -> (altura en el mapa de decisiones, estilo del marcador)
+MARCADORES = {
+    "DEFENSA": (-25, dict(marker='s', s=80, color='red', label='Defensa')),
+    "AGRESIVO": (-15, dict(marker='^', s=60, color='purple', label='Agresivo')),
+    "BASE": (-10, dict(marker='o', s=30, color='cyan', label='Base')),
+}
+
+def indices_minmax(series, cubos=ANCHO_PIXELES):
+    """
+    Índices a conservar de una o varias series de igual longitud: primero,
+    último, mínimo y máximo de cada cubo de cada serie. Si no hay más de cuatro
+    puntos por cubo no se ahorra nada y se devuelven todos.
+    """
+    series = [np.asarray(s, dtype=float) for s in series]
+    n = len(series[0])
+    if n <= 4 * cubos:
+        return np.arange(n)
+    tam = -(-n // cubos)
+    bordes = np.arange(0, n, tam)
+    indices = [bordes, np.minimum(bordes + tam, n) - 1]
+    for s in series:
+        relleno = np.pad(s, (0, len(bordes) * tam - n), constant_values=np.nan).reshape(-1, tam)
+        validos = ~np.isnan(relleno).all(axis=1)
+        indices.append((bordes + np.nanargmin(np.where(validos[:, None], relleno, 0.0), axis=1))[validos])
+        indices.append((bordes + np.nanargmax(np.where(validos[:, None], relleno, 0.0), axis=1))[validos])
+    return np.unique(np.concatenate(indices))
+
+def indices_eventos(codigo_evento, tipo, cubos=ANCHO_PIXELES):
+    """Días con el evento `tipo`, uno por cubo como mucho: ningún cubo con eventos queda sin marcador."""
+    dias = np.flatnonzero(codigo_evento == CODIGO_EVENTO[tipo])
+    tam = max(1, -(-len(codigo_evento) // cubos))
+    if tam == 1 or len(dias) == 0:
+        return dias
+    cubo = dias // tam
+    return dias[np.r_[True, cubo[1:] != cubo[:-1]]]
+
+def huella_resultado(r):
+    """Hash estable de las series de un ResultadoSimulacion."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.asarray(r.fechas.asi8).tobytes())
+    for serie in (r.equity_strat, r.equity_bench, r.ltv, r.drawdown, r.codigo_evento, getattr(r, 'ltv_peor', ())):
+        h.update(np.ascontiguousarray(serie).tobytes())
+    h.update(repr((r.liquidado, r.fecha_liq)).encode())
+    return h.hexdigest()
+
+def figura_resultado(r, liq_threshold, trigger_defensa):
+    """Figura de tres paneles (equity, mapa de decisiones y LTV) sobre las series diezmadas."""
+    fechas = r.fechas
+    n = len(fechas)
+    liq = [n - 1] if r.liquidado else []
+
+    fig, axes = plt.subplots(3, 1, figsize=(12, 16), sharex=True)
+
+    # Equity
+    sel = np.union1d(indices_minmax([r.equity_strat, r.equity_bench]), liq).astype(int)
+    strat, bench = r.equity_strat[sel], r.equity_bench[sel]
+    axes[0].set_title("1. Estrategia vs Benchmark (Patrimonio Neto)", fontweight='bold')
+    axes[0].plot(fechas[sel], strat, color='#1f77b4', linewidth=2, label='Tu Estrategia')
+    axes[0].plot(fechas[sel], bench, color='gray', linestyle='--', linewidth=1.5, label='Benchmark DCA')
+    axes[0].fill_between(fechas[sel], strat, bench, where=(strat > bench), color='green', alpha=0.1)
+    if liq:
+        axes[0].scatter(fechas[liq], r.equity_strat[liq], marker='x', s=100, color='red', zorder=3, label='Liquidación')
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+
+    # Decisiones
+    sel = np.union1d(indices_minmax([r.drawdown]), liq).astype(int)
+    axes[1].set_title("2. Mapa de Decisiones", fontweight='bold')
+    axes[1].plot(fechas[sel], r.drawdown[sel] * -100, color='black', alpha=0.3, label='Mercado')
+    for tipo, (altura, estilo) in MARCADORES.items():
+        dias = indices_eventos(r.codigo_evento, tipo)
+        axes[1].scatter(fechas[dias], np.full(len(dias), altura), **estilo)
+    axes[1].set_ylabel("DD (%)")
+    axes[1].legend(loc='lower left')
+    axes[1].grid(True, alpha=0.3)
+
+    # LTV
+    sel = np.union1d(indices_minmax([r.ltv]), liq).astype(int)
+    axes[2].set_title("3. Riesgo LTV", fontweight='bold')
+    axes[2].plot(fechas[sel], r.ltv[sel] * 100, color='orange', label='LTV Real')
+    if hasattr(r, 'ltv_peor'):
+        # Modo intradía: peor LTV del día sobre los mínimos de las barras
+        sel_peor = np.union1d(indices_minmax([r.ltv_peor]), liq).astype(int)
+        axes[2].plot(fechas[sel_peor], r.ltv_peor[sel_peor] * 100, color='red', alpha=0.4, linewidth=0.8, label='LTV en Mínimos')
+    axes[2].axhline(liq_threshold * 100, color='red', linestyle='--', label='Liquidación')
+    axes[2].axhline(trigger_defensa * 100, color='brown', linestyle=':', label='Trigger Defensa')
+    axes[2].set_ylabel("LTV (%)")
+    axes[2].set_ylim(0, 100)
+    axes[2].legend(loc='upper left')
+    axes[2].grid(True, alpha=0.3)
+    return fig
+
+def png_resultado(r, liq_threshold, trigger_defensa):
+    """`figura_resultado` rasterizada a PNG (bytes); la figura se cierra tras guardarla."""
+    with perfil.fase("grafico.figura"):
+        fig = figura_resultado(r, liq_threshold, trigger_defensa)
+    with perfil.fase("grafico.png"):
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+        plt.close(fig)
+    return buffer.getvalue()
@@ -0,0 +1,270 @@
+"""
+Modo intradía: barras OHLC horarias o más finas.
+
+La liquidación se comprueba contra el mínimo (`Low`) de cada barra en lugar del
+cierre diario, y las compras siguen el calendario de `FRECUENCIA`: se ejecutan
+al cierre de la primera barra de cada día de compra. Con 24 a 1.440 barras por
+día el motor procesa la serie por trozos de días completos y solo conserva un
+resumen diario (equity, LTV al cierre, peor LTV intradía, drawdown y evento),
+que es lo que usan los gráficos y las métricas.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import perfil
+from motor import (CODIGO_EVENTO, ResultadoSimulacion, decidir_compra,
+                   dias_de_compra)
+from riesgo import AcumuladorRiesgo
+
+INTERVALOS = ("1h", "30m", "15m", "5m", "1m")
+# Histórico máximo que sirve Yahoo Finance para cada intervalo
+LIMITE_DIAS = {"1h": 729, "30m": 59, "15m": 59, "5m": 59, "1m": 7}
+TROZO = 200_000
+DIA_S = 86_400
+
+@dataclass
+class ResultadoIntradia(ResultadoSimulacion):
+    """ResultadoSimulacion con series diarias resumidas de una simulación intradía."""
+    ltv_peor: np.ndarray
+    barras: int
+
+def _normalizar_ohlc(data):
+    """Columnas Low y Close planas, índice sin zona horaria y sin duplicados."""
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.droplevel(list(range(1, data.columns.nlevels)), axis=1)
+    data = data[['Low', 'Close']].dropna()
+    indice = pd.DatetimeIndex(data.index)
+    if indice.tz is not None:
+        indice = indice.tz_convert(None)
+    data.index = indice
+    return data[~data.index.duplicated(keep='last')].astype(float)
+
+def descargar_intradia(ticker, inicio, intervalo="1h"):
+    """Barras OHLC de Yahoo Finance desde `inicio`, recortado al histórico que permite el intervalo."""
+    if intervalo not in LIMITE_DIAS:
+        raise ValueError(f"Intervalo no soportado: {intervalo}")
+    limite = pd.Timestamp.today().normalize() - pd.Timedelta(days=LIMITE_DIAS[intervalo])
+    with perfil.fase("datos.yf_download"):
+        data = yf.download(ticker, start=max(pd.Timestamp(inicio), limite), interval=intervalo, progress=False)
+    data = _normalizar_ohlc(data)
+    if data.empty:
+        raise ValueError(f"No hay barras de {intervalo} para {ticker}.")
+    return data
+
+def trozos_por_dias(barras, tamano=TROZO):
+    """
+    Divide `barras` (DataFrame o iterable de DataFrames, p. ej. `pd.read_csv(..., chunksize=)`)
+    en trozos de ~`tamano` barras que siempre terminan al final de un día.
+    """
+    if isinstance(barras, pd.DataFrame):
+        tabla = barras
+        barras = (tabla.iloc[desde:desde + tamano] for desde in range(0, len(tabla), tamano))
+    resto = None
+    for trozo in barras:
+        trozo = _normalizar_ohlc(trozo)
+        if resto is not None:
+            trozo = pd.concat([resto, trozo])
+        if trozo.empty:
+            continue
+        dias = trozo.index.normalize()
+        corte = int(np.searchsorted(dias, dias[-1], side='left'))
+        resto = trozo.iloc[corte:]
+        if corte:
+            yield trozo.iloc[:corte]
+    if resto is not None and len(resto):
+        yield resto
+
+def simular_intradia(barras, p, tamano=TROZO):
+    """
+    Estrategia Target-LTV y benchmark DCA sobre barras intradía (columnas Low y Close).
+
+    Los intereses se devengan de forma continua (`g ** días`, con días fraccionarios)
+    y la liquidación se produce en la primera barra cuyo mínimo lleva el LTV a
+    `liq_threshold`. Devuelve un ResultadoIntradia con una fila por día.
+    Las métricas de riesgo se acumulan trozo a trozo sobre ese resumen diario;
+    el LTV máximo y los días sobre el umbral de defensa usan el peor LTV intradía.
+    """
+    g = 1 + p.coste_deuda_apr / 365.0
+
+    # Estado tras la última decisión (se arrastra entre trozos)
+    btc_acumulado = deuda_acumulada = dinero_invertido = deuda_tomada = 0.0
+    bench_btc = bench_invertido = 0.0
+    t_decision = 0
+    evento = CODIGO_EVENTO[None]
+    pico = dd_max = 0.0
+    primera = True
+    liquidado = False
+    fecha_liq = None
+    registros = []
+    n_barras = 0
+    riesgo = AcumuladorRiesgo(trigger_defensa=p.trigger_defensa_ltv)
+    riesgo_bench = AcumuladorRiesgo()
+
+    fechas, equity, bench, ltv_cierre, ltv_peor, drawdown, codigos = ([] for _ in range(7))
+
+    def primera_liquidacion(desde, hasta):
+        """Primera barra de [desde, hasta] cuyo mínimo liquida con el estado actual."""
+        if deuda_acumulada <= 0 or btc_acumulado <= 0 or desde > hasta:
+            return None
+        dias_t = (t[desde:hasta + 1] - t_decision) / DIA_S
+        ltv = deuda_acumulada * g ** dias_t / (btc_acumulado * low[desde:hasta + 1])
+        cruce = np.flatnonzero(ltv >= p.liq_threshold)
+        return desde + cruce[0] if len(cruce) else None
+
+    for trozo in trozos_por_dias(barras, tamano):
+        t = trozo.index.as_unit('s').asi8
+        low = trozo['Low'].to_numpy()
+        close = trozo['Close'].to_numpy()
+        n = len(close)
+
+        # --- PRECÁLCULOS DEL TROZO ---
+        picos = np.fmax.accumulate(np.r_[pico, close])[1:]
+        dd = np.where(picos > 0, (picos - close) / picos, 0.0)
+        dd_maximo = np.fmax.accumulate(np.r_[dd_max, dd])[1:]
+        pico, dd_max = picos[-1], dd_maximo[-1]
+        dias = trozo.index.normalize()
+        inicio_dia = np.flatnonzero(np.r_[True, dias[1:] != dias[:-1]])
+        fin_dia = np.r_[inicio_dia[1:] - 1, n - 1]
+        decisiones = inicio_dia[dias_de_compra(dias[inicio_dia], p.frecuencia, p.dia_semana_idx, p.dia_mes)]
+        if primera:
+            decisiones = np.union1d([0], decisiones)
+        etiquetas = trozo.index[decisiones].strftime('%Y-%m-%d %H:%M')
+
+        # Estado tras cada decisión del trozo; la posición -1 es el estado arrastrado
+        pos = [-1]
+        est_btc, est_deuda, est_t = [btc_acumulado], [deuda_acumulada], [t_decision]
+        est_bench, est_evento = [bench_btc], [evento]
+        est_inv, est_bench_inv = [dinero_invertido], [bench_invertido]
+
+        # --- BUCLE DE DECISIONES ---
+        cursor = 0
+        j_liq = None
+        for s, i in enumerate(decisiones.tolist()):
+            # El mínimo de la barra llega antes que la compra a su cierre
+            j_liq = primera_liquidacion(cursor, i)
+            if j_liq is not None:
+                break
+            cursor = i + 1
+            precio = close[i]
+            if deuda_acumulada > 0:
+                deuda_acumulada *= g ** ((t[i] - t_decision) / DIA_S)
+            t_decision = t[i]
+
+            if primera:
+                primera = False
+                btc_acumulado += p.inversion_inicial / precio
+                dinero_invertido += p.inversion_inicial
+                bench_btc += p.inversion_inicial / precio
+                bench_invertido += p.inversion_inicial
+                tipo_evento = "INICIO"
+                registros.append({
+                    'Fecha': etiquetas[s], 'Precio': precio, 'Tipo': "INICIO",
+                    'Cash ($)': p.inversion_inicial, 'Deuda Nueva ($)': 0,
+                    'LTV Post (%)': 0, 'DD (%)': dd[i] * 100
+                })
+            else:
+                bench_btc += p.aportacion_base / precio
+                bench_invertido += p.aportacion_base
+                tipo_evento = None
+                if dd_maximo[i] >= p.umbral_inicio_dca:
+                    colateral_total = btc_acumulado * precio
+                    ltv = deuda_acumulada / colateral_total if colateral_total > 0 else 0.0
+                    cash_a_invertir, deuda_a_tomar, tipo_evento, etiqueta_tabla = decidir_compra(
+                        p, dd[i], ltv, colateral_total, deuda_acumulada)
+
+                    btc_acumulado += (cash_a_invertir + deuda_a_tomar) / precio
+                    deuda_acumulada += deuda_a_tomar
+                    deuda_tomada += deuda_a_tomar
+                    dinero_invertido += cash_a_invertir
+                    registros.append({
+                        'Fecha': etiquetas[s], 'Precio': precio, 'Tipo': etiqueta_tabla,
+                        'Cash ($)': cash_a_invertir, 'Deuda Nueva ($)': deuda_a_tomar,
+                        'LTV Post (%)': deuda_acumulada / (btc_acumulado * precio) * 100, 'DD (%)': dd[i] * 100
+                    })
+
+            evento = CODIGO_EVENTO[tipo_evento]
+            pos.append(i)
+            est_btc.append(btc_acumulado)
+            est_deuda.append(deuda_acumulada)
+            est_t.append(t_decision)
+            est_bench.append(bench_btc)
+            est_evento.append(evento)
+            est_inv.append(dinero_invertido)
+            est_bench_inv.append(bench_invertido)
+        else:
+            j_liq = primera_liquidacion(cursor, n - 1)
+
+        # --- RESUMEN DIARIO DEL TROZO ---
+        fin = n if j_liq is None else j_liq + 1
+        barra = np.arange(fin)
+        pos = np.asarray(pos)
+        est_btc, est_deuda, est_t = np.asarray(est_btc), np.asarray(est_deuda), np.asarray(est_t)
+        post = np.searchsorted(pos, barra, side='right') - 1
+        pre = np.searchsorted(pos, barra, side='left') - 1
+
+        deuda_pre = est_deuda[pre] * g ** ((t[:fin] - est_t[pre]) / DIA_S)
+        deuda_post = est_deuda[post] * g ** ((t[:fin] - est_t[post]) / DIA_S)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ltv_minimo = np.where(est_btc[pre] > 0, deuda_pre / (est_btc[pre] * low[:fin]), 0.0)
+            ltv_barra = np.where(est_btc[post] > 0, deuda_post / (est_btc[post] * close[:fin]), 0.0)
+        equity_barra = est_btc[post] * close[:fin] - deuda_post
+        bench_barra = np.asarray(est_bench)[post] * close[:fin]
+        codigo_barra = np.asarray(est_evento, dtype=np.int8)[post]
+
+        if j_liq is not None:
+            liquidado = True
+            fecha_liq = trozo.index[j_liq]
+            deuda_acumulada = deuda_pre[j_liq]
+            equity_barra[j_liq] = 0
+            ltv_barra[j_liq] = ltv_minimo[j_liq]
+            codigo_barra[j_liq] = CODIGO_EVENTO["💀 LIQ"]
+            registros.append({'Fecha': fecha_liq, 'Tipo': 'LIQUIDACIÓN', 'LTV': ltv_minimo[j_liq]})
+            dias_vivos = inicio_dia < fin
+            inicio_dia, fin_dia = inicio_dia[dias_vivos], np.minimum(fin_dia[dias_vivos], j_liq)
+
+        fechas.append(dias[inicio_dia])
+        equity.append(equity_barra[fin_dia])
+        bench.append(bench_barra[fin_dia])
+        ltv_cierre.append(ltv_barra[fin_dia])
+        ltv_peor.append(np.maximum.reduceat(ltv_minimo, inicio_dia))
+        riesgo.actualizar(equity[-1], np.asarray(est_inv)[post[fin_dia]])
+        riesgo.actualizar_ltv(ltv_peor[-1])
+        riesgo_bench.actualizar(bench[-1], np.asarray(est_bench_inv)[post[fin_dia]])
+        drawdown.append(dd[fin_dia])
+        codigos.append(codigo_barra[fin_dia])
+        n_barras += fin
+        ultima = (t[fin - 1], close[fin - 1])
+        if liquidado:
+            break
+
+    if n_barras == 0:
+        raise ValueError("La serie de barras está vacía.")
+    if not liquidado and deuda_acumulada > 0:
+        deuda_acumulada *= g ** ((ultima[0] - t_decision) / DIA_S)
+    perfil.contar("barras", n_barras)
+    perfil.contar("compras", len(registros) - liquidado)
+
+    return ResultadoIntradia(
+        fechas=pd.DatetimeIndex(np.concatenate(fechas)),
+        equity_strat=np.concatenate(equity),
+        equity_bench=np.concatenate(bench),
+        ltv=np.concatenate(ltv_cierre),
+        drawdown=np.concatenate(drawdown),
+        codigo_evento=np.concatenate(codigos),
+        registros=registros,
+        dinero_invertido=dinero_invertido,
+        deuda_acumulada=deuda_acumulada,
+        intereses_pagados=deuda_acumulada - deuda_tomada,
+        btc_acumulado=btc_acumulado,
+        bench_btc=bench_btc,
+        bench_invertido=bench_invertido,
+        liquidado=liquidado,
+        fecha_liq=fecha_liq,
+        ltv_peor=np.concatenate(ltv_peor),
+        barras=n_barras,
+        riesgo=riesgo.metricas(equity[-1][-1], dinero_invertido, deuda_acumulada - deuda_tomada),
+        riesgo_bench=riesgo_bench.metricas(bench[-1][-1], bench_invertido),
+    )
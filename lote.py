@@ -0,0 +1,209 @@
+"""
+Ejecución por lotes de escenarios, sin Streamlit.
+
+    python lote.py escenarios.jsonl -o resumen.csv
+    python lote.py escenarios.yaml --procesos 8 --offline
+
+Cada escenario es un objeto con `ticker`, `fecha_inicio` y cualquier parámetro
+del panel lateral (mismos nombres que en la app, en mayúsculas o minúsculas:
+`TARGET_LTV_BASE`, `umbral_dd_agresivo`, ...; el día de compra semanal vale
+como `DIA_SEMANA: Lunes` o como `dia_semana_idx: 0`). Los que falten toman el
+valor por defecto de ParametrosEstrategia. El fichero puede ser JSONL (un objeto por
+línea) o YAML (una lista, o un mapa con la clave `escenarios`; requiere PyYAML).
+
+La serie de cada ticker se lee una sola vez del almacén local y se copia a un
+bloque de memoria compartida; los procesos del pool trabajan sobre vistas de
+esos bloques, así que los escenarios solo viajan con sus parámetros. El
+resultado es una fila por escenario con el resumen de la tabla comparativa;
+si algún escenario falla, su fila lleva el motivo y el programa sale con código 1.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from almacen import AlmacenPrecios
+from motor import ParametrosEstrategia, calcular_resumen, simular
+
+CAMPOS_PARAMETROS = {f.name for f in fields(ParametrosEstrategia)}
+CAMPOS_ESCENARIO = {"escenario", "ticker", "fecha_inicio"}
+# Métricas de riesgo del benchmark que tienen sentido sin deuda
+RIESGO_BENCH = ("max_drawdown", "dias_bajo_agua", "racha_bajo_agua", "sharpe", "sortino")
+FECHA_INICIO_DEFECTO = "2018-01-01"
+FRECUENCIAS = ("Semanal", "Mensual")
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+
+# Vistas de las series compartidas dentro de cada proceso: ticker -> (bloque, precios, primer día)
+_SERIES = {}
+
+def leer_escenarios(ruta):
+    """Lista de diccionarios (uno por escenario) de un fichero JSONL o YAML."""
+    ruta = Path(ruta)
+    texto = ruta.read_text(encoding="utf-8")
+    if ruta.suffix.lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("Leer escenarios en YAML requiere PyYAML (pip install pyyaml).") from e
+        datos = yaml.safe_load(texto) or []
+        if isinstance(datos, dict):
+            datos = datos.get("escenarios", [])
+        return list(datos)
+    return [json.loads(linea) for linea in texto.splitlines() if linea.strip() and not linea.lstrip().startswith("#")]
+
+def preparar_escenario(datos, numero):
+    """(nombre, ticker, fecha de inicio, ParametrosEstrategia) de un escenario; ValueError si no es válido."""
+    datos = {str(clave).lower(): valor for clave, valor in datos.items()}
+    if "dia_semana" in datos:
+        # Nombre del día como en el panel lateral de la app
+        dia = str(datos.pop("dia_semana")).strip().capitalize()
+        if dia not in DIAS_SEMANA:
+            raise ValueError(f"Escenario {numero}: día de la semana desconocido {dia!r}")
+        if "dia_semana_idx" in datos:
+            raise ValueError(f"Escenario {numero}: indica dia_semana o dia_semana_idx, no ambos")
+        datos["dia_semana_idx"] = DIAS_SEMANA.index(dia)
+    desconocidos = set(datos) - CAMPOS_PARAMETROS - CAMPOS_ESCENARIO
+    if desconocidos:
+        raise ValueError(f"Escenario {numero}: campos desconocidos {sorted(desconocidos)}")
+    if not datos.get("ticker"):
+        raise ValueError(f"Escenario {numero}: falta el ticker")
+    parametros = ParametrosEstrategia(**{k: v for k, v in datos.items() if k in CAMPOS_PARAMETROS})
+    if parametros.frecuencia not in FRECUENCIAS:
+        raise ValueError(f"Escenario {numero}: frecuencia desconocida {parametros.frecuencia!r} (usa {' o '.join(FRECUENCIAS)})")
+    if parametros.frecuencia == "Mensual" and parametros.dia_mes is None:
+        raise ValueError(f"Escenario {numero}: la frecuencia mensual necesita dia_mes")
+    nombre = str(datos.get("escenario", numero))
+    inicio = pd.Timestamp(datos.get("fecha_inicio", FECHA_INICIO_DEFECTO))
+    return nombre, str(datos["ticker"]).upper(), inicio, parametros
+
+def fila_resumen(r):
+    """Resumen de un ResultadoSimulacion: lo mismo que la tabla comparativa de la app, con las métricas de riesgo."""
+    resumen = calcular_resumen(r)
+    return {
+        'dias': resumen['dias_totales'],
+        'invertido': r.dinero_invertido,
+        'equity_final': resumen['strat_val_final'],
+        'roi_pct': resumen['strat_roi'],
+        'cagr': resumen['strat_cagr'],
+        'intereses_pagados': r.intereses_pagados,
+        'deuda_final': r.deuda_acumulada,
+        'liquidado': r.liquidado,
+        'fecha_liq': r.fecha_liq,
+        'bench_invertido': r.bench_invertido,
+        'bench_equity_final': resumen['bench_val_final'],
+        'bench_roi_pct': resumen['bench_roi'],
+        'bench_cagr': resumen['bench_cagr'],
+        'exceso_cagr': resumen['strat_cagr'] - resumen['bench_cagr'],
+        **asdict(r.riesgo),
+        **{f'bench_{nombre}': getattr(r.riesgo_bench, nombre) for nombre in RIESGO_BENCH},
+    }
+
+def _fila_error(nombre, ticker, mensaje):
+    return {'escenario': nombre, 'ticker': ticker, 'error': mensaje}
+
+def _adjuntar(bloques):
+    """Inicializador del pool: vistas NumPy sobre los bloques compartidos."""
+    for ticker, (nombre, n, primer_dia) in bloques.items():
+        bloque = shared_memory.SharedMemory(name=nombre)
+        _SERIES[ticker] = (bloque, np.ndarray((n,), dtype=float, buffer=bloque.buf), primer_dia)
+
+def _simular_escenario(tarea):
+    nombre, ticker, desde, p = tarea
+    _, precios, primer_dia = _SERIES[ticker]
+    fechas = pd.date_range(primer_dia + pd.Timedelta(days=desde), periods=len(precios) - desde, freq='D')
+    try:
+        return {'escenario': nombre, 'ticker': ticker, 'inicio': fechas[0].date(),
+                **fila_resumen(simular(precios[desde:], fechas, p)), 'error': None}
+    except Exception as e:
+        return _fila_error(nombre, ticker, str(e))
+
+def ejecutar_lote(escenarios, almacen=None, procesos=None, trozo=16):
+    """
+    Simula `escenarios` (diccionarios como los de `leer_escenarios`) y devuelve
+    un DataFrame con una fila por escenario, en el mismo orden. Un escenario
+    inválido o sin datos no detiene el lote: su fila lleva el motivo en `error`.
+    """
+    almacen = almacen or AlmacenPrecios()
+    preparados, errores = [], {}
+    for numero, datos in enumerate(escenarios, start=1):
+        try:
+            preparados.append((numero, *preparar_escenario(datos, numero)))
+        except (ValueError, TypeError, AttributeError) as e:
+            datos = datos if isinstance(datos, dict) else {}
+            errores[numero] = _fila_error(str(datos.get("escenario", numero)), datos.get("ticker"), str(e))
+
+    # Una lectura por ticker, desde el inicio más temprano que se pide
+    series, reales = {}, {}
+    for ticker in sorted({t for _, _, t, _, _ in preparados}):
+        inicio = min(i for _, _, t, i, _ in preparados if t == ticker)
+        try:
+            series[ticker] = almacen.serie(ticker, inicio)
+            reales[ticker] = np.asarray(almacen.reales(ticker).loc[series[ticker].index[0]:], dtype=bool)
+        except Exception as e:
+            for numero, nombre, t, _, _ in preparados:
+                if t == ticker:
+                    errores[numero] = _fila_error(nombre, ticker, f"Sin datos: {e}")
+
+    # Cada escenario arranca en la primera barra real >= su fecha de inicio, como en la app
+    tareas = {}
+    for numero, nombre, ticker, inicio, p in preparados:
+        if numero in errores:
+            continue
+        desde = int(series[ticker].index.searchsorted(inicio))
+        resto = reales[ticker][desde:]
+        if resto.any():
+            tareas[numero] = (nombre, ticker, desde + int(np.argmax(resto)), p)
+        else:
+            errores[numero] = _fila_error(nombre, ticker, f"No hay datos de {ticker} desde {inicio.date()}.")
+
+    procesos = procesos or os.cpu_count() or 1
+    bloques = {}
+    try:
+        if procesos > 1 and len(tareas) > 1:
+            for ticker, serie in series.items():
+                bloque = shared_memory.SharedMemory(create=True, size=max(serie.values.nbytes, 1))
+                np.ndarray(serie.shape, dtype=float, buffer=bloque.buf)[:] = serie.values
+                bloques[ticker] = bloque
+            with ProcessPoolExecutor(max_workers=min(procesos, len(tareas)), initializer=_adjuntar,
+                                     initargs=({t: (b.name, len(series[t]), series[t].index[0]) for t, b in bloques.items()},)) as pool:
+                filas = dict(zip(tareas, pool.map(_simular_escenario, tareas.values(), chunksize=trozo)))
+        else:
+            _SERIES.update({t: (None, s.to_numpy(dtype=float), s.index[0]) for t, s in series.items()})
+            filas = {numero: _simular_escenario(tarea) for numero, tarea in tareas.items()}
+    finally:
+        for bloque in bloques.values():
+            bloque.close()
+            bloque.unlink()
+        _SERIES.clear()
+
+    filas.update(errores)
+    return pd.DataFrame([filas[numero] for numero in sorted(filas)])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("escenarios", help="Fichero JSONL o YAML con los escenarios")
+    parser.add_argument("-o", "--salida", default="-", help="CSV de resumen (por defecto, la salida estándar)")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos del pool (por defecto, todos los núcleos)")
+    parser.add_argument("--offline", action="store_true", help="No descargar nada: usar solo el almacén local")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    escenarios = leer_escenarios(args.escenarios)
+    almacen = AlmacenPrecios(offline=True) if args.offline else AlmacenPrecios()
+    tabla = ejecutar_lote(escenarios, almacen, args.procesos)
+    tabla.to_csv(sys.stdout if args.salida == "-" else args.salida, index=False)
+
+    fallidos = tabla['error'].notna().sum()
+    print(f"{len(tabla)} escenarios ({fallidos} con error) en {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    return 1 if fallidos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
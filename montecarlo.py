@@ -0,0 +1,182 @@
+"""
+Riesgo de liquidación por Monte Carlo.
+
+Genera caminos sintéticos de precio a partir de la serie descargada (bootstrap
+por bloques de los retornos históricos o un GBM ajustado a ellos) y ejecuta la
+estrategia completa sobre todos a la vez con el motor por lotes. Los caminos se
+reparten en trozos; cada trozo se genera y simula dentro de su propio proceso
+para no enviar matrices de precios entre procesos. El motor acumula además las
+métricas de riesgo de cada camino (drawdown, tiempo bajo el agua, Sharpe,
+Sortino, tiempo en defensa, peso de los intereses) sin guardar su serie diaria.
+"""
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from motor import simular_lote
+from riesgo import MetricasRiesgo
+
+METODOS = ("Bootstrap por bloques", "GBM")
+PERCENTILES_LTV = (5, 25, 50, 75, 95)
+PERCENTILES_RIESGO = (5, 50, 95)
+
+def retornos_log(precios):
+    precios = np.asarray(precios, dtype=float)
+    precios = precios[np.isfinite(precios) & (precios > 0)]
+    return np.diff(np.log(precios))
+
+def caminos_bootstrap(retornos, precio_inicial, n_caminos, n_dias, bloque, rng):
+    """Concatena bloques de `bloque` retornos consecutivos tomados al azar."""
+    bloque = max(1, min(bloque, len(retornos)))
+    n_bloques = -(-(n_dias - 1) // bloque)
+    inicios = rng.integers(0, len(retornos) - bloque + 1, size=(n_caminos, n_bloques))
+    posiciones = (inicios[:, :, None] + np.arange(bloque)).reshape(n_caminos, -1)[:, :n_dias - 1]
+    return _caminos_desde_retornos(retornos[posiciones], precio_inicial)
+
+def caminos_gbm(retornos, precio_inicial, n_caminos, n_dias, rng):
+    """Movimiento browniano geométrico con la media y volatilidad de los retornos."""
+    simulados = rng.normal(retornos.mean(), retornos.std(ddof=1), size=(n_caminos, n_dias - 1))
+    return _caminos_desde_retornos(simulados, precio_inicial)
+
+def _caminos_desde_retornos(retornos, precio_inicial):
+    log_precio = np.concatenate([np.zeros((len(retornos), 1)), np.cumsum(retornos, axis=1)], axis=1)
+    return precio_inicial * np.exp(log_precio)
+
+@dataclass
+class ResultadoMonteCarlo:
+    fechas: pd.DatetimeIndex
+    equity_final: np.ndarray
+    bench_final: np.ndarray
+    dinero_invertido: np.ndarray
+    bench_invertido: np.ndarray
+    liquidado: np.ndarray
+    dia_liq: np.ndarray
+    fechas_ltv: pd.DatetimeIndex
+    bandas_ltv: dict
+    riesgo: MetricasRiesgo | None = None
+
+    @property
+    def prob_liquidacion(self):
+        return self.liquidado.mean()
+
+    @property
+    def prob_supera_bench(self):
+        return (self.equity_final > self.bench_final).mean()
+
+    def curva_liquidacion(self):
+        """Probabilidad acumulada de haber sido liquidado en cada fecha."""
+        dias = np.sort(self.dia_liq[self.liquidado])
+        return pd.Series(np.searchsorted(dias, np.arange(len(self.fechas)), side='right') / len(self.liquidado),
+                         index=self.fechas)
+
+    def tabla_riesgo(self):
+        """Percentiles entre caminos de cada métrica de riesgo de la estrategia (una fila por métrica)."""
+        with warnings.catch_warnings():
+            # Métricas sin valor en ningún camino (p. ej. Sortino sin días negativos)
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return pd.DataFrame({
+                f"P{q}": [np.nanpercentile(np.asarray(getattr(self.riesgo, f.name), dtype=float), q)
+                          for f in fields(MetricasRiesgo)]
+                for q in PERCENTILES_RIESGO
+            }, index=[f.name for f in fields(MetricasRiesgo)])
+
+def _simular_trozo(args):
+    """Genera y simula un trozo de caminos. Devuelve solo vectores resumen."""
+    retornos, precio_inicial, fechas, p, n_caminos, metodo, bloque, semilla = args
+    rng = np.random.default_rng(semilla)
+    if metodo == "GBM":
+        caminos = caminos_gbm(retornos, precio_inicial, n_caminos, len(fechas), rng)
+    else:
+        caminos = caminos_bootstrap(retornos, precio_inicial, n_caminos, len(fechas), bloque, rng)
+    res = simular_lote(caminos, fechas, p, guardar_ltv=True, metricas_riesgo=True)
+    return (res.equity_final, res.bench_final, res.dinero_invertido, res.bench_invertido,
+            res.liquidado, res.dia_liq, res.dias_decision, res.ltv_decisiones, res.riesgo)
+
+def simular_montecarlo(precios, p, n_caminos=1000, anyos=5, metodo="Bootstrap por bloques",
+                       bloque=30, semilla=0, trozo=1000, procesos=None):
+    """
+    Ejecuta la estrategia sobre `n_caminos` caminos sintéticos de `anyos` años que
+    arrancan en el último precio de `precios`.
+
+    `procesos=None` usa todos los núcleos cuando hay más de un trozo; con
+    `procesos=1` todo se ejecuta en el proceso actual.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconocido: {metodo}")
+    retornos = retornos_log(precios)
+    if len(retornos) < 2:
+        raise ValueError("La serie histórica es demasiado corta para generar caminos.")
+    precio_inicial = float(np.asarray(precios, dtype=float)[-1])
+    inicio = pd.Timestamp(precios.index[-1]) + pd.Timedelta(days=1) if hasattr(precios, "index") else pd.Timestamp.today().normalize()
+    fechas = pd.date_range(inicio, periods=int(round(anyos * 365.25)) + 1, freq='D')
+
+    tamanos = [min(trozo, n_caminos - desde) for desde in range(0, n_caminos, trozo)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(tamanos))
+    tareas = [(retornos, precio_inicial, fechas, p, tam, metodo, bloque, s) for tam, s in zip(tamanos, semillas)]
+
+    procesos = procesos or os.cpu_count() or 1
+    if procesos > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as pool:
+            partes = list(pool.map(_simular_trozo, tareas))
+    else:
+        partes = [_simular_trozo(t) for t in tareas]
+
+    equity, bench, invertido, bench_inv, liquidado, dia_liq, dias_decision, ltv, riesgo = zip(*partes)
+    ltv = np.concatenate(ltv)
+    with warnings.catch_warnings():
+        # Columnas sin caminos vivos: la banda queda en NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        bandas = {q: np.nanpercentile(ltv, q, axis=0) for q in PERCENTILES_LTV}
+    return ResultadoMonteCarlo(
+        fechas=fechas,
+        equity_final=np.concatenate(equity),
+        bench_final=np.concatenate(bench),
+        dinero_invertido=np.concatenate(invertido),
+        bench_invertido=np.concatenate(bench_inv),
+        liquidado=np.concatenate(liquidado),
+        dia_liq=np.concatenate(dia_liq),
+        fechas_ltv=fechas[dias_decision[0]],
+        bandas_ltv=bandas,
+        riesgo=MetricasRiesgo(**{f.name: np.concatenate([getattr(r, f.name) for r in riesgo])
+                                 for f in fields(MetricasRiesgo)}),
+    )
+
+def figura_montecarlo(res, liq_threshold, trigger_defensa):
+    """Distribución de equity final, bandas de LTV y probabilidad acumulada de liquidación."""
+    fig, axes = plt.subplots(3, 1, figsize=(12, 14))
+
+    axes[0].set_title("1. Equity Final: Estrategia vs Benchmark", fontweight='bold')
+    positivos = np.concatenate([res.equity_final, res.bench_final])
+    positivos = positivos[positivos > 0]
+    bins = np.geomspace(positivos.min(), positivos.max(), 60) if len(positivos) else 60
+    axes[0].hist(res.equity_final[res.equity_final > 0], bins=bins, alpha=0.6, color='#1f77b4', label='Tu Estrategia (sin liquidar)')
+    axes[0].hist(res.bench_final, bins=bins, alpha=0.5, color='gray', label='Benchmark DCA')
+    axes[0].set_xscale('log')
+    axes[0].set_xlabel("Equity final ($)")
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+
+    axes[1].set_title("2. Bandas de LTV (caminos vivos)", fontweight='bold')
+    if res.bandas_ltv:
+        axes[1].fill_between(res.fechas_ltv, res.bandas_ltv[5] * 100, res.bandas_ltv[95] * 100, color='orange', alpha=0.2, label='P5–P95')
+        axes[1].fill_between(res.fechas_ltv, res.bandas_ltv[25] * 100, res.bandas_ltv[75] * 100, color='orange', alpha=0.4, label='P25–P75')
+        axes[1].plot(res.fechas_ltv, res.bandas_ltv[50] * 100, color='darkorange', label='Mediana')
+    axes[1].axhline(liq_threshold * 100, color='red', linestyle='--', label='Liquidación')
+    axes[1].axhline(trigger_defensa * 100, color='brown', linestyle=':', label='Trigger Defensa')
+    axes[1].set_ylabel("LTV (%)")
+    axes[1].set_ylim(0, 100)
+    axes[1].legend(loc='upper left')
+    axes[1].grid(True, alpha=0.3)
+
+    axes[2].set_title("3. Probabilidad Acumulada de Liquidación", fontweight='bold')
+    curva = res.curva_liquidacion()
+    axes[2].plot(curva.index, curva.values * 100, color='red')
+    axes[2].set_ylabel("%")
+    axes[2].grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,758 @@
+"""
+Motor de simulación de la estrategia DCA Target-LTV.
+
+Separa la lógica de la estrategia del script de Streamlit para poder
+ejecutarla sin interfaz. En lugar de recorrer cada día en Python, precalcula
+con NumPy todo lo que no depende del estado (drawdown, calendario de compras,
+factores de interés) y solo itera sobre los días de decisión (compras).
+"""
+import time
+from calendar import monthrange
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import perfil
+from riesgo import AcumuladorRiesgo, MetricasRiesgo
+
+# ==========================================
+# 🎛️ PARÁMETROS
+# ==========================================
+
+@dataclass(frozen=True)
+class ParametrosEstrategia:
+    """Valores del panel de control. Inmutable para poder usarse como clave de caché."""
+    inversion_inicial: float = 1000
+    coste_deuda_apr: float = 0.05
+    frecuencia: str = "Semanal"
+    dia_semana_idx: int | None = 0
+    dia_mes: int | None = None
+    aportacion_base: float = 50
+    umbral_inicio_dca: float = 0.15
+    target_ltv_base: float = 0.25
+    target_ltv_agresivo: float = 0.40
+    umbral_dd_agresivo: float = 0.30
+    umbral_dd_safe: float = 0.05
+    umbral_ltv_safe: float = 0.40
+    liq_threshold: float = 0.75
+    pct_umbral_defensa: float = 0.80
+    multiplo_defensa: float = 2.0
+    umbral_dd_extra: float = 0.60
+    monto_extra: float = 100
+
+    def __post_init__(self):
+        # Con un umbral <= 0 se liquidaría el primer día, antes de la primera compra
+        if not self.liq_threshold > 0:
+            raise ValueError("El umbral de liquidación debe ser mayor que 0.")
+
+    @property
+    def trigger_defensa_ltv(self):
+        return self.liq_threshold * self.pct_umbral_defensa
+
+# ==========================================
+# ⚙️ FUNCIONES AUXILIARES
+# ==========================================
+
+def es_dia_de_compra(fecha, frecuencia, dia_semana_idx, dia_mes_target):
+    if frecuencia == "Semanal":
+        return fecha.dayofweek == dia_semana_idx
+    else:
+        _, ultimo_dia_mes = monthrange(fecha.year, fecha.month)
+        target = min(dia_mes_target, ultimo_dia_mes)
+        return fecha.day == target
+
+def dias_de_compra(fechas, frecuencia, dia_semana_idx, dia_mes_target):
+    """Versión vectorizada de `es_dia_de_compra`: máscara booleana sobre `fechas`."""
+    fechas = pd.DatetimeIndex(fechas)
+    if frecuencia == "Semanal":
+        return np.asarray(fechas.dayofweek == dia_semana_idx)
+    target = np.minimum(dia_mes_target, np.asarray(fechas.days_in_month))
+    return np.asarray(fechas.day) == target
+
+def calcular_deuda_para_target_ltv(colateral_actual, deuda_actual, aportacion_cash, target_ltv):
+    numerador = target_ltv * (colateral_actual + aportacion_cash) - deuda_actual
+    denominador = 1 - target_ltv
+    if denominador == 0: return 0
+    deuda_necesaria = numerador / denominador
+    return max(0, deuda_necesaria)
+
+def calcular_cagr(valor_final, valor_inicial, dias):
+    if valor_inicial == 0 or valor_final <= 0 or dias <= 0: return 0.0
+    anyos = dias / 365.25
+    return (valor_final / valor_inicial) ** (1 / anyos) - 1
+
+def calcular_drawdown(precios):
+    """Drawdown diario respecto al máximo previo (ignora NaN como el bucle original)."""
+    pico = np.fmax.accumulate(precios, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dd = np.where(pico > 0, (pico - precios) / pico, 0.0)
+    return dd
+
+def decidir_compra(p, dd, ltv, colateral_total, deuda_acumulada):
+    """
+    Decisión de un día de compra recurrente con la estrategia activa.
+    Devuelve (cash_a_invertir, deuda_a_tomar, tipo_evento, etiqueta_tabla).
+    """
+    cash_base = p.aportacion_base
+    es_extra = False
+    if dd > p.umbral_dd_extra:
+        cash_base += p.monto_extra
+        es_extra = True
+
+    if ltv > p.trigger_defensa_ltv:
+        cash_a_invertir = cash_base * p.multiplo_defensa
+        target_ltv_hoy = 0.0
+        tipo_evento = "DEFENSA"
+        etiqueta_tabla = "🛡️ Defensa"
+    else:
+        cash_a_invertir = cash_base
+        if dd < p.umbral_dd_safe or ltv > p.umbral_ltv_safe:
+            target_ltv_hoy = 0.0
+            tipo_evento = "SAFE"
+            etiqueta_tabla = "✅ Safe"
+        elif dd > p.umbral_dd_agresivo:
+            target_ltv_hoy = p.target_ltv_agresivo
+            tipo_evento = "AGRESIVO"
+            etiqueta_tabla = "🔥 Agresivo"
+        else:
+            target_ltv_hoy = p.target_ltv_base
+            tipo_evento = "BASE"
+            etiqueta_tabla = "⚖️ Base"
+
+        if es_extra:
+            tipo_evento += "+EXTRA"
+            etiqueta_tabla += " + Extra"
+
+    if target_ltv_hoy > 0:
+        deuda_a_tomar = calcular_deuda_para_target_ltv(colateral_total, deuda_acumulada, cash_a_invertir, target_ltv_hoy)
+    else:
+        deuda_a_tomar = 0
+    return cash_a_invertir, deuda_a_tomar, tipo_evento, etiqueta_tabla
+
+# ==========================================
+# 🚀 MOTOR
+# ==========================================
+
+EVENTOS = (None, "INICIO", "SAFE", "SAFE+EXTRA", "BASE", "BASE+EXTRA",
+           "AGRESIVO", "AGRESIVO+EXTRA", "DEFENSA", "💀 LIQ")
+CODIGO_EVENTO = {nombre: codigo for codigo, nombre in enumerate(EVENTOS)}
+
+@dataclass
+class PuntoControl:
+    """
+    Estado tras cada día de decisión de una simulación (posiciones `idx` de la
+    serie), más el LTV con el que se tomó cada decisión. Permite reanudar la
+    simulación con otros parámetros desde el primer día que cambian.
+    """
+    p: ParametrosEstrategia
+    idx: np.ndarray
+    btc: np.ndarray
+    deuda: np.ndarray
+    invertido: np.ndarray
+    tomado: np.ndarray
+    bench_btc: np.ndarray
+    bench_invertido: np.ndarray
+    evento: np.ndarray
+    ltv_previo: np.ndarray
+    registros: list
+    dia_registro: list
+
+@dataclass
+class ResultadoSimulacion:
+    """Salida del motor: series diarias en arrays NumPy y estado final."""
+    fechas: pd.DatetimeIndex
+    equity_strat: np.ndarray
+    equity_bench: np.ndarray
+    ltv: np.ndarray
+    drawdown: np.ndarray
+    codigo_evento: np.ndarray
+    registros: list
+    dinero_invertido: float
+    deuda_acumulada: float
+    intereses_pagados: float
+    btc_acumulado: float
+    bench_btc: float
+    bench_invertido: float
+    liquidado: bool
+    fecha_liq: pd.Timestamp | None
+    control: PuntoControl | None = field(default=None, kw_only=True, repr=False)
+    riesgo: MetricasRiesgo | None = field(default=None, kw_only=True)
+    riesgo_bench: MetricasRiesgo | None = field(default=None, kw_only=True)
+
+    @property
+    def evento(self):
+        return np.array(EVENTOS, dtype=object)[self.codigo_evento]
+
+    def historia(self):
+        """DataFrame diario con las mismas columnas que el antiguo dict `historia`."""
+        with perfil.fase("motor.historia"):
+            return pd.DataFrame({
+                'Equity_Strat': self.equity_strat, 'LTV': self.ltv, 'Drawdown': self.drawdown,
+                'Evento': self.evento, 'Equity_Bench': self.equity_bench,
+            }, index=pd.DatetimeIndex(self.fechas, name='Fecha'))
+
+def calcular_resumen(r):
+    """Métricas finales de la tabla comparativa (mismas fórmulas que la app)."""
+    dias_totales = (r.fechas[-1] - r.fechas[0]).days
+
+    strat_val_final = 0 if r.liquidado else r.equity_strat[-1]
+    strat_roi = -100 if r.liquidado else ((strat_val_final - r.dinero_invertido) / r.dinero_invertido) * 100
+    strat_cagr = calcular_cagr(strat_val_final, r.dinero_invertido, dias_totales)
+
+    bench_val_final = r.equity_bench[-1]
+    bench_roi = ((bench_val_final - r.bench_invertido) / r.bench_invertido) * 100
+    bench_cagr = calcular_cagr(bench_val_final, r.bench_invertido, dias_totales)
+    return {
+        'dias_totales': dias_totales,
+        'strat_val_final': strat_val_final, 'strat_roi': strat_roi, 'strat_cagr': strat_cagr,
+        'bench_val_final': bench_val_final, 'bench_roi': bench_roi, 'bench_cagr': bench_cagr,
+    }
+
+def _decisiones_vector(p, dd, dd_max, ltv):
+    """Rama, efectivo y LTV objetivo de `decidir_compra` para muchos días a la vez (código 0 = DCA inactivo)."""
+    activo = dd_max >= p.umbral_inicio_dca
+    extra = dd > p.umbral_dd_extra
+    defensa = ltv > p.trigger_defensa_ltv
+    safe = (dd < p.umbral_dd_safe) | (ltv > p.umbral_ltv_safe)
+    agresivo = dd > p.umbral_dd_agresivo
+    rama = np.select([~activo, defensa, safe, agresivo], [0, 1, 2, 3], 4)
+    cash_base = np.where(extra, p.aportacion_base + p.monto_extra, p.aportacion_base)
+    cash = np.where(activo, np.where(defensa, cash_base * p.multiplo_defensa, cash_base), 0.0)
+    target = np.select([rama <= 2, rama == 3], [0.0, p.target_ltv_agresivo], p.target_ltv_base)
+    return rama, extra & activo & ~defensa, cash, target
+
+def primera_decision_afectada(control, p, dd):
+    """
+    Primer día de decisión (posición en `control.idx`) en el que `p` puede decidir
+    algo distinto que los parámetros de `control`. Hasta ese día el camino es
+    idéntico, así que se puede reanudar desde el estado guardado del día anterior.
+    """
+    q = control.p
+    k = len(control.idx)
+    if any(getattr(p, c) != getattr(q, c) for c in CAMPOS_CALENDARIO) or p.inversion_inicial != q.inversion_inicial:
+        return 0
+    if p.aportacion_base != q.aportacion_base:
+        # El benchmark cambia en todas las aportaciones
+        return min(1, k)
+    afectada = k
+    if p.coste_deuda_apr != q.coste_deuda_apr:
+        con_deuda = np.flatnonzero(control.deuda[:-1] > 0)
+        if len(con_deuda):
+            afectada = con_deuda[0] + 1
+    # Una compra es igual si coinciden la rama, la etiqueta Extra, el efectivo y el LTV objetivo
+    dd_dec = dd[control.idx]
+    dd_max_dec = np.fmax.accumulate(dd)[control.idx]
+    antes = _decisiones_vector(q, dd_dec, dd_max_dec, control.ltv_previo)
+    despues = _decisiones_vector(p, dd_dec, dd_max_dec, control.ltv_previo)
+    distinta = np.zeros(k, dtype=bool)
+    for a, b in zip(antes, despues):
+        distinta |= a != b
+    distinta[control.idx == 0] = False  # el día de INICIO no depende de la estrategia
+    cambios = np.flatnonzero(distinta)
+    return min(afectada, cambios[0]) if len(cambios) else afectada
+
+def simular(precios, fechas, p, anterior=None):
+    """
+    Ejecuta la estrategia Target-LTV y el benchmark DCA sobre una serie de precios.
+
+    Reproduce el antiguo bucle diario de `app.py` (incluida la liquidación y las
+    filas de `registros`), pero saltando de un día de compra al siguiente: entre
+    compras el colateral es constante y la deuda solo crece por intereses, así que
+    esos días se rellenan después de forma vectorizada.
+
+    Con `anterior` (un resultado de los mismos precios y fechas con otros
+    parámetros) se reutiliza su estado hasta el primer día de decisión que los
+    nuevos parámetros pueden cambiar y el bucle solo recorre el resto.
+    """
+    precios = np.asarray(precios, dtype=float)
+    fechas = pd.DatetimeIndex(fechas)
+    n = len(precios)
+    if n == 0:
+        raise ValueError("La serie de precios está vacía.")
+
+    # --- PRECÁLCULOS ---
+    dd = calcular_drawdown(precios)
+    dca_activo = np.fmax.accumulate(dd) >= p.umbral_inicio_dca
+    es_compra = dias_de_compra(fechas, p.frecuencia, p.dia_semana_idx, p.dia_mes)
+    es_compra[0] = True
+    idx = np.flatnonzero(es_compra)
+    k = len(idx)
+    etiquetas_fecha = fechas[idx].strftime('%Y-%m-%d')
+    g = 1 + p.coste_deuda_apr / 365.0
+
+    # Estado tras cada día de decisión
+    btc_dec = np.empty(k)
+    deuda_dec = np.empty(k)
+    invertido_dec = np.empty(k)
+    tomado_dec = np.empty(k)
+    bench_btc_dec = np.empty(k)
+    bench_inv_dec = np.empty(k)
+    evento_dec = np.empty(k, dtype=np.int8)
+    ltv_previo_dec = np.zeros(k)
+    registros = []
+    dia_registro = []
+
+    btc_acumulado = deuda_acumulada = dinero_invertido = deuda_tomada = 0.0
+    bench_btc = bench_invertido = 0.0
+    previo = 0
+    desde = 0
+    t0 = time.perf_counter()
+
+    # --- REANUDACIÓN DESDE UNA SIMULACIÓN ANTERIOR ---
+    if anterior is not None and anterior.control is not None and len(anterior.control.idx) == k:
+        c = anterior.control
+        desde = primera_decision_afectada(c, p, dd)
+        if desde > 0:
+            for destino, origen in ((btc_dec, c.btc), (deuda_dec, c.deuda), (invertido_dec, c.invertido),
+                                    (tomado_dec, c.tomado), (bench_btc_dec, c.bench_btc),
+                                    (bench_inv_dec, c.bench_invertido), (evento_dec, c.evento),
+                                    (ltv_previo_dec, c.ltv_previo)):
+                destino[:desde] = origen[:desde]
+            corte = np.searchsorted(c.dia_registro, idx[desde], side='left') if desde < k else len(c.dia_registro)
+            registros = c.registros[:corte]
+            dia_registro = c.dia_registro[:corte]
+            s = desde - 1
+            btc_acumulado, deuda_acumulada = float(btc_dec[s]), float(deuda_dec[s])
+            dinero_invertido, deuda_tomada = float(invertido_dec[s]), float(tomado_dec[s])
+            bench_btc, bench_invertido = float(bench_btc_dec[s]), float(bench_inv_dec[s])
+            previo = int(idx[s])
+        perfil.contar("decisiones_reutilizadas", desde)
+
+    # --- BUCLE DE DECISIONES ---
+    for s, i in enumerate(idx[desde:].tolist(), start=desde):
+        precio = precios[i]
+        if deuda_acumulada > 0:
+            deuda_acumulada *= g ** (i - previo)
+        previo = i
+
+        if i == 0:
+            btc_acumulado += p.inversion_inicial / precio
+            dinero_invertido += p.inversion_inicial
+            bench_btc += p.inversion_inicial / precio
+            bench_invertido += p.inversion_inicial
+            tipo_evento = "INICIO"
+            registros.append({
+                'Fecha': etiquetas_fecha[s], 'Precio': precio, 'Tipo': "INICIO",
+                'Cash ($)': p.inversion_inicial, 'Deuda Nueva ($)': 0,
+                'LTV Post (%)': 0, 'DD (%)': dd[i] * 100
+            })
+            dia_registro.append(i)
+        else:
+            bench_btc += p.aportacion_base / precio
+            bench_invertido += p.aportacion_base
+            colateral_total = btc_acumulado * precio
+            ltv = deuda_acumulada / colateral_total if colateral_total > 0 else 0.0
+            ltv_previo_dec[s] = ltv
+
+            if dca_activo[i]:
+                cash_a_invertir, deuda_a_tomar, tipo_evento, etiqueta_tabla = decidir_compra(
+                    p, dd[i], ltv, colateral_total, deuda_acumulada)
+
+                btc_acumulado += (cash_a_invertir + deuda_a_tomar) / precio
+                deuda_acumulada += deuda_a_tomar
+                deuda_tomada += deuda_a_tomar
+                dinero_invertido += cash_a_invertir
+
+                ltv_post = deuda_acumulada / (btc_acumulado * precio)
+                registros.append({
+                    'Fecha': etiquetas_fecha[s], 'Precio': precio, 'Tipo': etiqueta_tabla,
+                    'Cash ($)': cash_a_invertir, 'Deuda Nueva ($)': deuda_a_tomar,
+                    'LTV Post (%)': ltv_post * 100, 'DD (%)': dd[i] * 100
+                })
+                dia_registro.append(i)
+            else:
+                tipo_evento = None
+
+        btc_dec[s] = btc_acumulado
+        deuda_dec[s] = deuda_acumulada
+        invertido_dec[s] = dinero_invertido
+        tomado_dec[s] = deuda_tomada
+        bench_btc_dec[s] = bench_btc
+        bench_inv_dec[s] = bench_invertido
+        evento_dec[s] = CODIGO_EVENTO[tipo_evento]
+
+    perfil.sumar("motor.bucle", time.perf_counter() - t0)
+    t0 = time.perf_counter()
+
+    # --- RELLENO DIARIO ---
+    dias = np.arange(n)
+    # Última decisión <= día (estado al cierre) y < día (estado antes de comprar)
+    post = np.searchsorted(idx, dias, side='right') - 1
+    pre = np.searchsorted(idx, dias, side='left') - 1
+    pre_c = np.maximum(pre, 0)
+
+    deuda_pre = np.where(pre >= 0, deuda_dec[pre_c] * g ** (dias - idx[pre_c]), 0.0)
+    colateral_pre = np.where(pre >= 0, btc_dec[pre_c], 0.0) * precios
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ltv = np.where(colateral_pre > 0, deuda_pre / colateral_pre, 0.0)
+
+    # Sin colateral (antes de la primera compra) no hay nada que liquidar
+    liq = np.flatnonzero((ltv >= p.liq_threshold) & (pre >= 0))
+    liquidado = len(liq) > 0
+    fin = liq[0] + 1 if liquidado else n
+
+    deuda_post = deuda_dec[post] * g ** (dias - idx[post])
+    equity_strat = btc_dec[post] * precios - deuda_post
+    equity_bench = bench_btc_dec[post] * precios
+    invertido_dia = invertido_dec[post]
+    bench_inv_dia = bench_inv_dec[post]
+    codigo_evento = evento_dec[post]
+    control = PuntoControl(p, idx, btc_dec, deuda_dec, invertido_dec, tomado_dec, bench_btc_dec, bench_inv_dec,
+                           evento_dec, ltv_previo_dec, registros, dia_registro)
+
+    fecha_liq = None
+    if liquidado:
+        dia_liq = fin - 1
+        fecha_liq = fechas[dia_liq]
+        # El día de la liquidación no llega a comprar: manda el estado previo
+        s = pre[dia_liq]
+        btc_acumulado = btc_dec[s]
+        deuda_acumulada = deuda_pre[dia_liq]
+        dinero_invertido = invertido_dec[s]
+        deuda_tomada = tomado_dec[s]
+        bench_btc = bench_btc_dec[s]
+        bench_invertido = bench_inv_dec[s]
+        equity_strat[dia_liq] = 0
+        equity_bench[dia_liq] = bench_btc * precios[dia_liq]
+        invertido_dia[dia_liq] = dinero_invertido
+        bench_inv_dia[dia_liq] = bench_invertido
+        codigo_evento[dia_liq] = CODIGO_EVENTO["💀 LIQ"]
+        corte = np.searchsorted(dia_registro, dia_liq, side='left')
+        registros = registros[:corte]
+        registros.append({'Fecha': fecha_liq, 'Tipo': 'LIQUIDACIÓN', 'LTV': ltv[dia_liq]})
+    else:
+        deuda_acumulada = deuda_post[-1]
+
+    riesgo = AcumuladorRiesgo(trigger_defensa=p.trigger_defensa_ltv)
+    riesgo.actualizar(equity_strat[:fin], invertido_dia[:fin])
+    riesgo.actualizar_ltv(ltv[:fin])
+    riesgo_bench = AcumuladorRiesgo()
+    riesgo_bench.actualizar(equity_bench[:fin], bench_inv_dia[:fin])
+    perfil.sumar("motor.relleno", time.perf_counter() - t0)
+    perfil.contar("barras", fin)
+    perfil.contar("decisiones", k)
+    perfil.contar("compras", len(registros) - liquidado)
+
+    return ResultadoSimulacion(
+        fechas=fechas[:fin],
+        equity_strat=equity_strat[:fin],
+        equity_bench=equity_bench[:fin],
+        ltv=ltv[:fin],
+        drawdown=dd[:fin],
+        codigo_evento=codigo_evento[:fin],
+        registros=registros,
+        dinero_invertido=dinero_invertido,
+        deuda_acumulada=deuda_acumulada,
+        intereses_pagados=deuda_acumulada - deuda_tomada,
+        btc_acumulado=btc_acumulado,
+        bench_btc=bench_btc,
+        bench_invertido=bench_invertido,
+        liquidado=liquidado,
+        fecha_liq=fecha_liq,
+        control=control,
+        riesgo=riesgo.metricas(equity_strat[fin - 1], dinero_invertido, deuda_acumulada - deuda_tomada),
+        riesgo_bench=riesgo_bench.metricas(equity_bench[fin - 1], bench_invertido),
+    )
+
+# ==========================================
+# 🧮 MOTOR POR LOTES (VARIOS CARRILES)
+# ==========================================
+
+CAMPOS_CALENDARIO = ("frecuencia", "dia_semana_idx", "dia_mes")
+
+@dataclass
+class ResultadoLote:
+    """Resultado final por carril (combinación de parámetros, camino o fecha de inicio)."""
+    fechas: pd.DatetimeIndex
+    inicios: np.ndarray
+    equity_final: np.ndarray
+    bench_final: np.ndarray
+    dinero_invertido: np.ndarray
+    bench_invertido: np.ndarray
+    deuda_acumulada: np.ndarray
+    intereses_pagados: np.ndarray
+    ltv_max: np.ndarray
+    liquidado: np.ndarray
+    dia_liq: np.ndarray
+    dias: np.ndarray
+    dias_decision: np.ndarray | None = None
+    ltv_decisiones: np.ndarray | None = None
+    detenido: np.ndarray | None = None
+    riesgo: MetricasRiesgo | None = None
+    riesgo_bench: MetricasRiesgo | None = None
+
+    @property
+    def fecha_liq(self):
+        fechas = self.fechas[np.maximum(self.dia_liq, 0)]
+        return fechas.where(self.liquidado, pd.NaT)
+
+    @property
+    def roi(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi = (self.equity_final - self.dinero_invertido) / self.dinero_invertido * 100
+        return np.where(self.liquidado, -100.0, roi)
+
+    @property
+    def bench_roi(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.bench_final - self.bench_invertido) / self.bench_invertido * 100
+
+    @property
+    def cagr(self):
+        return calcular_cagr_vector(self.equity_final, self.dinero_invertido, self.dias)
+
+    @property
+    def bench_cagr(self):
+        return calcular_cagr_vector(self.bench_final, self.bench_invertido, self.dias)
+
+def calcular_cagr_vector(valor_final, valor_inicial, dias):
+    """`calcular_cagr` elemento a elemento."""
+    valor_final, valor_inicial, dias = np.broadcast_arrays(
+        np.asarray(valor_final, dtype=float), np.asarray(valor_inicial, dtype=float), np.asarray(dias, dtype=float))
+    valido = (valor_inicial != 0) & (valor_final > 0) & (dias > 0)
+    cagr = np.zeros(valor_final.shape)
+    cagr[valido] = (valor_final[valido] / valor_inicial[valido]) ** (365.25 / dias[valido]) - 1
+    return cagr
+
+def _parametros_carril(p, variaciones, n):
+    """Un array de longitud `n` por cada parámetro numérico."""
+    variaciones = variaciones or {}
+    for campo in CAMPOS_CALENDARIO:
+        if campo in variaciones:
+            raise ValueError(f"'{campo}' define el calendario de compras y no puede variar entre carriles.")
+    valores = {}
+    for campo in ParametrosEstrategia.__dataclass_fields__:
+        if campo in CAMPOS_CALENDARIO:
+            continue
+        valor = variaciones.get(campo, getattr(p, campo))
+        valores[campo] = np.broadcast_to(np.asarray(valor, dtype=float), (n,))
+    return valores
+
+def simular_lote(precios, fechas, p, variaciones=None, inicios=None, guardar_ltv=False, ltv_tope=None,
+                 metricas_riesgo=False):
+    """
+    Ejecuta la estrategia en muchos carriles a la vez, devolviendo solo el estado final.
+
+    `precios` puede ser una serie compartida (N,) o una matriz (carriles × N).
+    `variaciones` asigna a cualquier campo numérico de `p` un array por carril, y
+    `inicios` el índice del día en que arranca cada carril. Todos los carriles
+    comparten el calendario de compras, así que el bucle recorre una sola vez los
+    días de decisión y cada paso opera sobre vectores de carriles. Entre decisiones
+    se usa el máximo de `g^t / precio` del tramo para detectar la liquidación sin
+    materializar la serie diaria.
+
+    Con `guardar_ltv` se conserva además el LTV de cada carril en cada día de
+    decisión (antes de comprar; NaN una vez liquidado).
+
+    Con `ltv_tope` un carril se detiene en cuanto su LTV alcanza el tope, igual
+    que si lo liquidaran (`detenido`), aunque `liquidado` solo marca los que
+    llegan a `liq_threshold`. El bucle termina cuando no queda ningún carril vivo.
+
+    Con `metricas_riesgo` se acumulan además las métricas de riesgo de cada
+    carril (`riesgo`, `riesgo_bench`) tramo a tramo con la equity diaria del
+    tramo, sin guardar la serie completa.
+    """
+    precios = np.asarray(precios, dtype=float)
+    fechas = pd.DatetimeIndex(fechas)
+    n = precios.shape[-1]
+    if n == 0:
+        raise ValueError("La serie de precios está vacía.")
+
+    tamanos = [len(np.atleast_1d(v)) for v in (variaciones or {}).values()]
+    if precios.ndim == 2:
+        tamanos.append(precios.shape[0])
+    if inicios is not None:
+        tamanos.append(len(np.atleast_1d(inicios)))
+    L = max(tamanos, default=1)
+    perfil.contar("lote.carriles", L)
+    inicios = np.broadcast_to(np.asarray(0 if inicios is None else inicios, dtype=np.int64), (L,))
+    v = _parametros_carril(p, variaciones, L)
+    trigger_defensa = v['liq_threshold'] * v['pct_umbral_defensa']
+    corte = v['liq_threshold'] if ltv_tope is None else np.minimum(v['liq_threshold'], ltv_tope)
+    g = 1 + v['coste_deuda_apr'] / 365.0
+    compartido = precios.ndim == 1
+
+    # --- PRECÁLCULOS ---
+    es_calendario = dias_de_compra(fechas, p.frecuencia, p.dia_semana_idx, p.dia_mes)
+    es_decision = es_calendario.copy()
+    es_decision[inicios] = True
+    idx = np.flatnonzero(es_decision)
+
+    if not inicios.any():
+        dd = calcular_drawdown(precios)
+        dd_dec = dd[..., idx]
+        ddmax_dec = np.fmax.accumulate(dd, axis=-1)[..., idx]
+    else:
+        dd_dec = np.zeros((L, len(idx)))
+        ddmax_dec = np.zeros((L, len(idx)))
+        for c in range(L):
+            serie = precios[inicios[c]:] if compartido else precios[c, inicios[c]:]
+            dd = calcular_drawdown(serie)
+            desde = np.searchsorted(idx, inicios[c])
+            dd_dec[c, desde:] = dd[idx[desde:] - inicios[c]]
+            ddmax_dec[c, desde:] = np.fmax.accumulate(dd)[idx[desde:] - inicios[c]]
+
+    # --- ESTADO POR CARRIL ---
+    btc = np.zeros(L)
+    deuda = np.zeros(L)
+    invertido = np.zeros(L)
+    tomado = np.zeros(L)
+    bench_btc = np.zeros(L)
+    bench_inv = np.zeros(L)
+    ltv_max = np.zeros(L)
+    vivo = np.ones(L, dtype=bool)
+    dia_liq = np.full(L, -1, dtype=np.int64)
+    bench_final = np.zeros(L)
+    ltv_corte = np.zeros(L)
+    ltv_dec = np.full((L, len(idx)), np.nan, dtype=np.float32) if guardar_ltv else None
+    riesgo_strat = AcumuladorRiesgo((L,), trigger_defensa) if metricas_riesgo else None
+    riesgo_bench = AcumuladorRiesgo((L,)) if metricas_riesgo else None
+
+    def revisar_tramo(desde, hasta):
+        """Liquidaciones en los días (desde, hasta] con el estado fijo tras `desde`."""
+        nonlocal deuda
+        tramo = np.arange(desde + 1, hasta + 1)
+        if len(tramo) == 0 or not vivo.any():
+            return
+        desfase = tramo - desde
+        seg = precios[tramo] if compartido else precios[:, tramo]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = (g[:, None] ** desfase) / seg
+            m = np.fmax.reduce(factor, axis=1)
+            riesgo = np.where(btc > 0, deuda / btc, 0.0)
+        pico_ltv = riesgo * m
+        en_riesgo = vivo & (btc > 0)
+        liquida = en_riesgo & (pico_ltv >= corte)
+        np.maximum(ltv_max, np.where(en_riesgo & ~liquida, pico_ltv, 0.0), out=ltv_max)
+        nuevos = np.flatnonzero(liquida)
+        if len(nuevos):
+            ltv_dias = riesgo[nuevos, None] * factor[nuevos]
+            primero = np.argmax(ltv_dias >= corte[nuevos, None], axis=1)
+            # La serie se corta en la liquidación: el LTV de ese día es el máximo del tramo
+            ltv_corte[nuevos] = ltv_dias[np.arange(len(nuevos)), primero]
+            ltv_max[nuevos] = np.maximum(ltv_max[nuevos], ltv_corte[nuevos])
+            dia = tramo[primero]
+            dia_liq[nuevos] = dia
+            vivo[nuevos] = False
+            precio_liq = precios[dia] if compartido else precios[nuevos, dia]
+            bench_final[nuevos] = bench_btc[nuevos] * precio_liq
+            deuda[nuevos] = deuda[nuevos] * g[nuevos] ** (dia - desde)
+
+    def acumular_riesgo(desde, hasta, final=False):
+        """
+        Riesgo de los carriles vivos (y ya empezados) con el estado fijo tras
+        `desde`: el LTV de (desde, hasta] y la equity de [desde, hasta), o de
+        [desde, hasta] en el último tramo (la del día `hasta` la fija la compra de
+        ese día). Un carril que se liquida en el tramo acaba ahí con equity 0.
+        """
+        carriles = np.flatnonzero(vivo & (bench_btc > 0))
+        if len(carriles) == 0:
+            return
+        dias = np.arange(desde, hasta + 1)
+        seg = precios[dias, None] if compartido else precios[carriles, desde:hasta + 1].T
+        crecimiento = g[carriles] ** (dias - desde)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ltv = np.where(btc[carriles] > 0, deuda[carriles] / btc[carriles], 0.0) * (crecimiento / seg)
+        liquida = ltv[1:] >= corte[carriles]
+        cae = liquida.any(axis=0)
+        dia_liq_tramo = desde + 1 + (np.argmax(liquida, axis=0) if hasta > desde else 0)
+        ltv[dias[:, None] > np.where(cae, dia_liq_tramo, hasta)] = np.nan
+        ultimo = np.where(cae, dia_liq_tramo, hasta if final else hasta - 1)
+        fuera = dias[:, None] > ultimo
+        equity = btc[carriles] * seg - deuda[carriles] * crecimiento
+        equity[(dias[:, None] == ultimo) & cae] = 0.0
+        bench = bench_btc[carriles] * seg
+        equity[fuera] = bench[fuera] = np.nan
+        filas = ultimo.max() - desde + 1
+        todos = None if len(carriles) == L else carriles
+        riesgo_strat.actualizar_ltv(ltv[1:], todos)
+        riesgo_strat.actualizar(equity[:filas], invertido[carriles], todos)
+        riesgo_bench.actualizar(bench[:filas], bench_inv[carriles], todos)
+
+    # --- BUCLE DE DECISIONES (vectorizado sobre carriles) ---
+    previo = 0
+    for k, i in enumerate(idx.tolist()):
+        if metricas_riesgo:
+            acumular_riesgo(previo, i)
+        revisar_tramo(previo, i)
+        if not vivo.any():
+            break
+        deuda = np.where(vivo & (deuda > 0), deuda * g ** (i - previo), deuda)
+        previo = i
+        precio = precios[i] if compartido else precios[:, i]
+        if guardar_ltv:
+            colateral = btc * precio
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ltv_dec[:, k] = np.where(vivo, np.where(colateral > 0, deuda / colateral, 0.0), np.nan)
+
+        nuevos = vivo & (inicios == i)
+        if nuevos.any():
+            compra = np.where(nuevos, v['inversion_inicial'] / precio, 0.0)
+            btc += compra
+            bench_btc += compra
+            invertido += np.where(nuevos, v['inversion_inicial'], 0.0)
+            bench_inv += np.where(nuevos, v['inversion_inicial'], 0.0)
+
+        if not es_calendario[i]:
+            continue
+        recurrente = vivo & (inicios < i)
+        if not recurrente.any():
+            continue
+        bench_btc += np.where(recurrente, v['aportacion_base'] / precio, 0.0)
+        bench_inv += np.where(recurrente, v['aportacion_base'], 0.0)
+
+        dd = dd_dec[..., k]
+        activo = recurrente & (ddmax_dec[..., k] >= v['umbral_inicio_dca'])
+        if not activo.any():
+            continue
+        colateral = btc * precio
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ltv = np.where(colateral > 0, deuda / colateral, 0.0)
+
+        cash_base = v['aportacion_base'] + np.where(dd > v['umbral_dd_extra'], v['monto_extra'], 0.0)
+        defensa = ltv > trigger_defensa
+        safe = ~defensa & ((dd < v['umbral_dd_safe']) | (ltv > v['umbral_ltv_safe']))
+        agresivo = ~defensa & ~safe & (dd > v['umbral_dd_agresivo'])
+        base = ~defensa & ~safe & ~agresivo
+        cash = np.where(defensa, cash_base * v['multiplo_defensa'], cash_base)
+        target = np.where(agresivo, v['target_ltv_agresivo'], np.where(base, v['target_ltv_base'], 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            necesaria = (target * (colateral + cash) - deuda) / (1 - target)
+        deuda_nueva = np.where((target > 0) & (target != 1), np.maximum(0.0, necesaria), 0.0)
+        deuda_nueva = np.where(activo, deuda_nueva, 0.0)
+        cash = np.where(activo, cash, 0.0)
+
+        btc += (cash + deuda_nueva) / precio
+        deuda += deuda_nueva
+        tomado += deuda_nueva
+        invertido += cash
+
+    if metricas_riesgo:
+        acumular_riesgo(previo, n - 1, final=True)
+    revisar_tramo(previo, n - 1)
+    precio_final = precios[n - 1] if compartido else precios[:, n - 1]
+    deuda_final = np.where(vivo & (deuda > 0), deuda * g ** (n - 1 - previo), deuda)
+    equity_final = np.where(vivo, btc * precio_final - deuda_final, 0.0)
+    bench_final = np.where(vivo, bench_btc * precio_final, bench_final)
+    fin = np.where(vivo, n - 1, dia_liq)
+
+    return ResultadoLote(
+        fechas=fechas,
+        inicios=np.asarray(inicios),
+        equity_final=equity_final,
+        bench_final=bench_final,
+        dinero_invertido=invertido,
+        bench_invertido=bench_inv,
+        deuda_acumulada=deuda_final,
+        intereses_pagados=deuda_final - tomado,
+        ltv_max=ltv_max,
+        liquidado=~vivo & (ltv_corte >= v['liq_threshold']),
+        dia_liq=dia_liq,
+        dias=(fechas[fin] - fechas[inicios]).days.to_numpy(),
+        dias_decision=idx if guardar_ltv else None,
+        ltv_decisiones=ltv_dec,
+        detenido=~vivo,
+        riesgo=riesgo_strat.metricas(equity_final, invertido, deuda_final - tomado) if metricas_riesgo else None,
+        riesgo_bench=riesgo_bench.metricas(bench_final, bench_inv) if metricas_riesgo else None,
+    )
@@ -0,0 +1,168 @@
+"""
+Optimizador de parámetros por successive halving.
+
+Se sortean `n_candidatos` combinaciones de los parámetros de la estrategia y se
+simulan por rondas sobre tramos crecientes del histórico (el primer año, luego
+un tramo `eta` veces más largo... hasta la serie completa). Tras cada ronda solo
+sigue 1/`eta` de los candidatos: hasta la mitad de ese cupo son puntos repartidos
+a lo largo de la frontera de Pareto (retorno frente a LTV máximo) del tramo,
+incluido el de más retorno, y el resto los mejores según el objetivo.
+
+Es una aproximación: que un candidato ya no pueda ganar al líder solo se sabe
+con certeza cuando incumple una restricción; por retorno se descarta según el
+tramo corto, que no garantiza el orden sobre el histórico completo.
+
+Las restricciones se comprueban de forma exacta en cualquier tramo: un carril
+que liquida o supera `ltv_tope` se detiene en ese mismo día (motor por lotes
+con `ltv_tope`) y queda descartado sin simular el resto del histórico. Los
+candidatos de cada ronda se reparten en trozos entre procesos.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from barrido import PARAMETROS_BARRIDO
+from motor import simular_lote
+
+PARAMETROS_OPTIMIZABLES = (
+    "umbral_inicio_dca", "target_ltv_base", "target_ltv_agresivo", "umbral_dd_agresivo",
+    "umbral_dd_safe", "umbral_dd_extra", "umbral_ltv_safe", "pct_umbral_defensa", "multiplo_defensa",
+)
+OBJETIVOS = {"cagr": "CAGR", "equity": "Equity Final"}
+
+@dataclass
+class ResultadoOptimizacion:
+    """
+    `candidatos`: una fila por combinación con sus parámetros, la ronda en la que
+    se quedó y las métricas del último tramo simulado. `frontera`: candidatos
+    factibles sobre el histórico completo que no son dominados en (objetivo, ltv_max).
+    `dias`: longitud del histórico completo. Si en una ronda ningún candidato es
+    factible la búsqueda para ahí y ninguno llega al histórico completo.
+    """
+    objetivo: str
+    ltv_tope: float
+    parametros: tuple
+    candidatos: pd.DataFrame
+    frontera: pd.DataFrame
+    mejor: pd.Series | None
+    rondas: list
+    dias: int
+
+    @property
+    def completos(self):
+        """Candidatos simulados sobre el histórico completo (factibles o no)."""
+        return self.candidatos[self.candidatos['dias'] == self.dias]
+
+def frontera_pareto(retorno, riesgo):
+    """Índices de los puntos no dominados (más retorno con igual o menos riesgo), ordenados por riesgo."""
+    retorno = np.asarray(retorno, dtype=float)
+    orden = np.lexsort((-retorno, np.asarray(riesgo, dtype=float)))
+    maximo_previo = np.maximum.accumulate(np.r_[-np.inf, retorno[orden]])[:-1]
+    return orden[retorno[orden] > maximo_previo]
+
+def sortear_candidatos(p, parametros, n, rng):
+    """`n` combinaciones uniformes en los rangos del panel; la primera es la configuración actual."""
+    valores = {}
+    for campo in parametros:
+        _, minimo, maximo = PARAMETROS_BARRIDO[campo]
+        valores[campo] = rng.uniform(minimo, maximo, n)
+        valores[campo][0] = getattr(p, campo)
+    return pd.DataFrame(valores)
+
+def _simular_trozo(args):
+    precios, fechas, p, variaciones, ltv_tope = args
+    res = simular_lote(precios, fechas, p, variaciones, ltv_tope=ltv_tope)
+    return pd.DataFrame({
+        'equity': res.equity_final,
+        'cagr': res.cagr,
+        'bench_cagr': res.bench_cagr,
+        'ltv_max': res.ltv_max,
+        'liquidado': res.liquidado,
+        'factible': ~res.detenido,
+    })
+
+def _evaluar(precios, fechas, p, candidatos, ltv_tope, trozo, procesos):
+    tareas = [(precios, fechas, p, {c: candidatos[c].to_numpy()[desde:desde + trozo] for c in candidatos.columns}, ltv_tope)
+              for desde in range(0, len(candidatos), trozo)]
+    if procesos > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as pool:
+            partes = list(pool.map(_simular_trozo, tareas))
+    else:
+        partes = [_simular_trozo(t) for t in tareas]
+    return pd.concat(partes, ignore_index=True).set_axis(candidatos.index)
+
+def optimizar(precios, fechas, p, objetivo="cagr", ltv_tope=0.60, parametros=PARAMETROS_OPTIMIZABLES,
+              n_candidatos=243, eta=3, dias_minimos=365, semilla=0, trozo=64, procesos=None):
+    """
+    Busca los parámetros que maximizan `objetivo` ('cagr' o 'equity') sin
+    liquidación y con LTV máximo por debajo de `ltv_tope`. La primera ronda
+    simula `dias_minimos` días o más del principio del histórico.
+
+    `procesos=None` usa todos los núcleos cuando hay más de un trozo; con
+    `procesos=1` todo se ejecuta en el proceso actual.
+    """
+    if objetivo not in OBJETIVOS:
+        raise ValueError(f"Objetivo desconocido: {objetivo}")
+    precios = np.asarray(precios, dtype=float)
+    fechas = pd.DatetimeIndex(fechas)
+    n = len(precios)
+    if n < 2:
+        raise ValueError("La serie de precios es demasiado corta para optimizar.")
+    procesos = procesos or os.cpu_count() or 1
+
+    candidatos = sortear_candidatos(p, parametros, n_candidatos, np.random.default_rng(semilla))
+    # Rondas: tramos de n / eta^k barras, sin bajar de `dias_minimos`
+    horizontes = [n]
+    while len(candidatos) // eta ** len(horizontes) >= 1 and horizontes[-1] // eta >= dias_minimos:
+        horizontes.append(horizontes[-1] // eta)
+    horizontes = horizontes[::-1]
+
+    vivos = candidatos.index
+    evaluaciones, rondas = [], []
+    for ronda, h in enumerate(horizontes):
+        res = _evaluar(precios[:h], fechas[:h], p, candidatos.loc[vivos], ltv_tope, trozo, procesos)
+        evaluaciones.append(res.assign(ronda=ronda, dias=h))
+        factibles = res[res['factible']]
+        rondas.append({'ronda': ronda, 'dias': h, 'evaluados': len(res), 'factibles': len(factibles)})
+        if ronda == len(horizontes) - 1 or factibles.empty:
+            break
+        # Siguen 1/eta: parte de la frontera (ordenada por LTV, su último punto es el de más retorno)
+        # y el resto por objetivo
+        cupo = max(1, -(-len(res) // eta))
+        pareto = factibles.index[frontera_pareto(factibles[objetivo], factibles['ltv_max'])]
+        n_frontera = min(len(pareto), max(1, cupo // 2))
+        frontera = pareto[np.unique(np.linspace(0, len(pareto) - 1, n_frontera).round().astype(int))]
+        mejores = factibles[objetivo].drop(frontera).nlargest(cupo - len(frontera)).index
+        vivos = frontera.union(mejores)
+
+    # Para cada candidato, las métricas de la última ronda que llegó a simular
+    ultima = pd.concat(evaluaciones).groupby(level=0).last()
+    tabla = candidatos.join(ultima[['ronda', 'dias', 'equity', 'cagr', 'bench_cagr', 'ltv_max', 'liquidado', 'factible']])
+    completos = tabla[(tabla['dias'] == n) & tabla['factible']]
+    frontera = completos.iloc[frontera_pareto(completos[objetivo], completos['ltv_max'])]
+    mejor = completos.loc[completos[objetivo].idxmax()] if len(completos) else None
+    return ResultadoOptimizacion(objetivo=objetivo, ltv_tope=ltv_tope, parametros=tuple(parametros), candidatos=tabla,
+                                 frontera=frontera, mejor=mejor, rondas=rondas, dias=n)
+
+def figura_optimizacion(res):
+    """Retorno frente a LTV máximo de los candidatos completos, con la frontera de Pareto."""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    escala = 100 if res.objetivo == "cagr" else 1
+    factibles = res.completos[res.completos['factible']]
+    ax.scatter(factibles['ltv_max'] * 100, factibles[res.objetivo] * escala, s=15, color='gray', alpha=0.5, label='Candidatos')
+    ax.plot(res.frontera['ltv_max'] * 100, res.frontera[res.objetivo] * escala, color='#1f77b4', marker='o', label='Frontera de Pareto')
+    if res.mejor is not None:
+        ax.scatter([res.mejor['ltv_max'] * 100], [res.mejor[res.objetivo] * escala], marker='*', s=250, color='gold',
+                   edgecolor='black', zorder=3, label='Mejor')
+    ax.axvline(res.ltv_tope * 100, color='red', linestyle='--', label='Tope LTV')
+    ax.set_title(f"{OBJETIVOS[res.objetivo]} vs LTV Máximo (histórico completo)", fontweight='bold')
+    ax.set_xlabel("LTV máximo (%)")
+    ax.set_ylabel(OBJETIVOS[res.objetivo] + (" (%)" if res.objetivo == "cagr" else " ($)"))
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
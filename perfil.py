@@ -0,0 +1,110 @@
+"""
+Instrumentación opcional de cada ejecución.
+
+Los módulos marcan sus fases con `with fase("nombre"):` y sus contadores con
+`contar("nombre", n)`. Si no hay un Perfil activo en el hilo actual (lo
+normal), ambas llamadas no hacen nada. La app activa uno por ejecución en modo
+diagnóstico, lo muestra en un desplegable y lo añade como una línea JSON a un log
+local (`perfil.jsonl`), para poder seguir la latencia de cada ejecución en producción.
+Los fragmentos que Streamlit relanza por separado se miden en un Perfil propio.
+"""
+import contextvars
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_ACTIVO = contextvars.ContextVar("perfil", default=None)
+
+class Perfil:
+    """Tiempos acumulados por fase (segundos), contadores y consultas a caché de una ejecución."""
+
+    def __init__(self, etiqueta=""):
+        self.etiqueta = etiqueta
+        self.inicio = time.time()
+        self._t0 = time.perf_counter()
+        self.fases = {}
+        self.contadores = {}
+        self.cache = {}
+        self.anotaciones = {}
+        self._token = None
+
+    def __enter__(self):
+        self._token = _ACTIVO.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _ACTIVO.reset(self._token)
+
+    def registro(self):
+        """Diccionario serializable con todo lo medido hasta ahora."""
+        return {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.inicio)),
+            'etiqueta': self.etiqueta,
+            'total_s': round(time.perf_counter() - self._t0, 6),
+            'fases': {nombre: round(segundos, 6) for nombre, segundos in self.fases.items()},
+            'contadores': dict(self.contadores),
+            'cache': {nombre: {'aciertos': llamadas - fallos, 'fallos': fallos}
+                      for nombre, (llamadas, fallos) in self.cache.items()},
+            'anotaciones': dict(self.anotaciones),
+        }
+
+    def escribir(self, ruta):
+        """Añade el registro como una línea JSON al final de `ruta` y lo devuelve."""
+        registro = self.registro()
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        return registro
+
+def iniciar(etiqueta="", activo=True):
+    """Activa un Perfil nuevo en el hilo actual (o ninguno si `activo` es falso) y lo devuelve."""
+    perfil = Perfil(etiqueta) if activo else None
+    _ACTIVO.set(perfil)
+    return perfil
+
+def terminar(perfil):
+    """Desactiva `perfil` si sigue activo en el hilo, para que lo que se ejecute después no se le sume."""
+    if perfil is not None and _ACTIVO.get() is perfil:
+        _ACTIVO.set(None)
+
+def actual():
+    return _ACTIVO.get()
+
+def sumar(nombre, segundos):
+    """Suma `segundos` a la fase `nombre` del Perfil activo (para bucles que no conviene anidar en un `with`)."""
+    perfil = _ACTIVO.get()
+    if perfil is not None:
+        perfil.fases[nombre] = perfil.fases.get(nombre, 0.0) + segundos
+
+@contextmanager
+def fase(nombre):
+    """Suma al Perfil activo el tiempo del bloque; las fases repetidas se acumulan."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        sumar(nombre, time.perf_counter() - t0)
+
+def contar(nombre, n=1):
+    perfil = _ACTIVO.get()
+    if perfil is not None:
+        perfil.contadores[nombre] = perfil.contadores.get(nombre, 0) + int(n)
+
+def anotar(nombre, valor):
+    """Guarda un valor serializable tal cual en el Perfil activo (p. ej. métricas del proceso)."""
+    perfil = _ACTIVO.get()
+    if perfil is not None:
+        perfil.anotaciones[nombre] = valor
+
+def consulta_cache(nombre):
+    """Una llamada a una función cacheada; `fallo_cache` se llama desde dentro si no estaba en caché."""
+    perfil = _ACTIVO.get()
+    if perfil is not None:
+        perfil.cache.setdefault(nombre, [0, 0])[0] += 1
+
+def fallo_cache(nombre):
+    perfil = _ACTIVO.get()
+    if perfil is not None:
+        perfil.cache.setdefault(nombre, [0, 0])[1] += 1
@@ -0,0 +1,156 @@
+"""
+Métricas de riesgo calculadas en una sola pasada.
+
+Los motores van pasando a un `AcumuladorRiesgo` bloques consecutivos de la
+serie diaria (equity y dinero aportado acumulado, y aparte el LTV) a medida que
+la generan, y el acumulador solo guarda unos pocos valores por carril: la
+última equity, el máximo previo, sumas de retornos y contadores. Así no hace
+falta construir ni recorrer el DataFrame de `historia()`, y el motor por lotes
+(Monte Carlo, barrido, fechas de inicio, con `metricas_riesgo`) y el intradía,
+que nunca conservan la historia diaria, las calculan tramo a tramo.
+
+Los retornos diarios descuentan las aportaciones del día (`(E_t - aporte_t) /
+E_{t-1} - 1`) para no confundir dinero nuevo con rentabilidad; Sharpe y
+Sortino se anualizan con 365 días (la serie diaria incluye los fines de
+semana) y sin tipo libre de riesgo. Los días en NaN se ignoran.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+DIAS_ANUALES = 365
+
+@dataclass
+class MetricasRiesgo:
+    """Métricas de riesgo de una simulación (números) o de un lote (un array por carril)."""
+    max_drawdown: float
+    dias_bajo_agua: int
+    racha_bajo_agua: int
+    sharpe: float
+    sortino: float
+    ltv_max: float
+    dias_defensa: int
+    peso_intereses: float
+
+def _acumular(ufunc, x, inicial):
+    """
+    `ufunc.accumulate` por el eje de los días partiendo de `inicial`. Con muchos
+    carriles y pocos días (los tramos del motor por lotes) un bucle por días es
+    bastante más rápido que `accumulate` sobre el primer eje.
+    """
+    if x.shape[1] < 64:
+        return ufunc(ufunc.accumulate(x, axis=0), inicial)
+    salida = np.empty(x.shape, dtype=np.result_type(x, inicial))
+    acumulado = ufunc(inicial, x[0], out=salida[0])
+    for t in range(1, len(x)):
+        acumulado = ufunc(acumulado, x[t], out=salida[t])
+    return salida
+
+# Filas del estado de AcumuladorRiesgo (una columna por carril)
+CAMPOS_ESTADO = ("ultimo", "ultimo_invertido", "pico", "dd_max", "dias_bajo_agua", "racha", "racha_max",
+                 "n", "suma", "suma2", "suma_neg2", "ltv_max", "dias_defensa")
+
+class AcumuladorRiesgo:
+    """
+    Estado O(1) por carril de las métricas de riesgo. `forma` es la de los
+    carriles (`()` para una sola simulación); los bloques llevan los días en el
+    primer eje (días × carriles). Con `carriles` solo se actualizan esos
+    carriles y el bloque trae solo sus columnas.
+    """
+
+    def __init__(self, forma=(), trigger_defensa=np.inf):
+        self.forma = tuple(forma)
+        self.trigger_defensa = np.broadcast_to(np.asarray(trigger_defensa, dtype=float), self.forma).reshape(-1)
+        self.estado = np.zeros((len(CAMPOS_ESTADO), self.trigger_defensa.size))
+        self.estado[0] = np.nan
+
+    def _bloque(self, valores):
+        valores = np.asarray(valores, dtype=float)
+        return valores[:, None] if valores.ndim == 1 else valores
+
+    def actualizar(self, equity, invertido, carriles=None):
+        """
+        Añade los días siguientes de `equity` e `invertido` (dinero aportado
+        acumulado; puede ser constante en el bloque).
+        """
+        equity = self._bloque(equity)
+        if len(equity) == 0:
+            return
+        e = self.estado if carriles is None else self.estado[:, carriles]
+        ultimo, ultimo_invertido, pico_previo, dd_max, bajo_agua, racha_previa, racha_max, n, suma, suma2, suma_neg2 = e[:11]
+        invertido = np.broadcast_to(np.asarray(invertido, dtype=float).reshape(-1, equity.shape[1]), equity.shape)
+        hueco = np.isnan(equity)
+
+        # Valores del último día con dato, para saltar los huecos
+        if hueco.any():
+            pos = _acumular(np.maximum, np.where(hueco, -1, np.arange(len(equity))[:, None]), -1)
+            con_dato = pos >= 0
+            pos = np.maximum(pos, 0)
+            equity_dato = np.where(con_dato, np.take_along_axis(equity, pos, axis=0), ultimo)
+            invertido_dato = np.where(con_dato, np.take_along_axis(invertido, pos, axis=0), ultimo_invertido)
+        else:
+            equity_dato, invertido_dato = equity, invertido
+
+        # Retornos diarios sin las aportaciones del día
+        previo = np.concatenate([ultimo[None], equity_dato[:-1]])
+        aporte = invertido - np.concatenate([ultimo_invertido[None], invertido_dato[:-1]])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = (equity - aporte) / previo - 1
+        valido = (previo > 0) & np.isfinite(r)
+        r = np.where(valido, r, 0.0)
+        n += valido.sum(axis=0)
+        suma += r.sum(axis=0)
+        suma2 += np.einsum('ij,ij->j', r, r)
+        np.minimum(r, 0.0, out=r)
+        suma_neg2 += np.einsum('ij,ij->j', r, r)
+        ultimo[:] = equity_dato[-1]
+        ultimo_invertido[:] = invertido_dato[-1]
+
+        # Drawdown de la equity y tiempo bajo el agua (días por debajo del máximo previo)
+        pico = _acumular(np.fmax, equity, pico_previo)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.fmax(dd_max, np.fmax.reduce(1 - equity / pico, axis=0), out=dd_max)
+        pico_previo[:] = pico[-1]
+        bajo = equity < pico
+        bajo_agua += bajo.sum(axis=0)
+        # Racha actual: días bajo el agua desde el último día en máximos
+        cuenta = _acumular(np.add, bajo.astype(np.int64), 0)
+        base = _acumular(np.maximum, np.where(hueco | bajo, -1, cuenta), -1)
+        racha = np.where(base >= 0, cuenta - base, cuenta + racha_previa)
+        np.maximum(racha_max, racha.max(axis=0), out=racha_max)
+        racha_previa[:] = racha[-1]
+        if carriles is not None:
+            self.estado[:, carriles] = e
+
+    def actualizar_ltv(self, ltv, carriles=None):
+        """Añade el LTV (antes de comprar) de los días siguientes."""
+        ltv = self._bloque(ltv)
+        if len(ltv) == 0:
+            return
+        columnas = slice(None) if carriles is None else carriles
+        self.estado[11, columnas] = np.fmax(self.estado[11, columnas], np.fmax.reduce(ltv, axis=0))
+        self.estado[12, columnas] += (ltv > self.trigger_defensa[columnas]).sum(axis=0)
+
+    def metricas(self, equity_final, invertido, intereses=0.0):
+        """
+        MetricasRiesgo con lo acumulado. `peso_intereses` es la parte de la
+        ganancia antes de intereses que se llevaron los intereses (NaN sin ganancia).
+        """
+        e = {nombre: fila.reshape(self.forma) for nombre, fila in zip(CAMPOS_ESTADO, self.estado)}
+        n = e['n']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            media = e['suma'] / n
+            varianza = (e['suma2'] - n * media * media) / (n - 1)
+            sharpe = np.where((n > 1) & (varianza > 0), media / np.sqrt(varianza), np.nan) * np.sqrt(DIAS_ANUALES)
+            sortino = np.where(e['suma_neg2'] > 0, media / np.sqrt(e['suma_neg2'] / n), np.nan) * np.sqrt(DIAS_ANUALES)
+            intereses = np.asarray(intereses, dtype=float)
+            bruta = np.asarray(equity_final, dtype=float) - invertido + intereses
+            peso = np.where(intereses == 0, 0.0, np.where(bruta > 0, intereses / bruta, np.nan))
+        valores = {
+            'max_drawdown': e['dd_max'], 'dias_bajo_agua': e['dias_bajo_agua'].astype(np.int64),
+            'racha_bajo_agua': e['racha_max'].astype(np.int64), 'sharpe': sharpe, 'sortino': sortino,
+            'ltv_max': e['ltv_max'], 'dias_defensa': e['dias_defensa'].astype(np.int64), 'peso_intereses': peso,
+        }
+        if self.forma == ():
+            valores = {nombre: np.asarray(valor).item() for nombre, valor in valores.items()}
+        return MetricasRiesgo(**valores)
@@ -0,0 +1,31 @@
+"""
+Series de precios sintéticas y deterministas para pruebas y benchmarks.
+
+Se construyen con fórmulas cerradas (sin generador aleatorio) para que el
+resultado sea idéntico en cualquier máquina y versión de NumPy.
+"""
+import numpy as np
+import pandas as pd
+
+REGIMENES = ("calma", "crash", "liquidacion")
+
+def serie_sintetica(n, regimen="calma", inicio="2015-01-01", frecuencia="D"):
+    """
+    Serie de `n` barras:
+    - calma: tendencia alcista con ciclos de ~90 barras y caídas de ~20%.
+    - crash: subida, caída del 80% y recuperación parcial.
+    - liquidacion: ciclos apalancados seguidos de un desplome del 85% en pocas barras.
+    """
+    if regimen not in REGIMENES:
+        raise ValueError(f"Régimen desconocido: {regimen}")
+    t = np.linspace(0.0, 1.0, n)
+    ciclos = max(n / 90.0, 1.0)
+    ruido = 0.12 * np.sin(2 * np.pi * ciclos * t) + 0.04 * np.sin(2 * np.pi * ciclos * 3.7 * t + 1.3)
+    if regimen == "calma":
+        tendencia = 1.2 * t
+    elif regimen == "crash":
+        tendencia = np.interp(t, [0.0, 0.35, 0.55, 1.0], [0.0, 1.0, 1.0 + np.log(0.2), 0.6])
+    else:
+        tendencia = np.interp(t, [0.0, 0.5, 0.52, 1.0], [0.0, 0.4, 0.4 + np.log(0.15), 0.6 + np.log(0.15)])
+    precios = 10000.0 * np.exp(tendencia + ruido)
+    return pd.Series(precios, index=pd.date_range(inicio, periods=n, freq=frecuencia), name=regimen)
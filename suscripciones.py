@@ -0,0 +1,163 @@
+"""
+Alta de suscriptores en Moosend sin bloquear la página.
+
+Cada alta se guarda primero en una cola SQLite local y después se envía desde
+un pool de hilos con una única `requests.Session` (conexiones keep-alive),
+timeout acotado y reintentos con espera exponencial. Las altas que no se
+pueden entregar (red caída, 5xx, 429) se quedan en la cola y se reintentan
+más tarde; las que Moosend rechaza se descartan con su mensaje de error.
+"""
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+URL_MOOSEND = "https://api.moosend.com/v3"
+LISTA_MOOSEND = "75c61863-63dc-4fd3-9ed8-856aee90d04a"
+TIMEOUT = (3.05, 10)
+REINTENTOS = 3
+ESPERA_BASE = 0.5
+ESPERA_COLA_MAXIMA = 3600
+
+MENSAJE_EXITO = "✅ ¡Genial! Te has suscrito correctamente. Revisa tu bandeja de entrada pronto."
+MENSAJE_EN_COLA = "⏳ No hemos podido contactar con el servidor. Tu suscripción queda guardada y se enviará automáticamente."
+
+class ErrorTransitorio(Exception):
+    """Fallo de red o del servidor que merece reintentarse."""
+
+class ColaSuscripciones:
+    """Altas pendientes de entregar, en una tabla SQLite en `ruta` (la app la guarda junto a los datos)."""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._conexion = sqlite3.connect(str(ruta), check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS pendientes (
+                    id INTEGER PRIMARY KEY,
+                    nombre TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    ultimo_error TEXT,
+                    proximo_intento REAL NOT NULL
+                )""")
+
+    def guardar(self, nombre, email):
+        with self._lock:
+            return self._conexion.execute(
+                "INSERT INTO pendientes (nombre, email, proximo_intento) VALUES (?, ?, ?)",
+                (nombre, email, time.time())).lastrowid
+
+    def vencidas(self, ahora=None):
+        """[(id, nombre, email)] cuyo próximo intento ya ha llegado."""
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT id, nombre, email FROM pendientes WHERE proximo_intento <= ? ORDER BY id",
+                (time.time() if ahora is None else ahora,)).fetchall()
+
+    def borrar(self, id_):
+        with self._lock:
+            self._conexion.execute("DELETE FROM pendientes WHERE id = ?", (id_,))
+
+    def aplazar(self, id_, error):
+        """Apunta el fallo y pospone el siguiente intento (espera exponencial con tope)."""
+        with self._lock:
+            self._conexion.execute("UPDATE pendientes SET intentos = intentos + 1, ultimo_error = ? WHERE id = ?",
+                                   (error, id_))
+            intentos = self._conexion.execute("SELECT intentos FROM pendientes WHERE id = ?", (id_,)).fetchone()
+            if intentos:
+                espera = min(ESPERA_COLA_MAXIMA, 60 * 2 ** (intentos[0] - 1))
+                self._conexion.execute("UPDATE pendientes SET proximo_intento = ? WHERE id = ?",
+                                       (time.time() + espera, id_))
+
+    def __len__(self):
+        with self._lock:
+            return self._conexion.execute("SELECT COUNT(*) FROM pendientes").fetchone()[0]
+
+class ClienteMoosend:
+    """
+    `suscribir()` devuelve al instante un Future con `(exito, mensaje)`; el
+    envío ocurre en segundo plano y `exito` es None si el alta quedó en cola.
+    `reintentar_pendientes()` relanza las altas vencidas de la cola (la app lo
+    llama en cada ejecución).
+    """
+
+    def __init__(self, api_key, cola, lista=LISTA_MOOSEND, url=URL_MOOSEND,
+                 timeout=TIMEOUT, reintentos=REINTENTOS, espera=ESPERA_BASE, hilos=2):
+        self.api_key = api_key
+        self.endpoint = f"{url}/subscribers/{lista}/subscribe.json"
+        self.cola = cola
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.espera = espera
+        self.sesion = requests.Session()
+        self.sesion.headers.update({'Content-Type': 'application/json', 'Accept': 'application/json'})
+        self.sesion.mount("https://", HTTPAdapter(pool_maxsize=hilos))
+        self.sesion.mount("http://", HTTPAdapter(pool_maxsize=hilos))
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="moosend")
+        self._en_curso = set()
+        self._lock = threading.Lock()
+
+    def _post(self, nombre, email):
+        """Una petición a Moosend: (exito, mensaje) o ErrorTransitorio."""
+        data = {'Name': nombre, 'Email': email, 'HasExternalDoubleOptIn': False}
+        try:
+            response = self.sesion.post(self.endpoint, params={'apikey': self.api_key}, json=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ErrorTransitorio(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise ErrorTransitorio(f"HTTP {response.status_code}")
+        if response.status_code != 200:
+            return False, f"❌ Error de conexión (HTTP {response.status_code})"
+        resp_json = response.json()
+        if resp_json.get("Code") == 0:
+            return True, MENSAJE_EXITO
+        return False, f"⚠️ Hubo un problema con el registro: {resp_json.get('Error', 'Error desconocido')}"
+
+    def _entregar(self, id_, nombre, email):
+        try:
+            for intento in range(self.reintentos):
+                try:
+                    exito, mensaje = self._post(nombre, email)
+                    break
+                except ErrorTransitorio as e:
+                    if intento == self.reintentos - 1:
+                        self.cola.aplazar(id_, str(e))
+                        return None, MENSAJE_EN_COLA
+                    time.sleep(self.espera * 2 ** intento)
+            # Entregada o rechazada por Moosend: en ambos casos sale de la cola
+            self.cola.borrar(id_)
+            return exito, mensaje
+        except Exception as e:
+            # Fallo inesperado (p. ej. un 200 que no es JSON): sigue en la cola y se reintenta más tarde
+            self.cola.aplazar(id_, str(e))
+            return None, MENSAJE_EN_COLA
+        finally:
+            with self._lock:
+                self._en_curso.discard(id_)
+
+    def _lanzar(self, id_, nombre, email):
+        with self._lock:
+            if id_ in self._en_curso:
+                return None
+            self._en_curso.add(id_)
+        return self._pool.submit(self._entregar, id_, nombre, email)
+
+    def suscribir(self, nombre, email):
+        """Guarda el alta en la cola y la envía en segundo plano. Future -> (exito, mensaje)."""
+        return self._lanzar(self.cola.guardar(nombre, email), nombre, email)
+
+    def reintentar_pendientes(self):
+        """Relanza las altas vencidas que no estén ya en curso. Devuelve sus Futures."""
+        futuros = [self._lanzar(*fila) for fila in self.cola.vencidas()]
+        return [f for f in futuros if f is not None]
+
+    def cerrar(self):
+        self._pool.shutdown(wait=True)
+        self.sesion.close()
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Los módulos de la app viven en la raíz del repositorio (sin paquete instalable)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
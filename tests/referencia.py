@@ -0,0 +1,166 @@
+"""
+Copia literal del bucle diario original de `app.py` (antes del motor por eventos).
+
+Es la referencia contra la que se comprueban los motores: cualquier
+optimización debe reproducir estas salidas.
+"""
+import pandas as pd
+
+from motor import calcular_deuda_para_target_ltv, es_dia_de_compra
+
+def simular_referencia(precios, fechas, p):
+    """Devuelve (df, registros, estado_final) como lo calculaba la app original."""
+    # --- ESTADOS ---
+    btc_acumulado = 0.0
+    deuda_acumulada = 0.0
+    dinero_invertido = 0.0
+    intereses_pagados = 0.0
+    estrategia_activa_dca = False 
+    compra_inicial_hecha = False
+
+    bench_btc = 0.0
+    bench_invertido = 0.0
+
+    pico_precio = 0.0
+    historia = {
+        'Fecha': [], 
+        'Equity_Strat': [], 'LTV': [], 'Drawdown': [], 'Evento': [],
+        'Equity_Bench': []
+    }
+    registros = []
+    liquidado = False
+    fecha_liq = None
+
+    # --- BUCLE DIARIO ---
+    for i, fecha in enumerate(fechas):
+        precio = precios[i]
+
+        # Intereses
+        if deuda_acumulada > 0:
+            interes = deuda_acumulada * (p.coste_deuda_apr / 365.0)
+            deuda_acumulada += interes
+            intereses_pagados += interes
+
+        # Drawdown
+        if precio > pico_precio: pico_precio = precio
+        dd = 0.0
+        if pico_precio > 0: dd = (pico_precio - precio) / pico_precio
+
+        # Trigger DCA
+        if not estrategia_activa_dca and dd >= p.umbral_inicio_dca:
+            estrategia_activa_dca = True
+
+        # LTV y Liquidación
+        colateral_total = btc_acumulado * precio
+        ltv = 0.0
+        if colateral_total > 0: ltv = deuda_acumulada / colateral_total
+
+        if ltv >= p.liq_threshold:
+            liquidado = True
+            fecha_liq = fecha
+            historia['Fecha'].append(fecha)
+            historia['Equity_Strat'].append(0)
+            historia['Equity_Bench'].append(bench_btc * precio)
+            historia['LTV'].append(ltv)
+            historia['Drawdown'].append(dd)
+            historia['Evento'].append("💀 LIQ")
+            registros.append({'Fecha': fecha, 'Tipo': 'LIQUIDACIÓN', 'LTV': ltv})
+            break
+
+        # --- COMPRAS ---
+        # A) INICIO
+        if i == 0: 
+            # Estrategia
+            btc_acumulado += p.inversion_inicial / precio
+            dinero_invertido += p.inversion_inicial
+            compra_inicial_hecha = True
+            # Benchmark
+            bench_btc += p.inversion_inicial / precio
+            bench_invertido += p.inversion_inicial
+
+            tipo_evento = "INICIO"
+            etiqueta_tabla = "Inversión Inicial"
+
+            registros.append({
+                'Fecha': fecha.strftime('%Y-%m-%d'), 'Precio': precio, 'Tipo': "INICIO",
+                'Cash ($)': p.inversion_inicial, 'Deuda Nueva ($)': 0,
+                'LTV Post (%)': 0, 'DD (%)': dd * 100
+            })
+
+        # B) RECURRENTE
+        elif es_dia_de_compra(fecha, p.frecuencia, p.dia_semana_idx, p.dia_mes):
+
+            # Benchmark (Siempre compra)
+            bench_btc += p.aportacion_base / precio
+            bench_invertido += p.aportacion_base
+
+            # Estrategia
+            if estrategia_activa_dca:
+                cash_base = p.aportacion_base
+                cash_a_invertir = 0.0
+                deuda_a_tomar = 0.0
+
+                es_extra = False
+                if dd > p.umbral_dd_extra:
+                    cash_base += p.monto_extra
+                    es_extra = True
+
+                if ltv > p.trigger_defensa_ltv:
+                    cash_a_invertir = cash_base * p.multiplo_defensa
+                    target_ltv_hoy = 0.0 
+                    tipo_evento = "DEFENSA"
+                    etiqueta_tabla = f"🛡️ Defensa"
+                else:
+                    cash_a_invertir = cash_base
+                    if dd < p.umbral_dd_safe or ltv > p.umbral_ltv_safe:
+                        target_ltv_hoy = 0.0 
+                        tipo_evento = "SAFE"
+                        etiqueta_tabla = "✅ Safe"
+                    elif dd > p.umbral_dd_agresivo:
+                        target_ltv_hoy = p.target_ltv_agresivo
+                        tipo_evento = "AGRESIVO"
+                        etiqueta_tabla = f"🔥 Agresivo"
+                    else:
+                        target_ltv_hoy = p.target_ltv_base
+                        tipo_evento = "BASE"
+                        etiqueta_tabla = f"⚖️ Base"
+
+                    if es_extra:
+                        tipo_evento += "+EXTRA"
+                        etiqueta_tabla += " + Extra"
+
+                if target_ltv_hoy > 0:
+                    deuda_a_tomar = calcular_deuda_para_target_ltv(colateral_total, deuda_acumulada, cash_a_invertir, target_ltv_hoy)
+                else:
+                    deuda_a_tomar = 0
+
+                total_compra = cash_a_invertir + deuda_a_tomar
+                btc_acumulado += total_compra / precio
+                deuda_acumulada += deuda_a_tomar
+                dinero_invertido += cash_a_invertir
+
+                val_post = btc_acumulado * precio
+                ltv_post = deuda_acumulada / val_post
+
+                registros.append({
+                    'Fecha': fecha.strftime('%Y-%m-%d'), 'Precio': precio, 'Tipo': etiqueta_tabla,
+                    'Cash ($)': cash_a_invertir, 'Deuda Nueva ($)': deuda_a_tomar,
+                    'LTV Post (%)': ltv_post * 100, 'DD (%)': dd * 100
+                })
+            else:
+                tipo_evento = None
+
+        historia['Fecha'].append(fecha)
+        historia['Equity_Strat'].append((btc_acumulado * precio) - deuda_acumulada)
+        historia['Equity_Bench'].append(bench_btc * precio)
+        historia['LTV'].append(ltv)
+        historia['Drawdown'].append(dd)
+        historia['Evento'].append(tipo_evento)
+
+    df = pd.DataFrame(historia).set_index('Fecha')
+    estado_final = {
+        'dinero_invertido': dinero_invertido, 'deuda_acumulada': deuda_acumulada,
+        'intereses_pagados': intereses_pagados, 'bench_invertido': bench_invertido,
+        'liquidado': liquidado, 'fecha_liq': fecha_liq,
+    }
+    return df, registros, estado_final
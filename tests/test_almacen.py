@@ -0,0 +1,96 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import almacen as modulo_almacen
+from almacen import AlmacenPrecios, _normalizar
+from sintetico import serie_sintetica
+
+class Yahoo:
+    """Sustituto de `yf.download` sobre una serie de barras reales; anota cada petición."""
+
+    def __init__(self, barras):
+        self.barras = barras
+        self.peticiones = []
+
+    def __call__(self, ticker, start=None, period=None, progress=False):
+        self.peticiones.append({'start': start, 'period': period})
+        barras = self.barras if start is None else self.barras[self.barras.index >= start]
+        return pd.DataFrame({'Close': barras})
+
+@pytest.fixture
+def barras():
+    # Barras reales de lunes a viernes, como un activo que no cotiza en fin de semana
+    serie = serie_sintetica(500, "calma")
+    return serie[serie.index.dayofweek < 5]
+
+def test_normalizar():
+    indice = pd.DatetimeIndex(["2020-01-01 00:00", "2020-01-02 00:00", "2020-01-02 15:00", "2020-01-03 00:00"], tz="UTC")
+    datos = pd.DataFrame({'BTC-USD': [1.0, 2.0, 3.0, np.nan]}, index=indice)
+    serie = _normalizar(datos)
+    assert serie.index.tz is None
+    assert list(serie.index) == list(pd.to_datetime(["2020-01-01", "2020-01-02"]))
+    # Con dos barras el mismo día manda la última
+    assert list(serie) == [1.0, 3.0]
+
+def test_solo_descarga_la_cola(tmp_path, monkeypatch, barras):
+    yahoo = Yahoo(barras.iloc[:300])
+    monkeypatch.setattr(modulo_almacen.yf, "download", yahoo)
+    almacen = AlmacenPrecios(tmp_path, refresco=0)
+
+    almacen.actualizar("AAA")
+    assert yahoo.peticiones == [{'start': None, 'period': "max"}]
+    serie = almacen.serie("AAA", barras.index[0])
+    assert serie.index.freq == "D" and serie.index[-1] == barras.index[299]
+    # Los fines de semana se rellenan con el cierre anterior y no cuentan como barras reales
+    pd.testing.assert_series_equal(serie, barras.iloc[:300].asfreq('D', method='ffill'), check_names=False)
+    assert almacen.reales("AAA").sum() == 300
+
+    # Llegan barras nuevas y se corrige la última (el día en curso)
+    yahoo.barras = barras.copy()
+    yahoo.barras.iloc[299] *= 1.01
+    serie = almacen.serie("AAA", barras.index[0])
+    assert yahoo.peticiones[-1] == {'start': barras.index[299], 'period': None}
+    pd.testing.assert_series_equal(serie, yahoo.barras.asfreq('D', method='ffill'), check_names=False)
+    assert almacen.reales("AAA").sum() == len(barras)
+    meta = json.loads((tmp_path / "AAA" / "meta.json").read_text())
+    assert meta["inicio"] == f"{barras.index[0]:%Y-%m-%d}"
+    assert not list((tmp_path / "AAA").glob("*.tmp*"))
+
+def test_descarga_fallida_no_toca_el_historico(tmp_path, monkeypatch, barras):
+    yahoo = Yahoo(barras.iloc[:300])
+    monkeypatch.setattr(modulo_almacen.yf, "download", yahoo)
+    almacen = AlmacenPrecios(tmp_path, refresco=0)
+    almacen.actualizar("AAA")
+    antes = almacen.serie("AAA", barras.index[0]).copy()
+    meta = (tmp_path / "AAA" / "meta.json").read_text()
+
+    # yfinance no lanza al fallar: devuelve un DataFrame vacío
+    yahoo.barras = barras.iloc[:0]
+    for _ in range(3):
+        pd.testing.assert_series_equal(almacen.serie("AAA", barras.index[0]), antes)
+    assert (tmp_path / "AAA" / "meta.json").read_text() == meta
+    assert almacen.reales("AAA").sum() == 300
+
+    # Una descarga que no trae la última barra guardada tampoco la pierde
+    yahoo.barras = barras.iloc[300:]
+    serie = almacen.serie("AAA", barras.index[0])
+    pd.testing.assert_series_equal(serie, barras.asfreq('D', method='ffill'), check_names=False)
+    assert almacen.reales("AAA").sum() == len(barras)
+
+def test_modo_offline_no_descarga(tmp_path, monkeypatch, barras):
+    def sin_red(*args, **kwargs):
+        raise AssertionError("el modo offline no debe descargar")
+
+    monkeypatch.setattr(modulo_almacen.yf, "download", Yahoo(barras))
+    AlmacenPrecios(tmp_path).actualizar("AAA")
+    monkeypatch.setattr(modulo_almacen.yf, "download", sin_red)
+
+    # Datos caducados: se sirven tal cual
+    almacen = AlmacenPrecios(tmp_path, offline=True, refresco=0)
+    serie = almacen.serie("AAA", barras.index[100])
+    assert serie.index[0] == barras.index[100] and serie.index[-1] == barras.index[-1]
+    with pytest.raises(FileNotFoundError):
+        almacen.serie("BBB", barras.index[0])
@@ -0,0 +1,40 @@
+from dataclasses import replace
+
+import pytest
+
+from barrido import barrido_2d, tabla_barrido
+from motor import ParametrosEstrategia, calcular_resumen, simular
+from sintetico import serie_sintetica
+
+def test_cada_celda_es_la_simulacion_con_sus_parametros():
+    serie = serie_sintetica(2000, "crash")
+    p = ParametrosEstrategia(umbral_dd_agresivo=0.1)
+    # Rejilla no cuadrada: un eje cambiado daría otra forma
+    valores_x = [0.2, 0.4, 0.6, 0.8]
+    valores_y = [0.5, 0.65, 0.9]
+    res = barrido_2d(serie.values, serie.index, p, "target_ltv_agresivo", valores_x, "liq_threshold", valores_y)
+    assert res.equity.shape == res.cagr.shape == res.liquidado.shape == (3, 4)
+    assert res.liquidado.any() and not res.liquidado.all()
+    tabla = tabla_barrido(res)
+    assert len(tabla) == 12
+
+    for i, y in enumerate(valores_y):
+        for j, x in enumerate(valores_x):
+            r = simular(serie.values, serie.index, replace(p, target_ltv_agresivo=x, liq_threshold=y))
+            resumen = calcular_resumen(r)
+            assert res.liquidado[i, j] == r.liquidado
+            assert res.equity[i, j] == pytest.approx(resumen['strat_val_final'], rel=1e-9, abs=1e-9)
+            assert res.cagr[i, j] == pytest.approx(resumen['strat_cagr'], rel=1e-9, abs=1e-12)
+            assert res.bench_cagr[i, j] == pytest.approx(resumen['bench_cagr'], rel=1e-9)
+            if r.liquidado:
+                assert res.fecha_liq[i, j] == r.fecha_liq
+            fila = tabla.iloc[i * 4 + j]
+            assert (fila['target_ltv_agresivo'], fila['liq_threshold']) == (x, y)
+            assert fila['max_drawdown'] == pytest.approx(r.riesgo.max_drawdown, rel=1e-9)
+            assert fila['sharpe'] == pytest.approx(r.riesgo.sharpe, rel=1e-9)
+            assert fila['dias_defensa'] == r.riesgo.dias_defensa
+
+def test_parametros_iguales_no_valen():
+    serie = serie_sintetica(100)
+    with pytest.raises(ValueError):
+        barrido_2d(serie.values, serie.index, ParametrosEstrategia(), "liq_threshold", [0.5], "liq_threshold", [0.6])
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cartera import descargar_cesta, parsear_cesta, simular_cartera
+from motor import (CODIGO_EVENTO, ParametrosEstrategia, calcular_deuda_para_target_ltv,
+                   es_dia_de_compra)
+from sintetico import serie_sintetica
+
+def cesta_referencia(precios, fechas, pesos, p):
+    """
+    Bucle diario sencillo de la cesta: cada activo decide su régimen con su
+    drawdown y el LTV común, y lleva su parte (según peso) del colateral y de la
+    deuda al target. Devuelve (equity, ltv, eventos, compras, liquidación).
+    """
+    n, m = precios.shape
+    btc = np.zeros(m)
+    deuda = 0.0
+    pico = np.zeros(m)
+    activo = np.zeros(m, dtype=bool)
+    equity, ltvs, eventos, compras = [], [], [], []
+    # Como en la app, el evento se mantiene hasta el siguiente día de compra
+    evento = None
+    for i, fecha in enumerate(fechas):
+        precio = precios[i]
+        deuda *= 1 + p.coste_deuda_apr / 365.0
+        pico = np.maximum(pico, precio)
+        dd = (pico - precio) / pico
+        activo |= dd >= p.umbral_inicio_dca
+        colateral = btc @ precio
+        ltv = deuda / colateral if colateral > 0 else 0.0
+        if ltv >= p.liq_threshold:
+            return equity, ltvs, eventos, compras, (fecha, ltv)
+
+        if i == 0:
+            btc += p.inversion_inicial * pesos / precio
+            evento = "INICIO"
+        elif es_dia_de_compra(fecha, p.frecuencia, p.dia_semana_idx, p.dia_mes):
+            # Todas las decisiones del día parten del mismo colateral y deuda
+            hoy = []
+            for a in range(m):
+                if not activo[a]:
+                    continue
+                extra = dd[a] > p.umbral_dd_extra
+                cash = (p.aportacion_base + (p.monto_extra if extra else 0.0)) * pesos[a]
+                if ltv > p.trigger_defensa_ltv:
+                    tipo, cash, target = "DEFENSA", cash * p.multiplo_defensa, 0.0
+                elif dd[a] < p.umbral_dd_safe or ltv > p.umbral_ltv_safe:
+                    tipo, target = "SAFE", 0.0
+                elif dd[a] > p.umbral_dd_agresivo:
+                    tipo, target = "AGRESIVO", p.target_ltv_agresivo
+                else:
+                    tipo, target = "BASE", p.target_ltv_base
+                if extra and tipo != "DEFENSA":
+                    tipo += "+EXTRA"
+                nueva = calcular_deuda_para_target_ltv(pesos[a] * colateral, pesos[a] * deuda, cash, target) if target > 0 else 0.0
+                hoy.append((a, tipo, cash, nueva))
+            for a, tipo, cash, nueva in hoy:
+                btc[a] += (cash + nueva) / precio[a]
+                deuda += nueva
+                compras.append((fecha, a, cash, nueva))
+            evento = max((tipo for _, tipo, _, _ in hoy), key=CODIGO_EVENTO.get) if hoy else None
+        equity.append(btc @ precio - deuda)
+        ltvs.append(ltv)
+        eventos.append(evento)
+    return equity, ltvs, eventos, compras, None
+
+def _cesta(n, regimenes):
+    return pd.concat([serie_sintetica(n, r).rename(f"A{k}") for k, r in enumerate(regimenes)], axis=1)
+
+def _compras(r, activos):
+    return [(pd.Timestamp(reg['Fecha']), activos.index(reg['Activo']), reg['Cash ($)'], reg['Deuda Nueva ($)'])
+            for reg in r.registros if reg.get('Tipo') not in ("INICIO", "LIQUIDACIÓN")]
+
+def test_parsear_cesta():
+    tickers, pesos = parsear_cesta(" btc-usd, eth-usd ,sol-usd,")
+    assert tickers == ["BTC-USD", "ETH-USD", "SOL-USD"]
+    np.testing.assert_allclose(pesos, [1 / 3] * 3)
+    tickers, pesos = parsear_cesta("BTC-USD:50, ETH-USD:30, SOL-USD")
+    np.testing.assert_allclose(pesos, np.array([50, 30, 1]) / 81)
+    assert pesos.sum() == pytest.approx(1)
+    for texto in ("", " , ", "BTC-USD, btc-usd", "BTC-USD:0, ETH-USD", "BTC-USD:-1"):
+        with pytest.raises(ValueError):
+            parsear_cesta(texto)
+
+class Almacen:
+    """Sustituto de `AlmacenPrecios.serie` sobre series fijas por ticker."""
+
+    def __init__(self, series):
+        self.series = series
+
+    def serie(self, ticker, inicio):
+        serie = self.series[ticker]
+        return serie[serie.index >= inicio]
+
+def test_descargar_cesta_alinea_los_calendarios():
+    diaria = serie_sintetica(60, inicio="2020-01-01")
+    # Solo de lunes a viernes, empieza más tarde y termina antes
+    laborables = serie_sintetica(40, "crash", inicio="2020-01-04")
+    laborables = laborables[laborables.index.dayofweek < 5]
+    almacen = Almacen({"DIA": diaria, "LAB": laborables})
+
+    precios = descargar_cesta(almacen, ["DIA", "LAB"], "2019-12-01")
+    assert list(precios.columns) == ["DIA", "LAB"]
+    assert precios.index[0] == laborables.index[0] and precios.index[-1] == laborables.index[-1]
+    assert not precios.isna().any().any()
+    pd.testing.assert_series_equal(precios["DIA"], diaria.loc[precios.index], check_names=False)
+    # El fin de semana repite el cierre del viernes
+    pd.testing.assert_series_equal(precios["LAB"], laborables.reindex(precios.index).ffill(), check_names=False)
+
+    almacen.series["TARDE"] = serie_sintetica(10, inicio="2021-01-01")
+    with pytest.raises(ValueError):
+        descargar_cesta(almacen, ["DIA", "TARDE"], "2019-12-01")
+
+def test_cada_activo_decide_su_regimen_sobre_el_colateral_comun():
+    precios = _cesta(1200, ["calma", "crash", "liquidacion"])
+    pesos = np.array([0.5, 0.3, 0.2])
+    p = ParametrosEstrategia(umbral_inicio_dca=0.05, umbral_dd_agresivo=0.2, umbral_dd_extra=0.5, liq_threshold=0.9)
+    r = simular_cartera(precios, precios.index, pesos, p)
+    equity, ltv, eventos, compras, liquidacion = cesta_referencia(precios.to_numpy(), precios.index, pesos, p)
+    assert not r.liquidado and liquidacion is None
+
+    np.testing.assert_allclose(r.equity_strat, equity, rtol=1e-9)
+    np.testing.assert_allclose(r.ltv, ltv, rtol=1e-9, atol=1e-12)
+    assert list(r.evento) == eventos
+    # Regímenes distintos el mismo día según el drawdown de cada activo
+    tipos = pd.DataFrame([reg for reg in r.registros if reg['Tipo'] != "INICIO"]).groupby('Fecha')['Tipo'].nunique()
+    assert (tipos > 1).any()
+    assert {reg['Tipo'] for reg in r.registros} >= {"✅ Safe", "⚖️ Base", "🔥 Agresivo"}
+
+    activos = list(precios.columns)
+    obtenidas = _compras(r, activos)
+    assert len(obtenidas) == len(compras)
+    for (fecha, a, cash, nueva), (fecha_ref, a_ref, cash_ref, nueva_ref) in zip(obtenidas, compras):
+        assert (fecha, a) == (fecha_ref, a_ref)
+        assert cash == pytest.approx(cash_ref) and nueva == pytest.approx(nueva_ref, rel=1e-9, abs=1e-9)
+
+def test_deuda_nueva_lleva_la_parte_de_cada_activo_al_target():
+    precios = _cesta(400, ["crash", "calma"])
+    pesos = np.array([0.6, 0.4])
+    p = ParametrosEstrategia(umbral_inicio_dca=0.0, umbral_dd_safe=0.0, umbral_dd_agresivo=0.5)
+    r = simular_cartera(precios, precios.index, pesos, p)
+    h = r.historia()
+
+    # Primer día de compra tras el inicio: los dos activos en Base con el LTV común a 0
+    primero = [reg for reg in r.registros if reg['Tipo'] == "⚖️ Base"][:2]
+    fecha = pd.Timestamp(primero[0]['Fecha'])
+    assert [reg['Fecha'] for reg in primero] == [primero[0]['Fecha']] * 2
+    colateral = p.inversion_inicial * (pesos / precios.iloc[0]) @ precios.loc[fecha]
+    for reg, peso in zip(primero, pesos):
+        cash = p.aportacion_base * peso
+        # Sin deuda previa: deuda / (colateral del activo + compra) = target
+        esperada = p.target_ltv_base * (peso * colateral + cash) / (1 - p.target_ltv_base)
+        assert reg['Deuda Nueva ($)'] == pytest.approx(esperada)
+        assert reg['Deuda Nueva ($)'] / (peso * colateral + cash + reg['Deuda Nueva ($)']) == pytest.approx(p.target_ltv_base)
+    assert h.loc[fecha, 'Evento'] == "BASE"
+    assert primero[0]['LTV Post (%)'] == pytest.approx(p.target_ltv_base * 100)
+
+def test_liquidacion_sobre_el_colateral_comun():
+    precios = _cesta(1200, ["liquidacion", "calma"])
+    pesos = np.array([0.7, 0.3])
+    p = ParametrosEstrategia(umbral_inicio_dca=0.05, umbral_dd_safe=0.0, umbral_dd_agresivo=0.1,
+                             target_ltv_base=0.5, target_ltv_agresivo=0.6, liq_threshold=0.7)
+    r = simular_cartera(precios, precios.index, pesos, p)
+    equity, ltv, eventos, compras, liquidacion = cesta_referencia(precios.to_numpy(), precios.index, pesos, p)
+    assert r.liquidado and liquidacion is not None
+
+    fecha_liq, ltv_liq = liquidacion
+    assert r.fecha_liq == fecha_liq and r.fechas[-1] == fecha_liq
+    assert r.registros[-1] == {'Fecha': fecha_liq, 'Tipo': 'LIQUIDACIÓN', 'LTV': pytest.approx(ltv_liq)}
+    assert r.ltv[-1] == pytest.approx(ltv_liq) and r.equity_strat[-1] == 0 and r.evento[-1] == "💀 LIQ"
+    np.testing.assert_allclose(r.equity_strat[:-1], equity, rtol=1e-9)
+    np.testing.assert_allclose(r.ltv[:-1], ltv, rtol=1e-9, atol=1e-12)
+    # Solo cuenta lo comprado antes de la liquidación
+    assert len(_compras(r, list(precios.columns))) == len(compras)
+    assert r.dinero_invertido == pytest.approx(p.inversion_inicial + sum(cash for _, _, cash, _ in compras))
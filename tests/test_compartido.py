@@ -0,0 +1,85 @@
+import threading
+import time
+from dataclasses import fields
+
+import numpy as np
+import pytest
+
+import almacen as modulo_almacen
+from almacen import AlmacenPrecios
+from compartido import CacheCompartida, VueloUnico, tamano_aproximado
+from motor import ParametrosEstrategia, simular
+from sintetico import serie_sintetica
+
+def _a_la_vez(n, funcion):
+    """Lanza `funcion` en `n` hilos que arrancan juntos; devuelve resultados o excepciones."""
+    barrera, salida = threading.Barrier(n), [None] * n
+    def hilo(i):
+        barrera.wait()
+        try:
+            salida[i] = funcion()
+        except Exception as e:
+            salida[i] = e
+    hilos = [threading.Thread(target=hilo, args=(i,)) for i in range(n)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return salida
+
+def test_vuelo_unico_ejecuta_una_vez_y_propaga_errores():
+    vuelo, llamadas = VueloUnico(), []
+    def lenta(x):
+        llamadas.append(x)
+        time.sleep(0.2)
+        return x * 2
+    assert _a_la_vez(8, lambda: vuelo.hacer("k", lenta, 21)) == [42] * 8
+    assert len(llamadas) == 1
+    assert vuelo.metricas()['ejecuciones'] == 1 and vuelo.metricas()['esperas'] == 7
+
+    def falla():
+        time.sleep(0.2)
+        raise ValueError("sin red")
+    errores = _a_la_vez(4, lambda: vuelo.hacer("k", falla))
+    assert all(isinstance(e, ValueError) for e in errores)
+    assert vuelo.metricas()['en_vuelo'] == 0
+
+def test_cache_compartida_lru_por_bytes():
+    cache = CacheCompartida(max_bytes=3 * 8000)
+    calculos = []
+    def calcular(i):
+        calculos.append(i)
+        return np.zeros(1000) + i
+    for i in (0, 1, 2, 0, 3):  # el 0 se usa de nuevo: se expulsa el 1
+        cache.obtener(i, calcular, i)
+    assert calculos == [0, 1, 2, 3] and len(cache) == 3
+    cache.obtener(1, calcular, 1)
+    m = cache.metricas()
+    assert (m['aciertos'], m['fallos'], m['expulsiones']) == (1, 5, 2)
+    assert m['bytes'] <= m['max_bytes']
+
+def test_tamano_cuenta_una_vez_lo_compartido():
+    serie = serie_sintetica(3000, "calma")
+    r = simular(serie.values, serie.index, ParametrosEstrategia(umbral_dd_agresivo=0.1))
+    # El punto de control guarda la misma lista de registros que el resultado
+    assert r.control.registros is r.registros
+    por_campos = sum(tamano_aproximado(getattr(r, f.name)) for f in fields(r))
+    registros = tamano_aproximado(r.registros)
+    # Además de los registros solo se ahorran escalares compartidos (None, enteros pequeños)
+    assert registros > 0 and por_campos - tamano_aproximado(r) == pytest.approx(registros, abs=100)
+    array = np.zeros(1000)
+    assert tamano_aproximado((array, array)) == array.nbytes
+
+def test_almacen_una_descarga_para_sesiones_concurrentes(tmp_path, monkeypatch):
+    serie = serie_sintetica(1500, "calma")
+    descargas = []
+    def download(*args, **kwargs):
+        descargas.append(args)
+        time.sleep(0.3)
+        return serie.to_frame('Close')
+    monkeypatch.setattr(modulo_almacen.yf, "download", download)
+    almacen = AlmacenPrecios(tmp_path, offline=False)
+    series = _a_la_vez(6, lambda: almacen.serie("AAA", serie.index[0]))
+    assert len(descargas) == 1
+    assert all(np.array_equal(s.values, series[0].values) for s in series)
+    assert almacen.descargas.metricas()['esperas'] == 5
@@ -0,0 +1,69 @@
+import io
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import exportar as modulo_exportar
+from exportar import (FORMATOS, columnas_historia, columnas_operaciones, exportar, pagina, paginas,
+                      tabla_operaciones, trozos_exportacion)
+from motor import ParametrosEstrategia, simular
+from sintetico import serie_sintetica
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+def _leer(contenido, formato):
+    if formato == "CSV":
+        return pd.read_csv(io.BytesIO(contenido), parse_dates=['Fecha'])
+    if formato == "Parquet":
+        return pq.read_table(io.BytesIO(contenido)).to_pandas()
+    return pa.ipc.open_stream(contenido).read_all().to_pandas()
+
+@pytest.mark.parametrize("formato", list(FORMATOS))
+def test_historia_por_trozos_coincide_con_el_motor(formato):
+    serie = serie_sintetica(5000, "liquidacion")
+    r = simular(serie.values, serie.index, ParametrosEstrategia())
+    esperado = r.historia().reset_index()
+    trozos = list(trozos_exportacion(columnas_historia(r), formato, tamano=1000))
+    assert len(trozos) >= len(r.fechas) // 1000 > 1
+    contenido = exportar(columnas_historia(r), formato, tamano=1000)
+    assert contenido == b"".join(trozos)
+    leido = _leer(contenido, formato)
+
+    assert list(leido.columns) == list(esperado.columns)
+    assert (leido['Fecha'].to_numpy() == esperado['Fecha'].to_numpy()).all()
+    for columna in ('Equity_Strat', 'LTV', 'Drawdown', 'Equity_Bench'):
+        np.testing.assert_allclose(leido[columna], esperado[columna])
+    assert leido['Evento'].fillna('').astype(str).tolist() == esperado['Evento'].fillna('').tolist()
+
+def test_operaciones_paginadas_y_exportadas():
+    serie = serie_sintetica(5000, "liquidacion")
+    r = simular(serie.values, serie.index, ParametrosEstrategia())
+    df = tabla_operaciones(r.registros)
+    assert df['Fecha'].dtype.kind == 'M' and df['Tipo'].iloc[-1] == 'LIQUIDACIÓN'
+
+    n = paginas(len(df), 40)
+    assert pd.concat([pagina(df, i, 40) for i in range(1, n + 1)]).equals(df)
+    assert len(pagina(df, n, 40)) == len(df) - 40 * (n - 1)
+    destino = io.BytesIO()
+    exportar(columnas_operaciones(df), "Parquet", destino, tamano=64)
+    leido = _leer(destino.getvalue(), "Parquet")
+    assert pq.ParquetFile(io.BytesIO(destino.getvalue())).num_row_groups == paginas(len(df), 64)
+    pd.testing.assert_frame_equal(leido, df, check_dtype=False)
+
+def test_el_temporal_se_cierra_tras_leerlo(monkeypatch):
+    abiertos = []
+    original = tempfile.TemporaryFile
+
+    def temporal(*args, **kwargs):
+        abiertos.append(original(*args, **kwargs))
+        return abiertos[-1]
+
+    monkeypatch.setattr(modulo_exportar.tempfile, "TemporaryFile", temporal)
+    serie = serie_sintetica(300)
+    r = simular(serie.values, serie.index, ParametrosEstrategia())
+    contenido = exportar(columnas_historia(r), "CSV", tamano=100)
+    assert isinstance(contenido, bytes) and len(_leer(contenido, "CSV")) == len(r.fechas)
+    assert len(abiertos) == 1 and abiertos[0].closed
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from graficos import (MARCADORES, huella_resultado, indices_eventos,
+                      indices_minmax, png_resultado)
+from motor import CODIGO_EVENTO, ParametrosEstrategia, simular
+from sintetico import serie_sintetica
+
+def test_minmax_conserva_extremos_de_cada_cubo():
+    y = serie_sintetica(100_000, "crash").values
+    sel = indices_minmax([y], cubos=500)
+    assert len(sel) <= 4 * 500
+    assert sel[0] == 0 and sel[-1] == len(y) - 1
+    tam = -(-len(y) // 500)
+    for desde in range(0, len(y), tam):
+        trozo = y[desde:desde + tam]
+        assert desde + trozo.argmin() in sel and desde + trozo.argmax() in sel
+
+def test_minmax_series_cortas_sin_diezmar():
+    assert np.array_equal(indices_minmax([np.arange(100.0)]), np.arange(100))
+
+def test_eventos_un_marcador_por_cubo():
+    r = simular(*_serie(20_000), ParametrosEstrategia())
+    for tipo in MARCADORES:
+        todos = np.flatnonzero(r.codigo_evento == CODIGO_EVENTO[tipo])
+        sel = indices_eventos(r.codigo_evento, tipo, cubos=300)
+        tam = -(-len(r.codigo_evento) // 300)
+        assert set(sel) <= set(todos)
+        assert set(sel // tam) == set(todos // tam)
+
+def test_huella_distingue_resultados():
+    precios, fechas = _serie(2000)
+    a = simular(precios, fechas, ParametrosEstrategia())
+    b = simular(precios, fechas, ParametrosEstrategia())
+    c = simular(precios, fechas, ParametrosEstrategia(target_ltv_base=0.3))
+    assert huella_resultado(a) == huella_resultado(b)
+    assert huella_resultado(a) != huella_resultado(c)
+
+@pytest.mark.parametrize("regimen", ["calma", "liquidacion"])
+def test_png_resultado(regimen):
+    serie = serie_sintetica(50_000, regimen, frecuencia="h")
+    p = ParametrosEstrategia()
+    png = png_resultado(simular(serie.values, serie.index, p), p.liq_threshold, p.trigger_defensa_ltv)
+    assert png.startswith(b"\x89PNG")
+
+def _serie(n):
+    serie = serie_sintetica(n, "liquidacion")
+    return serie.values, serie.index
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from intradia import simular_intradia, trozos_por_dias
+from motor import ParametrosEstrategia, simular
+from sintetico import REGIMENES, serie_sintetica
+
+ESCENARIOS = [ParametrosEstrategia(), ParametrosEstrategia(frecuencia="Mensual", dia_mes=15, coste_deuda_apr=0.1)]
+
+def _barras(n, regimen, frecuencia, mecha=0.0):
+    serie = serie_sintetica(n, regimen, frecuencia=frecuencia)
+    mechas = mecha * (1 + np.sin(np.arange(n) * 0.37))
+    return pd.DataFrame({'Low': serie.values * (1 - mechas), 'Close': serie.values}, index=serie.index)
+
+@pytest.mark.parametrize("regimen", REGIMENES)
+@pytest.mark.parametrize("p", ESCENARIOS)
+def test_barras_diarias_reproducen_simular(regimen, p):
+    barras = _barras(3000, regimen, "D")
+    esperado = simular(barras['Close'].values, barras.index, p)
+    res = simular_intradia(barras, p, tamano=97)
+    np.testing.assert_allclose(res.equity_strat, esperado.equity_strat, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(res.equity_bench, esperado.equity_bench, rtol=1e-9)
+    np.testing.assert_allclose(res.drawdown, esperado.drawdown)
+    assert list(res.evento) == list(esperado.evento)
+    assert res.fecha_liq == esperado.fecha_liq
+    assert [r['Tipo'] for r in res.registros] == [r['Tipo'] for r in esperado.registros]
+    assert res.dinero_invertido == esperado.dinero_invertido
+    assert res.intereses_pagados == pytest.approx(esperado.intereses_pagados, rel=1e-9, abs=1e-9)
+
+@pytest.mark.parametrize("tamano", [1000, 24 * 7 + 5, 100_000])
+def test_resultado_no_depende_del_trozo(tamano):
+    barras = _barras(24 * 2000, "crash", "h", mecha=0.02)
+    p = ParametrosEstrategia()
+    referencia = simular_intradia(barras, p, tamano=10**9)
+    res = simular_intradia(barras, p, tamano=tamano)
+    np.testing.assert_allclose(res.equity_strat, referencia.equity_strat)
+    np.testing.assert_allclose(res.ltv_peor, referencia.ltv_peor)
+    assert res.fecha_liq == referencia.fecha_liq
+    assert res.barras == referencia.barras
+
+def test_liquida_con_los_minimos():
+    p = ParametrosEstrategia()
+    con_mechas = simular_intradia(_barras(24 * 2000, "crash", "h", mecha=0.02), p)
+    sin_mechas = simular_intradia(_barras(24 * 2000, "crash", "h"), p)
+    assert con_mechas.liquidado and sin_mechas.liquidado
+    assert con_mechas.fecha_liq < sin_mechas.fecha_liq
+    assert con_mechas.registros[-1]['LTV'] >= p.liq_threshold
+    # Una fila por día hasta la liquidación
+    assert con_mechas.fechas[-1] == con_mechas.fecha_liq.normalize()
+    assert con_mechas.equity_strat[-1] == 0
+
+def test_lectura_por_trozos_de_csv(tmp_path):
+    barras = _barras(24 * 400, "liquidacion", "h", mecha=0.01)
+    ruta = tmp_path / "barras.csv"
+    barras.to_csv(ruta, index_label="Fecha")
+    p = ParametrosEstrategia()
+    res = simular_intradia(pd.read_csv(ruta, index_col="Fecha", parse_dates=True, chunksize=1000), p)
+    esperado = simular_intradia(barras, p)
+    np.testing.assert_allclose(res.equity_strat, esperado.equity_strat)
+    assert res.fecha_liq == esperado.fecha_liq
+
+def test_trozos_terminan_en_fin_de_dia():
+    barras = _barras(24 * 30 + 7, "calma", "h")
+    trozos = list(trozos_por_dias(barras, tamano=50))
+    assert sum(len(t) for t in trozos) == len(barras)
+    for anterior, siguiente in zip(trozos, trozos[1:]):
+        assert anterior.index[-1].normalize() < siguiente.index[0].normalize()
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import lote
+from almacen import AlmacenPrecios
+from motor import ParametrosEstrategia, calcular_resumen, simular
+from sintetico import serie_sintetica
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenPrecios(tmp_path, offline=True)
+    for ticker, regimen in (("AAA", "calma"), ("BBB", "liquidacion")):
+        serie = serie_sintetica(3000, regimen)
+        reales = np.ones(len(serie), dtype=bool)
+        reales[5::7] = False  # huecos rellenados, como los fines de semana
+        almacen._escribir(ticker, serie, reales)
+    return almacen
+
+def _escenarios():
+    escenarios = [{"escenario": f"e{i}", "TICKER": ("AAA", "BBB")[i % 2],
+                   "FECHA_INICIO": str(pd.Timestamp("2015-01-01") + pd.Timedelta(days=41 * i)),
+                   "TARGET_LTV_AGRESIVO": 0.1 * (i % 7)} for i in range(40)]
+    return escenarios + [{"ticker": "ZZZ"}, {"ticker": "AAA", "desconocido": 1}]
+
+def test_resumen_coincide_con_la_app(almacen):
+    tabla = lote.ejecutar_lote(_escenarios(), almacen, procesos=1)
+    assert len(tabla) == 42
+    assert tabla['error'].iloc[:40].isna().all() and tabla['error'].iloc[40:].notna().all()
+
+    for i in (5, 12, 31):
+        fila = tabla.iloc[i]
+        serie = almacen.serie(fila['ticker'], pd.Timestamp("2015-01-01") + pd.Timedelta(days=41 * i))
+        r = simular(serie.values, serie.index, ParametrosEstrategia(target_ltv_agresivo=0.1 * (i % 7)))
+        assert fila['inicio'] == serie.index[0].date()
+        assert fila['equity_final'] == calcular_resumen(r)['strat_val_final']
+        assert fila['intereses_pagados'] == r.intereses_pagados
+        assert fila['liquidado'] == r.liquidado
+
+def test_pool_con_memoria_compartida_da_lo_mismo(almacen):
+    escenarios = _escenarios()
+    pd.testing.assert_frame_equal(lote.ejecutar_lote(escenarios, almacen, procesos=2),
+                                  lote.ejecutar_lote(escenarios, almacen, procesos=1))
+
+def test_linea_de_comandos(almacen, tmp_path, monkeypatch):
+    monkeypatch.setattr(lote, "AlmacenPrecios", lambda **kw: almacen)
+    ruta = tmp_path / "escenarios.jsonl"
+    ruta.write_text("\n".join(json.dumps(e) for e in _escenarios()[:4]) + "\n")
+    assert lote.main([str(ruta), "-o", str(tmp_path / "resumen.csv"), "--procesos", "1", "--offline"]) == 0
+    assert len(pd.read_csv(tmp_path / "resumen.csv")) == 4
+
+def test_dia_semana_y_frecuencia_como_en_la_app():
+    _, _, _, p = lote.preparar_escenario({"ticker": "AAA", "FRECUENCIA": "Semanal", "DIA_SEMANA": "Miércoles"}, 1)
+    assert p.dia_semana_idx == 2
+    assert lote.preparar_escenario({"ticker": "AAA", "dia_semana": "domingo"}, 1)[3].dia_semana_idx == 6
+    _, _, _, p = lote.preparar_escenario({"ticker": "AAA", "FRECUENCIA": "Mensual", "DIA_MES": 15}, 1)
+    assert (p.frecuencia, p.dia_mes) == ("Mensual", 15)
+    for datos in ({"DIA_SEMANA": "Lunes."}, {"DIA_SEMANA": "Lunes", "dia_semana_idx": 0},
+                  {"FRECUENCIA": "semanal"}, {"FRECUENCIA": "Diaria"}):
+        with pytest.raises(ValueError):
+            lote.preparar_escenario({"ticker": "AAA", **datos}, 1)
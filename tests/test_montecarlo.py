@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from montecarlo import (PERCENTILES_LTV, caminos_bootstrap, caminos_gbm, retornos_log,
+                        simular_montecarlo)
+from motor import ParametrosEstrategia, simular_lote
+from sintetico import serie_sintetica
+
+P = ParametrosEstrategia(target_ltv_agresivo=0.5, umbral_dd_agresivo=0.1, umbral_inicio_dca=0.05)
+
+@pytest.fixture(scope="module")
+def serie():
+    return serie_sintetica(1500, "crash")
+
+def _iguales(a, b):
+    for campo in ("equity_final", "bench_final", "dinero_invertido", "liquidado", "dia_liq"):
+        np.testing.assert_array_equal(getattr(a, campo), getattr(b, campo), err_msg=campo)
+    for q in PERCENTILES_LTV:
+        np.testing.assert_array_equal(a.bandas_ltv[q], b.bandas_ltv[q])
+
+def test_caminos_parten_del_ultimo_precio_con_retornos_historicos(serie):
+    retornos = retornos_log(serie)
+    rng = np.random.default_rng(1)
+    caminos = caminos_bootstrap(retornos, 100.0, 20, 200, 30, rng)
+    assert caminos.shape == (20, 200) and (caminos[:, 0] == 100.0).all()
+    # Cada paso del bootstrap es un retorno histórico
+    assert np.isin(np.round(np.diff(np.log(caminos), axis=1), 10), np.round(retornos, 10)).all()
+    gbm = caminos_gbm(retornos, 100.0, 2000, 50, rng)
+    pasos = np.diff(np.log(gbm), axis=1)
+    assert pasos.mean() == pytest.approx(retornos.mean(), abs=3 * retornos.std() / np.sqrt(pasos.size))
+
+@pytest.mark.parametrize("metodo", ["Bootstrap por bloques", "GBM"])
+def test_misma_semilla_mismo_resultado_y_pool_igual_que_serie(serie, metodo):
+    kwargs = dict(n_caminos=90, anyos=2, metodo=metodo, semilla=7, trozo=40)
+    serie_1 = simular_montecarlo(serie, P, procesos=1, **kwargs)
+    _iguales(serie_1, simular_montecarlo(serie, P, procesos=1, **kwargs))
+    _iguales(serie_1, simular_montecarlo(serie, P, procesos=2, **kwargs))
+    otra = simular_montecarlo(serie, P, procesos=1, **{**kwargs, 'semilla': 8})
+    assert not np.array_equal(otra.equity_final, serie_1.equity_final)
+
+def test_resumenes_coinciden_con_el_motor_por_lotes(serie):
+    res = simular_montecarlo(serie, P, n_caminos=150, anyos=3, semilla=3, trozo=60, procesos=1)
+    assert 0 < res.prob_liquidacion < 1
+
+    # Los mismos caminos, generados como en cada trozo, en una sola llamada al motor
+    retornos = retornos_log(serie)
+    semillas = np.random.SeedSequence(3).spawn(3)
+    caminos = np.concatenate([
+        caminos_bootstrap(retornos, serie.iloc[-1], n, len(res.fechas), 30, np.random.default_rng(s))
+        for n, s in zip((60, 60, 30), semillas)])
+    lote = simular_lote(caminos, res.fechas, P, guardar_ltv=True, metricas_riesgo=True)
+    np.testing.assert_array_equal(res.equity_final, lote.equity_final)
+    np.testing.assert_array_equal(res.liquidado, lote.liquidado)
+    assert res.prob_liquidacion == lote.liquidado.mean()
+    assert res.prob_supera_bench == (lote.equity_final > lote.bench_final).mean()
+    for q in PERCENTILES_LTV:
+        np.testing.assert_allclose(res.bandas_ltv[q], np.nanpercentile(lote.ltv_decisiones, q, axis=0))
+    np.testing.assert_array_equal(res.riesgo.max_drawdown, lote.riesgo.max_drawdown)
+    np.testing.assert_array_equal(res.riesgo.sharpe, lote.riesgo.sharpe)
+    tabla = res.tabla_riesgo()
+    assert tabla.loc['dias_defensa', 'P50'] == np.percentile(lote.riesgo.dias_defensa, 50)
+    curva = res.curva_liquidacion()
+    assert curva.iloc[-1] == res.prob_liquidacion
+    assert curva.iloc[lote.dia_liq[lote.liquidado].min()] > 0
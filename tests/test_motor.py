@@ -0,0 +1,184 @@
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cartera import simular_cartera
+from motor import (ParametrosEstrategia, calcular_cagr, calcular_drawdown,
+                   calcular_resumen, primera_decision_afectada, simular,
+                   simular_lote)
+from referencia import simular_referencia
+from sintetico import REGIMENES, serie_sintetica
+
+COLUMNAS = ['Equity_Strat', 'LTV', 'Drawdown', 'Equity_Bench']
+
+ESCENARIOS = [
+    ParametrosEstrategia(),
+    ParametrosEstrategia(frecuencia="Mensual", dia_mes=31),
+    ParametrosEstrategia(dia_semana_idx=4, coste_deuda_apr=0.12, target_ltv_base=0.35,
+                         target_ltv_agresivo=0.55, umbral_inicio_dca=0.05, liq_threshold=0.6),
+    ParametrosEstrategia(frecuencia="Mensual", dia_mes=15, umbral_dd_extra=0.3, monto_extra=250,
+                         multiplo_defensa=3.0, pct_umbral_defensa=0.5),
+]
+
+def _comparar_registros(esperados, obtenidos):
+    assert len(esperados) == len(obtenidos)
+    for fila_ref, fila in zip(esperados, obtenidos):
+        assert fila_ref.keys() == fila.keys()
+        for clave, valor in fila_ref.items():
+            if isinstance(valor, float):
+                assert fila[clave] == pytest.approx(valor, rel=1e-9, abs=1e-9), clave
+            else:
+                assert fila[clave] == valor, clave
+
+@pytest.mark.parametrize("regimen", REGIMENES)
+@pytest.mark.parametrize("p", ESCENARIOS)
+@pytest.mark.parametrize("n", [1000, 3000])
+def test_simular_equivale_al_bucle_original(regimen, p, n):
+    serie = serie_sintetica(n, regimen)
+    df_ref, registros_ref, estado_ref = simular_referencia(serie.values, serie.index, p)
+    res = simular(serie.values, serie.index, p)
+    df = res.historia()
+
+    assert df.index.equals(df_ref.index)
+    assert list(df['Evento']) == list(df_ref['Evento'])
+    for columna in COLUMNAS:
+        np.testing.assert_allclose(df[columna], df_ref[columna], rtol=1e-9, atol=1e-9)
+    _comparar_registros(registros_ref, res.registros)
+
+    assert res.liquidado == estado_ref['liquidado']
+    assert res.fecha_liq == estado_ref['fecha_liq']
+    assert res.dinero_invertido == estado_ref['dinero_invertido']
+    assert res.bench_invertido == estado_ref['bench_invertido']
+    assert res.deuda_acumulada == pytest.approx(estado_ref['deuda_acumulada'], rel=1e-9)
+    assert res.intereses_pagados == pytest.approx(estado_ref['intereses_pagados'], rel=1e-7, abs=1e-9)
+
+    resumen = calcular_resumen(res)
+    dias = (df_ref.index[-1] - df_ref.index[0]).days
+    valor_final = 0 if estado_ref['liquidado'] else df_ref['Equity_Strat'].iloc[-1]
+    assert resumen['strat_val_final'] == pytest.approx(valor_final, rel=1e-9)
+    assert resumen['strat_cagr'] == pytest.approx(calcular_cagr(valor_final, estado_ref['dinero_invertido'], dias), rel=1e-9, abs=1e-12)
+
+# Salidas fijadas del comportamiento actual (n, régimen, parámetros) -> resultado
+GOLDEN = [
+    (1000, "calma", ParametrosEstrategia(), 22758.598192329315, 19063.360888490955, 0.4826921938811266, None, 136),
+    (1000, "crash", ParametrosEstrategia(frecuencia="Mensual", dia_mes=15), 0.0, 1244.319816422048, 0.0, "2016-05-09", 16),
+    (1000, "liquidacion", ParametrosEstrategia(), 0.0, 1868.8112053872146, 0.0, "2016-05-26", 68),
+    (10000, "crash", ParametrosEstrategia(), 0.0, 21489.41781617878, 0.0, "2027-06-26", 646),
+]
+
+@pytest.mark.parametrize("n, regimen, p, equity, bench, cagr, fecha_liq, filas", GOLDEN)
+def test_salidas_fijadas(n, regimen, p, equity, bench, cagr, fecha_liq, filas):
+    serie = serie_sintetica(n, regimen)
+    res = simular(serie.values, serie.index, p)
+    resumen = calcular_resumen(res)
+    assert resumen['strat_val_final'] == pytest.approx(equity, rel=1e-9)
+    assert resumen['bench_val_final'] == pytest.approx(bench, rel=1e-9)
+    assert resumen['strat_cagr'] == pytest.approx(cagr, rel=1e-9)
+    assert resumen['strat_roi'] == (-100 if fecha_liq else pytest.approx((equity - res.dinero_invertido) / res.dinero_invertido * 100))
+    assert res.fecha_liq == (pd.Timestamp(fecha_liq) if fecha_liq else None)
+    assert len(res.registros) == filas
+
+@pytest.mark.parametrize("regimen", REGIMENES)
+def test_simular_lote_equivale_a_simular(regimen):
+    serie = serie_sintetica(1500, regimen)
+    p = ParametrosEstrategia(coste_deuda_apr=0.08)
+    variaciones = {
+        'target_ltv_agresivo': np.array([0.0, 0.2, 0.4, 0.6, 0.5, 0.3]),
+        'liq_threshold': np.array([0.5, 0.6, 0.75, 0.9, 0.65, 0.8]),
+    }
+    inicios = np.array([0, 0, 100, 250, 600, 900])
+    lote = simular_lote(serie.values, serie.index, p, variaciones, inicios)
+    for c, inicio in enumerate(inicios):
+        q = ParametrosEstrategia(**{**p.__dict__, **{k: float(v[c]) for k, v in variaciones.items()}})
+        res = simular(serie.values[inicio:], serie.index[inicio:], q)
+        resumen = calcular_resumen(res)
+        assert lote.liquidado[c] == res.liquidado
+        assert lote.equity_final[c] == pytest.approx(resumen['strat_val_final'], rel=1e-9, abs=1e-9)
+        assert lote.bench_final[c] == pytest.approx(resumen['bench_val_final'], rel=1e-9)
+        assert lote.cagr[c] == pytest.approx(resumen['strat_cagr'], rel=1e-9, abs=1e-12)
+        assert lote.ltv_max[c] == pytest.approx(res.ltv.max(), rel=1e-9)
+        assert lote.dias[c] == resumen['dias_totales']
+
+def test_simular_lote_con_matriz_de_precios():
+    caminos = np.stack([serie_sintetica(800, r).values for r in REGIMENES])
+    fechas = serie_sintetica(800).index
+    p = ParametrosEstrategia()
+    lote = simular_lote(caminos, fechas, p)
+    for c in range(len(caminos)):
+        res = simular(caminos[c], fechas, p)
+        assert lote.liquidado[c] == res.liquidado
+        assert lote.equity_final[c] == pytest.approx(calcular_resumen(res)['strat_val_final'], rel=1e-9)
+
+@pytest.mark.parametrize("regimen", REGIMENES)
+def test_cartera_de_un_activo_equivale_a_simular(regimen):
+    serie = serie_sintetica(1200, regimen)
+    p = ParametrosEstrategia(frecuencia="Mensual", dia_mes=28)
+    res = simular(serie.values, serie.index, p)
+    cesta = simular_cartera(serie.to_frame(), serie.index, [1.0], p)
+    for columna in COLUMNAS:
+        np.testing.assert_allclose(cesta.historia()[columna], res.historia()[columna], rtol=1e-9, atol=1e-9)
+    assert list(cesta.evento) == list(res.evento)
+    assert cesta.fecha_liq == res.fecha_liq
+
+CAMBIOS = [
+    ("umbral_dd_extra", 0.35), ("monto_extra", 400), ("multiplo_defensa", 4.0), ("pct_umbral_defensa", 0.6),
+    ("target_ltv_base", 0.1), ("target_ltv_agresivo", 0.55), ("umbral_dd_agresivo", 0.45),
+    ("umbral_dd_safe", 0.0), ("umbral_ltv_safe", 0.2), ("umbral_inicio_dca", 0.3), ("liq_threshold", 0.6),
+    ("coste_deuda_apr", 0.15), ("aportacion_base", 80), ("dia_mes", 3),
+]
+
+@pytest.mark.parametrize("regimen", REGIMENES)
+@pytest.mark.parametrize("campo, valor", CAMBIOS)
+def test_reanudar_equivale_a_simular_de_cero(regimen, campo, valor):
+    serie = serie_sintetica(3000, regimen)
+    p = ParametrosEstrategia(frecuencia="Mensual", dia_mes=15, dia_semana_idx=None)
+    q = replace(p, **{campo: valor})
+    esperado = simular(serie.values, serie.index, q)
+    # También encadenando: se reanuda desde un resultado que ya era reanudado
+    intermedio = simular(serie.values, serie.index, replace(p, umbral_dd_extra=0.5), anterior=simular(serie.values, serie.index, p))
+    res = simular(serie.values, serie.index, q, anterior=intermedio)
+
+    for serie_esperada, serie_obtenida in ((esperado.equity_strat, res.equity_strat), (esperado.equity_bench, res.equity_bench),
+                                          (esperado.ltv, res.ltv), (esperado.codigo_evento, res.codigo_evento)):
+        np.testing.assert_array_equal(serie_obtenida, serie_esperada)
+    assert res.registros == esperado.registros
+    assert (res.deuda_acumulada, res.intereses_pagados, res.fecha_liq) == \
+           (esperado.deuda_acumulada, esperado.intereses_pagados, esperado.fecha_liq)
+
+def test_primera_decision_afectada():
+    serie = serie_sintetica(3000, "crash")
+    p = ParametrosEstrategia()
+    r = simular(serie.values, serie.index, p)
+    dd = calcular_drawdown(serie.values)
+    k = len(r.control.idx)
+    assert primera_decision_afectada(r.control, p, dd) == k
+    assert primera_decision_afectada(r.control, replace(p, dia_semana_idx=3), dd) == 0
+    # El umbral extra solo importa desde la primera compra con DD entre el valor viejo y el nuevo
+    s = primera_decision_afectada(r.control, replace(p, umbral_dd_extra=0.5), dd)
+    dd_dec = dd[r.control.idx]
+    assert 0 < s < k and 0.5 < dd_dec[s] <= 0.6 and not ((dd_dec[1:s] > 0.5) & (dd_dec[1:s] <= 0.6)).any()
+
+def test_serie_vacia():
+    with pytest.raises(ValueError):
+        simular([], pd.DatetimeIndex([]), ParametrosEstrategia())
+
+@pytest.mark.parametrize("umbral", [0.0, -0.5, float("nan")])
+def test_umbral_de_liquidacion_no_positivo(umbral):
+    with pytest.raises(ValueError):
+        ParametrosEstrategia(liq_threshold=umbral)
+
+def test_liquidacion_en_la_primera_compra_con_deuda():
+    # Con un umbral minúsculo la liquidación llega en cuanto hay deuda: el
+    # estado que manda es el de la decisión anterior, nunca el de la última
+    serie = serie_sintetica(1500, "crash")
+    p = ParametrosEstrategia(liq_threshold=1e-9, umbral_inicio_dca=0.0, umbral_dd_safe=0.0)
+    res = simular(serie.values, serie.index, p)
+    assert res.liquidado
+    dia_liq = res.fechas.get_loc(res.fecha_liq)
+    assert res.btc_acumulado == res.control.btc[np.searchsorted(res.control.idx, dia_liq) - 1]
+    lote = simular_lote(serie.values, serie.index, p)
+    cesta = simular_cartera(serie.to_frame(), serie.index, [1.0], p)
+    assert lote.liquidado[0] and cesta.fecha_liq == res.fecha_liq
+    assert lote.dinero_invertido[0] == res.dinero_invertido == cesta.dinero_invertido
@@ -0,0 +1,52 @@
+from dataclasses import replace
+
+import numpy as np
+
+from motor import ParametrosEstrategia, simular, simular_lote
+from optimizador import PARAMETROS_OPTIMIZABLES, frontera_pareto, optimizar
+from sintetico import serie_sintetica
+
+def test_tope_ltv_detiene_sin_marcar_liquidacion():
+    serie = serie_sintetica(3000, "liquidacion")
+    p = ParametrosEstrategia()
+    variaciones = {'target_ltv_agresivo': np.array([0.0, 0.3, 0.6])}
+    libre = simular_lote(serie.values, serie.index, p, variaciones)
+    con_tope = simular_lote(serie.values, serie.index, p, variaciones, ltv_tope=0.5)
+
+    np.testing.assert_array_equal(libre.detenido, libre.liquidado)
+    np.testing.assert_array_equal(con_tope.detenido, libre.ltv_max >= 0.5)
+    assert not con_tope.liquidado[con_tope.detenido & ~libre.liquidado].any()
+    vivos = ~con_tope.detenido
+    np.testing.assert_allclose(con_tope.equity_final[vivos], libre.equity_final[vivos])
+
+def test_frontera_pareto():
+    retorno = np.array([0.10, 0.20, 0.15, 0.30, 0.25, 0.30])
+    riesgo = np.array([0.1, 0.3, 0.4, 0.5, 0.2, 0.6])
+    assert list(frontera_pareto(retorno, riesgo)) == [0, 4, 3]
+
+def test_mejor_candidato_respeta_restricciones():
+    serie = serie_sintetica(3000, "crash")
+    p = ParametrosEstrategia()
+    res = optimizar(serie.values, serie.index, p, ltv_tope=0.5, n_candidatos=81, procesos=1)
+
+    assert len(res.rondas) > 1 and res.rondas[-1]['evaluados'] < 81
+    # Cada ronda pasa como mucho 1/eta de la anterior, aunque la frontera sea grande
+    for previa, siguiente in zip(res.rondas, res.rondas[1:]):
+        assert siguiente['evaluados'] <= -(-previa['evaluados'] // 3)
+    assert res.mejor is not None
+    assert len(res.completos) == res.rondas[-1]['evaluados'] and res.rondas[-1]['dias'] == len(serie)
+    assert res.mejor['cagr'] == res.frontera['cagr'].max()
+    mejor = replace(p, **{c: float(res.mejor[c]) for c in PARAMETROS_OPTIMIZABLES})
+    r = simular(serie.values, serie.index, mejor)
+    assert not r.liquidado
+    assert r.ltv.max() < 0.5
+    assert np.isclose(r.equity_strat[-1], res.mejor['equity'])
+
+def test_sin_factibles_ninguno_llega_al_historico_completo():
+    serie = serie_sintetica(3000, "crash")
+    # Con un tope de LTV inalcanzable la primera ronda ya no deja a nadie
+    p = ParametrosEstrategia(umbral_inicio_dca=0.0, umbral_dd_safe=0.0, target_ltv_base=0.3)
+    res = optimizar(serie.values, serie.index, p, ltv_tope=0.01, parametros=("umbral_dd_agresivo",),
+                    n_candidatos=27, procesos=1)
+    assert len(res.rondas) == 1 and res.rondas[0]['dias'] < len(serie) and res.rondas[0]['factibles'] == 0
+    assert res.mejor is None and res.completos.empty and res.frontera.empty
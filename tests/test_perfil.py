@@ -0,0 +1,39 @@
+import json
+
+import perfil
+from motor import ParametrosEstrategia, simular
+from sintetico import serie_sintetica
+
+def test_sin_perfil_activo_no_se_mide_nada():
+    perfil.iniciar(activo=False)
+    with perfil.fase("x"):
+        perfil.contar("y")
+    assert perfil.actual() is None
+
+def test_fases_contadores_y_log(tmp_path):
+    serie = serie_sintetica(2000, "crash")
+    with perfil.Perfil("prueba") as p:
+        for _ in range(2):
+            perfil.consulta_cache("simulacion")
+        perfil.fallo_cache("simulacion")
+        r = simular(serie.values, serie.index, ParametrosEstrategia())
+    assert perfil.actual() is None
+
+    registro = p.escribir(tmp_path / "perfil.jsonl")
+    p.escribir(tmp_path / "perfil.jsonl")
+    lineas = (tmp_path / "perfil.jsonl").read_text().splitlines()
+    assert len(lineas) == 2 and json.loads(lineas[0]) == registro
+    assert {"motor.bucle", "motor.relleno"} <= set(registro['fases'])
+    assert registro['contadores']['barras'] == len(r.fechas)
+    assert registro['contadores']['compras'] == len(r.registros) - r.liquidado
+    assert registro['cache'] == {"simulacion": {"aciertos": 1, "fallos": 1}}
+
+def test_terminar_desactiva_solo_el_perfil_activo():
+    p = perfil.iniciar("pagina")
+    perfil.terminar(None)
+    assert perfil.actual() is p
+    perfil.terminar(p)
+    assert perfil.actual() is None
+    with perfil.fase("despues"):
+        pass
+    assert "despues" not in p.fases
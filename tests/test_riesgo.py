@@ -0,0 +1,70 @@
+from dataclasses import asdict, replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cartera import simular_cartera
+from motor import ParametrosEstrategia, simular, simular_lote
+from riesgo import DIAS_ANUALES
+from sintetico import serie_sintetica
+
+def _iguales(a, b):
+    for nombre, valor in asdict(a).items():
+        assert np.isclose(valor, getattr(b, nombre), rtol=1e-9, equal_nan=True), nombre
+
+def _carril(metricas, c):
+    return type(metricas)(**{nombre: np.asarray(valor)[c].item() for nombre, valor in asdict(metricas).items()})
+
+def test_coincide_con_la_historia_completa():
+    serie = serie_sintetica(3000, "calma")
+    p = ParametrosEstrategia(target_ltv_agresivo=0.5, umbral_dd_agresivo=0.1)
+    r = simular(serie.values, serie.index, p)
+    assert not r.liquidado
+
+    h = r.historia()
+    equity = h['Equity_Strat']
+    compras = pd.Series([reg['Cash ($)'] for reg in r.registros], index=pd.to_datetime([reg['Fecha'] for reg in r.registros]))
+    invertido = compras.groupby(level=0).sum().reindex(h.index, fill_value=0).cumsum()
+    retornos = ((equity - invertido.diff()) / equity.shift() - 1).dropna()
+    pico = equity.cummax()
+    bajo = equity < pico
+    rachas = bajo.groupby((~bajo).cumsum()).sum()
+
+    m = r.riesgo
+    assert m.max_drawdown == pytest.approx((1 - equity / pico).max())
+    assert m.dias_bajo_agua == bajo.sum() and m.racha_bajo_agua == rachas.max()
+    assert m.sharpe == pytest.approx(retornos.mean() / retornos.std() * np.sqrt(DIAS_ANUALES))
+    assert m.sortino == pytest.approx(retornos.mean() / np.sqrt((retornos.clip(upper=0) ** 2).mean()) * np.sqrt(DIAS_ANUALES))
+    assert m.ltv_max == pytest.approx(h['LTV'].max())
+    assert m.dias_defensa == (h['LTV'] > p.trigger_defensa_ltv).sum()
+    assert m.peso_intereses == pytest.approx(r.intereses_pagados / (equity.iloc[-1] - r.dinero_invertido + r.intereses_pagados))
+    assert r.riesgo_bench.ltv_max == 0 and r.riesgo_bench.peso_intereses == 0
+
+@pytest.mark.parametrize("regimen", ["crash", "liquidacion"])
+def test_lote_coincide_con_simular(regimen):
+    serie = serie_sintetica(3000, regimen)
+    p = ParametrosEstrategia()
+    valores = np.linspace(0.1, 0.7, 7)
+    res = simular_lote(serie.values, serie.index, p, {'target_ltv_agresivo': valores, 'coste_deuda_apr': valores / 5},
+                       metricas_riesgo=True)
+    for c, v in enumerate(valores):
+        r = simular(serie.values, serie.index, replace(p, target_ltv_agresivo=v, coste_deuda_apr=v / 5))
+        _iguales(r.riesgo, _carril(res.riesgo, c))
+        _iguales(r.riesgo_bench, _carril(res.riesgo_bench, c))
+
+    inicios = np.arange(0, 2000, 131)
+    res = simular_lote(serie.values, serie.index, p, inicios=inicios, metricas_riesgo=True)
+    for c, i in enumerate(inicios):
+        r = simular(serie.values[i:], serie.index[i:], p)
+        _iguales(r.riesgo, _carril(res.riesgo, c))
+        _iguales(r.riesgo_bench, _carril(res.riesgo_bench, c))
+    assert simular_lote(serie.values, serie.index, p).riesgo is None
+
+def test_cartera_de_un_activo_coincide_con_simular():
+    serie = serie_sintetica(2000, "crash")
+    p = ParametrosEstrategia()
+    r = simular(serie.values, serie.index, p)
+    c = simular_cartera(serie.to_frame(), serie.index, [1.0], p)
+    _iguales(r.riesgo, c.riesgo)
+    _iguales(r.riesgo_bench, c.riesgo_bench)
@@ -0,0 +1,114 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from suscripciones import MENSAJE_EN_COLA, MENSAJE_EXITO, ClienteMoosend, ColaSuscripciones
+
+class ServidorMoosend:
+    """
+    Sustituto local de la API: responde con la cola `respuestas` (status, cuerpo
+    JSON o bytes tal cual) y anota las peticiones.
+    """
+
+    def __init__(self):
+        self.respuestas = []
+        self.peticiones = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                servidor.peticiones.append((self.path, cuerpo, self.client_address))
+                status, respuesta = servidor.respuestas.pop(0) if servidor.respuestas else (200, {"Code": 0})
+                datos = respuesta if isinstance(respuesta, bytes) else json.dumps(respuesta).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.http.server_port}/v3"
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+    def cerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+@pytest.fixture
+def servidor():
+    s = ServidorMoosend()
+    yield s
+    s.cerrar()
+
+@pytest.fixture
+def cola(tmp_path):
+    return ColaSuscripciones(tmp_path / "suscripciones.sqlite")
+
+def _cliente(url, cola, **kwargs):
+    return ClienteMoosend("clave", lista="lista", url=url, cola=cola, timeout=2, espera=0.01, **kwargs)
+
+def test_alta_correcta(servidor, cola):
+    cliente = _cliente(servidor.url, cola)
+    assert cliente.suscribir("Satoshi", "satoshi@bitcoin.org").result(timeout=5) == (True, MENSAJE_EXITO)
+    ruta, cuerpo, _ = servidor.peticiones[0]
+    assert ruta == "/v3/subscribers/lista/subscribe.json?apikey=clave"
+    assert cuerpo == {'Name': "Satoshi", 'Email': "satoshi@bitcoin.org", 'HasExternalDoubleOptIn': False}
+    assert len(cola) == 0
+    cliente.cerrar()
+
+def test_sesion_reutiliza_la_conexion(servidor, cola):
+    cliente = _cliente(servidor.url, cola, hilos=1)
+    for i in range(3):
+        cliente.suscribir("A", f"a{i}@b.c").result(timeout=5)
+    assert len({direccion for _, _, direccion in servidor.peticiones}) == 1
+    cliente.cerrar()
+
+def test_rechazo_de_moosend_sale_de_la_cola(servidor, cola):
+    servidor.respuestas = [(200, {"Code": 1, "Error": "INVALID_EMAIL"})]
+    cliente = _cliente(servidor.url, cola)
+    exito, mensaje = cliente.suscribir("A", "a@b").result(timeout=5)
+    assert not exito and "INVALID_EMAIL" in mensaje
+    assert len(cola) == 0
+    cliente.cerrar()
+
+def test_reintenta_errores_del_servidor(servidor, cola):
+    servidor.respuestas = [(503, {}), (429, {})]
+    cliente = _cliente(servidor.url, cola)
+    assert cliente.suscribir("A", "a@b.c").result(timeout=5) == (True, MENSAJE_EXITO)
+    assert len(servidor.peticiones) == 3
+    cliente.cerrar()
+
+def test_sin_servidor_queda_en_cola_y_se_reintenta(servidor, cola):
+    caido = _cliente("http://127.0.0.1:9/v3", cola, reintentos=2)
+    assert caido.suscribir("A", "a@b.c").result(timeout=5) == (None, MENSAJE_EN_COLA)
+    caido.cerrar()
+    assert len(cola) == 1
+    assert cola.vencidas() == []
+
+    # Otra instancia (p. ej. tras reiniciar la app) encuentra la alta en disco
+    cliente = _cliente(servidor.url, ColaSuscripciones(cola.ruta))
+    assert cliente.cola.vencidas(ahora=float("inf")) == [(1, "A", "a@b.c")]
+    cliente.cola._conexion.execute("UPDATE pendientes SET proximo_intento = 0")
+    futuros = cliente.reintentar_pendientes()
+    assert [f.result(timeout=5) for f in futuros] == [(True, MENSAJE_EXITO)]
+    assert len(cliente.cola) == 0
+    cliente.cerrar()
+
+def test_respuesta_no_json_se_aplaza(servidor, cola):
+    servidor.respuestas = [(200, b"<html>mantenimiento</html>")]
+    cliente = _cliente(servidor.url, cola)
+    # Queda pendiente, y así se le dice al usuario, para que no la repita
+    assert cliente.suscribir("A", "a@b.c").result(timeout=5) == (None, MENSAJE_EN_COLA)
+    # Sigue en la cola, pero no vuelve a enviarse hasta que pase la espera
+    assert len(cola) == 1 and cola.vencidas() == []
+    assert cliente.reintentar_pendientes() == []
+    assert len(servidor.peticiones) == 1
+    cliente.cerrar()
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from motor import ParametrosEstrategia, calcular_resumen, simular
+from sintetico import serie_sintetica
+from ventanas import analisis_inicios
+
+P = ParametrosEstrategia(target_ltv_agresivo=0.5, umbral_dd_agresivo=0.1)
+
+@pytest.fixture(scope="module")
+def serie():
+    return serie_sintetica(1500, "crash")
+
+def test_cada_inicio_es_una_simulacion_desde_ese_dia(serie):
+    tabla = analisis_inicios(serie, P, paso=7, dias_minimos=200, trozo=25, procesos=1)
+    assert tabla.index[0] == serie.index[0] and (np.diff(tabla.index.values) == np.timedelta64(7, 'D')).all()
+    assert tabla.index[-1] <= serie.index[-201]
+    assert tabla['liquidado'].any() and not tabla['liquidado'].all()
+
+    for inicio in (tabla.index[0], tabla.index[30], tabla[tabla['liquidado']].index[0], tabla.index[-1]):
+        i = serie.index.get_loc(inicio)
+        r = simular(serie.values[i:], serie.index[i:], P)
+        resumen = calcular_resumen(r)
+        fila = tabla.loc[inicio]
+        assert fila['liquidado'] == r.liquidado
+        assert fila['equity_final'] == pytest.approx(resumen['strat_val_final'], rel=1e-9, abs=1e-9)
+        assert fila['bench_final'] == pytest.approx(resumen['bench_val_final'], rel=1e-9)
+        assert fila['invertido'] == pytest.approx(r.dinero_invertido)
+        assert fila['cagr'] == pytest.approx(resumen['strat_cagr'], rel=1e-9, abs=1e-12)
+        assert fila['bench_cagr'] == pytest.approx(resumen['bench_cagr'], rel=1e-9)
+        if r.liquidado:
+            assert fila['fecha_liq'] == r.fecha_liq
+        assert fila['max_drawdown'] == pytest.approx(r.riesgo.max_drawdown, rel=1e-9)
+        assert fila['racha_bajo_agua'] == r.riesgo.racha_bajo_agua
+
+def test_pool_igual_que_serie(serie):
+    en_serie = analisis_inicios(serie, P, paso=3, dias_minimos=365, trozo=40, procesos=1)
+    en_pool = analisis_inicios(serie, P, paso=3, dias_minimos=365, trozo=40, procesos=2)
+    pd.testing.assert_frame_equal(en_serie, en_pool)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import vivo
+from almacen import AlmacenPrecios
+from motor import CODIGO_EVENTO, ParametrosEstrategia, simular
+from sintetico import serie_sintetica
+from vivo import EstadoEstrategia
+
+@pytest.mark.parametrize("regimen", ["calma", "crash", "liquidacion"])
+def test_avanzar_por_trozos_reproduce_simular(tmp_path, regimen):
+    serie = serie_sintetica(2000, regimen)
+    p = ParametrosEstrategia(target_ltv_agresivo=0.5, umbral_dd_agresivo=0.1)
+    r = simular(serie.values, serie.index, p)
+
+    estado = EstadoEstrategia(p, "AAA", serie.index[0])
+    decisiones = []
+    cortes = [0, 1, 2, 30, 31, 400, 1234, 1999, 2000]
+    for desde, hasta in zip(cortes[:-1], cortes[1:]):
+        # Las barras ya procesadas se ignoran y el estado pasa por disco entre trozos
+        decisiones += estado.avanzar(serie.iloc[max(desde - 5, 0):hasta])
+        estado.guardar(tmp_path / "estado.json")
+        estado = EstadoEstrategia.cargar(tmp_path / "estado.json")
+
+    assert len(decisiones) == len(r.fechas)
+    assert estado.liquidado == r.liquidado and estado.fecha_liq == r.fecha_liq
+    np.testing.assert_allclose([d.equity for d in decisiones], r.equity_strat, rtol=1e-12, atol=1e-9)
+    np.testing.assert_allclose([d.bench_equity for d in decisiones], r.equity_bench, rtol=1e-12)
+    np.testing.assert_allclose([d.ltv for d in decisiones], r.ltv, rtol=1e-12)
+    np.testing.assert_allclose([d.drawdown for d in decisiones], r.drawdown, rtol=1e-12)
+    compras = [d for d in decisiones if d.tipo is not None]
+    assert [CODIGO_EVENTO[d.tipo] for d in compras] == [r.codigo_evento[r.fechas.get_loc(d.fecha)] for d in compras]
+    assert [d.deuda_nueva for d in compras if d.tipo != "💀 LIQ"] == pytest.approx(
+        [reg['Deuda Nueva ($)'] for reg in r.registros if 'Deuda Nueva ($)' in reg])
+    assert estado.btc == pytest.approx(r.btc_acumulado, rel=1e-12)
+    assert estado.deuda_actual == pytest.approx(r.deuda_acumulada, rel=1e-12)
+    assert estado.intereses_pagados == pytest.approx(r.intereses_pagados, rel=1e-9)
+    assert estado.dinero_invertido == r.dinero_invertido
+    assert estado.bench_invertido == r.bench_invertido
+
+    # Después de la última barra (o de una liquidación) no hay nada que avanzar
+    assert estado.avanzar(serie) == []
+
+def test_linea_de_comandos(tmp_path, monkeypatch, capsys):
+    serie = serie_sintetica(500, "crash")
+    almacen = AlmacenPrecios(tmp_path / "datos", offline=True)
+    almacen._escribir("AAA", serie, np.ones(len(serie), dtype=bool))
+    monkeypatch.setattr(vivo, "AlmacenPrecios", lambda **kw: almacen)
+    ruta = tmp_path / "estado.json"
+
+    vivo.main([str(ruta), "--ticker", "AAA", "--fecha-inicio", "2015-01-01", "--offline",
+               "--parametros", '{"TARGET_LTV_BASE": 0.3}'])
+    estado = EstadoEstrategia.cargar(ruta)
+    assert estado.ticker == "AAA" and estado.p.target_ltv_base == 0.3
+    assert estado.fecha == serie.index[-1]
+    assert '"barras_nuevas": 500' in capsys.readouterr().out
+
+    # Sin barras nuevas el estado no cambia
+    antes = ruta.read_text()
+    vivo.main([str(ruta), "--offline"])
+    assert ruta.read_text() == antes
+
+    r = simular(serie.values, serie.index, estado.p)
+    assert estado.deuda_actual == pytest.approx(r.deuda_acumulada, rel=1e-12)
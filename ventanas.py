@@ -0,0 +1,84 @@
+"""
+Análisis por fecha de inicio.
+
+Evalúa la estrategia arrancando en cada día (o cada N días) de la serie. En vez
+de N ejecuciones independientes, cada fecha de inicio es un carril del motor
+por lotes: todas comparten el calendario de compras y la serie de precios, y el
+bucle recorre una sola vez los días de decisión (acumulando de paso las
+métricas de riesgo de cada carril). Las fechas se reparten en trozos contiguos
+entre procesos.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from motor import simular_lote
+from riesgo import MetricasRiesgo
+
+def _simular_trozo(args):
+    precios, fechas, p, inicios = args
+    res = simular_lote(precios, fechas, p, inicios=inicios, metricas_riesgo=True)
+    return pd.DataFrame({
+        'equity_final': res.equity_final,
+        'bench_final': res.bench_final,
+        'invertido': res.dinero_invertido,
+        'bench_invertido': res.bench_invertido,
+        'cagr': res.cagr,
+        'bench_cagr': res.bench_cagr,
+        'liquidado': res.liquidado,
+        'fecha_liq': res.fecha_liq,
+        'dias': res.dias,
+        **{f.name: getattr(res.riesgo, f.name) for f in fields(MetricasRiesgo)},
+    }, index=fechas[inicios])
+
+def analisis_inicios(precios, p, paso=1, dias_minimos=365, trozo=500, procesos=None):
+    """
+    Resultado de la estrategia para cada fecha de inicio de `precios` (serie diaria),
+    cada `paso` días y dejando al menos `dias_minimos` de historia por delante.
+    Devuelve un DataFrame indexado por fecha de inicio.
+    """
+    valores = np.asarray(precios, dtype=float)
+    fechas = pd.DatetimeIndex(precios.index)
+    ultimo = len(valores) - 1 - dias_minimos
+    if ultimo < 0:
+        raise ValueError(f"Hacen falta más de {dias_minimos} días de datos.")
+    inicios = np.arange(0, ultimo + 1, paso)
+
+    tareas = [(valores, fechas, p, inicios[desde:desde + trozo]) for desde in range(0, len(inicios), trozo)]
+    procesos = procesos or os.cpu_count() or 1
+    if procesos > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as pool:
+            partes = list(pool.map(_simular_trozo, tareas))
+    else:
+        partes = [_simular_trozo(t) for t in tareas]
+
+    tabla = pd.concat(partes)
+    tabla.index.name = 'Inicio'
+    tabla['exceso'] = tabla['cagr'] - tabla['bench_cagr']
+    return tabla
+
+def figura_inicios(tabla):
+    """CAGR de estrategia y benchmark por fecha de inicio, exceso y liquidaciones."""
+    fig, axes = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+
+    axes[0].set_title("1. CAGR según Fecha de Inicio", fontweight='bold')
+    axes[0].plot(tabla.index, tabla['cagr'] * 100, color='#1f77b4', label='Tu Estrategia')
+    axes[0].plot(tabla.index, tabla['bench_cagr'] * 100, color='gray', linestyle='--', label='Benchmark DCA')
+    liq = tabla[tabla['liquidado']]
+    axes[0].scatter(liq.index, [0] * len(liq), marker='x', color='red', s=20, label='Liquidada')
+    axes[0].set_ylabel("CAGR (%)")
+    axes[0].legend()
+    axes[0].grid(True, alpha=0.3)
+
+    axes[1].set_title("2. Exceso de CAGR vs Benchmark", fontweight='bold')
+    exceso = tabla['exceso'] * 100
+    axes[1].fill_between(tabla.index, exceso, 0, where=exceso >= 0, color='green', alpha=0.3)
+    axes[1].fill_between(tabla.index, exceso, 0, where=exceso < 0, color='red', alpha=0.3)
+    axes[1].set_ylabel("Diferencia (%)")
+    axes[1].grid(True, alpha=0.3)
+    fig.tight_layout()
+    return fig
@@ -0,0 +1,210 @@
+"""
+Modo en vivo: la estrategia como generador de señales diario.
+
+    python vivo.py estado_btc.json --ticker BTC-USD --fecha-inicio 2021-10-01
+    python vivo.py estado_btc.json            # las siguientes veces
+
+En lugar de volver a simular todo el histórico desde la fecha de inicio cada
+día, `EstadoEstrategia` guarda lo poco que el motor arrastra de un día al
+siguiente (posiciones, deuda, intereses, máximo del precio, si el DCA ya está
+activo y el benchmark) y `avanzar` lo lleva hasta las barras nuevas con las
+mismas reglas que `motor.simular`: cada barra cuesta lo mismo tenga la
+posición un mes o diez años. El estado se guarda en un JSON local entre
+ejecuciones. Por defecto no se usa la barra del día en curso, que todavía
+puede cambiar (`--incluir-hoy` para usarla).
+"""
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+import pandas as pd
+
+from almacen import AlmacenPrecios
+from lote import preparar_escenario
+from motor import ParametrosEstrategia, decidir_compra, es_dia_de_compra
+
+@dataclass
+class DecisionDia:
+    """Lo que la estrategia hace en una barra (`tipo` None si no compra ese día)."""
+    fecha: pd.Timestamp
+    precio: float
+    drawdown: float
+    ltv: float
+    es_compra: bool
+    tipo: str | None = None
+    etiqueta: str | None = None
+    cash: float = 0.0
+    deuda_nueva: float = 0.0
+    ltv_post: float = 0.0
+    equity: float = 0.0
+    bench_equity: float = 0.0
+
+@dataclass
+class EstadoEstrategia:
+    """
+    Estado de la estrategia al cierre de `fecha` (None antes de la primera
+    barra). `deuda` es la deuda tras el último día de decisión y
+    `dias_interes` las barras transcurridas desde entonces, como en el motor.
+    """
+    p: ParametrosEstrategia
+    ticker: str
+    inicio: pd.Timestamp
+    fecha: pd.Timestamp | None = None
+    precio_pico: float = 0.0
+    dca_activo: bool = False
+    btc: float = 0.0
+    deuda: float = 0.0
+    dias_interes: int = 0
+    dinero_invertido: float = 0.0
+    deuda_tomada: float = 0.0
+    bench_btc: float = 0.0
+    bench_invertido: float = 0.0
+    liquidado: bool = False
+    fecha_liq: pd.Timestamp | None = None
+
+    @property
+    def deuda_actual(self):
+        return self.deuda * (1 + self.p.coste_deuda_apr / 365.0) ** self.dias_interes
+
+    @property
+    def intereses_pagados(self):
+        return self.deuda_actual - self.deuda_tomada
+
+    def avanzar(self, barras):
+        """
+        Procesa las barras de `barras` (serie de cierres diarios) posteriores a
+        `fecha` y devuelve una DecisionDia por barra; la última es la de hoy.
+        Tras una liquidación el estado ya no avanza.
+        """
+        barras = pd.Series(barras, dtype=float)
+        if not barras.index.is_monotonic_increasing:
+            barras = barras.sort_index()
+        if self.fecha is not None:
+            barras = barras.iloc[barras.index.searchsorted(self.fecha, side='right'):]
+        barras = barras.dropna()
+        p = self.p
+        decisiones = []
+        for fecha, precio in barras.items():
+            if self.liquidado:
+                break
+            primera = self.fecha is None
+            if not primera:
+                self.dias_interes += 1
+            self.fecha = fecha
+            self.precio_pico = max(self.precio_pico, precio)
+            dd = (self.precio_pico - precio) / self.precio_pico if self.precio_pico > 0 else 0.0
+            self.dca_activo = self.dca_activo or bool(dd >= p.umbral_inicio_dca)
+
+            # LTV antes de comprar, con los intereses hasta hoy
+            deuda = self.deuda_actual
+            colateral = self.btc * precio
+            ltv = deuda / colateral if colateral > 0 else 0.0
+            es_compra = primera or bool(es_dia_de_compra(fecha, p.frecuencia, p.dia_semana_idx, p.dia_mes))
+            decision = DecisionDia(fecha, precio, dd, ltv, es_compra)
+            decisiones.append(decision)
+
+            if ltv >= p.liq_threshold:
+                self.liquidado, self.fecha_liq = True, fecha
+                self.deuda, self.dias_interes = deuda, 0
+                decision.tipo = decision.etiqueta = "💀 LIQ"
+                decision.bench_equity = self.bench_btc * precio
+                break
+
+            if primera:
+                self.btc += p.inversion_inicial / precio
+                self.bench_btc += p.inversion_inicial / precio
+                self.dinero_invertido += p.inversion_inicial
+                self.bench_invertido += p.inversion_inicial
+                decision.tipo = decision.etiqueta = "INICIO"
+                decision.cash = p.inversion_inicial
+            elif es_compra:
+                self.deuda, self.dias_interes = deuda, 0
+                self.bench_btc += p.aportacion_base / precio
+                self.bench_invertido += p.aportacion_base
+                if self.dca_activo:
+                    cash, deuda_nueva, decision.tipo, decision.etiqueta = decidir_compra(
+                        p, dd, ltv, colateral, self.deuda)
+                    self.btc += (cash + deuda_nueva) / precio
+                    self.deuda += deuda_nueva
+                    self.deuda_tomada += deuda_nueva
+                    self.dinero_invertido += cash
+                    decision.cash, decision.deuda_nueva = cash, deuda_nueva
+                    decision.ltv_post = self.deuda / (self.btc * precio)
+            decision.equity = self.btc * precio - self.deuda_actual
+            decision.bench_equity = self.bench_btc * precio
+        return decisiones
+
+    def a_dict(self):
+        """Diccionario serializable en JSON (fechas como texto ISO)."""
+        datos = {f.name: getattr(self, f.name) for f in fields(self)}
+        datos['p'] = asdict(self.p)
+        for nombre in ('inicio', 'fecha', 'fecha_liq'):
+            if datos[nombre] is not None:
+                datos[nombre] = datos[nombre].isoformat()
+        return datos
+
+    @classmethod
+    def desde_dict(cls, datos):
+        datos = dict(datos)
+        datos['p'] = ParametrosEstrategia(**datos['p'])
+        for nombre in ('inicio', 'fecha', 'fecha_liq'):
+            if datos.get(nombre) is not None:
+                datos[nombre] = pd.Timestamp(datos[nombre])
+        return cls(**datos)
+
+    def guardar(self, ruta):
+        """Escribe el estado en `ruta` (escritura atómica)."""
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(ruta.name + ".tmp")
+        temporal.write_text(json.dumps(self.a_dict(), ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        return cls.desde_dict(json.loads(Path(ruta).read_text(encoding="utf-8")))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("estado", help="Fichero JSON con el estado (se crea si no existe)")
+    parser.add_argument("--ticker", help="Ticker del activo (solo al crear el estado)")
+    parser.add_argument("--fecha-inicio", default=None, help="Fecha de inicio (solo al crear el estado)")
+    parser.add_argument("--parametros", default="{}",
+                        help="Objeto JSON con parámetros del panel, como en lote.py (solo al crear el estado)")
+    parser.add_argument("--incluir-hoy", action="store_true", help="Usar también la barra del día en curso")
+    parser.add_argument("--offline", action="store_true", help="No descargar nada: usar solo el almacén local")
+    args = parser.parse_args(argv)
+
+    ruta = Path(args.estado)
+    if ruta.exists():
+        estado = EstadoEstrategia.cargar(ruta)
+    else:
+        if not args.ticker:
+            parser.error("falta --ticker para crear el estado")
+        datos = {**json.loads(args.parametros), "ticker": args.ticker}
+        if args.fecha_inicio:
+            datos["fecha_inicio"] = args.fecha_inicio
+        _, ticker, inicio, p = preparar_escenario(datos, ruta.name)
+        estado = EstadoEstrategia(p, ticker, inicio)
+
+    almacen = AlmacenPrecios(offline=True) if args.offline else AlmacenPrecios()
+    barras = almacen.serie(estado.ticker, estado.inicio)
+    if not args.incluir_hoy:
+        barras = barras.iloc[:barras.index.searchsorted(pd.Timestamp.now().normalize())]
+    decisiones = estado.avanzar(barras)
+    estado.guardar(ruta)
+
+    if not decisiones:
+        print(f"Sin barras nuevas desde {estado.fecha or estado.inicio:%Y-%m-%d}.", file=sys.stderr)
+        return 0
+    hoy = decisiones[-1]
+    print(json.dumps({**asdict(hoy), 'fecha': f"{hoy.fecha:%Y-%m-%d}", 'barras_nuevas': len(decisiones),
+                      'deuda': estado.deuda_actual, 'intereses': estado.intereses_pagados,
+                      'liquidado': estado.liquidado}, ensure_ascii=False, default=float))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())